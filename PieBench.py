@@ -0,0 +1,591 @@
+"""
+Безголовый бенчмарк радиального меню.
+
+Запуск:  python PieBench.py [--quick] [--output results.json] [--baseline baseline.json] [--save-baseline]
+
+Работает под QT_QPA_PLATFORM=offscreen с бэкендом ввода в памяти (MemoryInputBackend),
+поэтому не требует реальных устройств ввода и не трогает radial_config.json.
+"""
+import sys
+import os
+import json
+import math
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Callable
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_OUTPUT = BENCH_DIR / "bench_results.json"
+DEFAULT_BASELINE = BENCH_DIR / "bench_baseline.json"
+# Допустимое ухудшение относительно базовой линии (%)
+DEFAULT_TOLERANCE = 15.0
+
+from PyQt5 import QtCore, QtGui, QtWidgets  # noqa: E402
+import PieTest  # noqa: E402
+
+# Весь ввод идёт через бэкенд в памяти: реальные keyboard/mouse не импортируются
+INPUT = PieTest.MemoryInputBackend()
+PieTest.set_input_backend(INPUT)
+
+# ------------------------------
+# Вспомогательные функции
+# ------------------------------
+
+def _make_config(items_per_direction: int, sectors: int = 4, **overrides) -> "PieTest.RadialConfig":
+    """
+    Конфиг с заданным числом элементов в каждом направлении (overrides - секции верхнего уровня).
+    При sectors != 4 направления называются sector0..sectorN-1.
+    """
+    cfg = json.loads(json.dumps(PieTest.DEFAULT_CONFIG))
+    if sectors != len(cfg["directions"]):
+        cfg["directions"] = {f"sector{i}": dict(PieTest.DEFAULT_SUBMENU_CONFIG) for i in range(sectors)}
+    for d, dir_cfg in cfg["directions"].items():
+        dir_cfg["label"] = d.capitalize()
+        dir_cfg["items"] = [
+            {"label": f"Item {i}", "keys": f"ctrl+{i % 10}", "type": "hotkey"}
+            for i in range(items_per_direction)
+        ]
+    for section, values in overrides.items():
+        cfg[section].update(values)
+    return PieTest.RadialConfig.from_dict(cfg)
+
+
+def _make_tree_config(fan_out: int, depth: int) -> "PieTest.RadialConfig":
+    """Конфиг, где каждое направление - полное дерево подменю fan_out^depth листьев."""
+    def level(d: int, prefix: str) -> List[Dict]:
+        if d == depth:
+            return [{"label": f"{prefix}{i}", "keys": f"ctrl+{i % 10}", "type": "hotkey"} for i in range(fan_out)]
+        return [{"label": f"{prefix}{i}", "type": "submenu", "items": level(d + 1, f"{prefix}{i}.")} for i in range(fan_out)]
+
+    cfg = json.loads(json.dumps(PieTest.DEFAULT_CONFIG))
+    for d, dir_cfg in cfg["directions"].items():
+        dir_cfg["items"] = level(1, "")
+    return PieTest.RadialConfig.from_dict(cfg)
+
+
+def _summary(samples_ns: List[int]) -> Dict:
+    ordered = sorted(samples_ns)
+    n = len(ordered)
+    return {
+        "p50_ms": ordered[n // 2] / 1e6,
+        "p95_ms": ordered[min(n - 1, int(n * 0.95))] / 1e6,
+        "mean_ms": sum(ordered) / n / 1e6,
+    }
+
+
+def _time_calls(fn: Callable[[int], None], iterations: int, warmup: int = 5) -> List[int]:
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(iterations):
+        t0 = time.perf_counter_ns()
+        fn(i)
+        samples.append(time.perf_counter_ns() - t0)
+    return samples
+
+# ------------------------------
+# Бенчмарки
+# ------------------------------
+
+ITEM_COUNTS = (1, 4, 9, 18, 36)
+
+
+def bench_paint(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """Время кадра paintEvent на уровнях 0 и 1 при 1-36 элементах."""
+    results = {}
+    image = QtGui.QImage(PieTest.OVERLAY_WINDOW_SIZE, PieTest.OVERLAY_WINDOW_SIZE, QtGui.QImage.Format_ARGB32_Premultiplied)
+    center = PieTest.OVERLAY_LOCAL_CENTER
+
+    for n in ITEM_COUNTS:
+        cfg = _make_config(n)
+        overlay = PieTest.RadialOverlay(cfg)
+
+        # Уровень 0: курсор ходит по кругу, превью меняется
+        overlay.open_main_menu(center, center)
+        directions = overlay.sectors.names
+
+        def frame_level0(i, overlay=overlay):
+            overlay._cursor_local = QtCore.QPoint(center + (i % 40), center - (i % 25))
+            overlay.preview_direction = directions[i % len(directions)]
+            overlay.render(image)
+
+        results[f"paint_level0_{n}_items"] = _summary(_time_calls(frame_level0, iterations))
+
+        # Уровень 1: подсветка перебирает элементы
+        overlay.open_submenu("north", cfg.directions["north"].actionable)
+
+        def frame_level1(i, overlay=overlay):
+            overlay.highlight_index = i % n
+            overlay.render(image)
+
+        results[f"paint_level1_{n}_items"] = _summary(_time_calls(frame_level1, iterations))
+        overlay.close_menu()
+        overlay.deleteLater()
+        app.processEvents()
+    return results
+
+
+def bench_paint_allocations(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """
+    Python-выделения памяти за кадр (tracemalloc) при 36 элементах: пиковый прирост внутри кадра
+    и то, что осталось после него. Первые кадры прогревают подписи и слои и не учитываются.
+    """
+    n = ITEM_COUNTS[-1]
+    results = {}
+    image = QtGui.QImage(PieTest.OVERLAY_WINDOW_SIZE, PieTest.OVERLAY_WINDOW_SIZE, QtGui.QImage.Format_ARGB32_Premultiplied)
+    center = PieTest.OVERLAY_LOCAL_CENTER
+    cfg = _make_config(n)
+    overlay = PieTest.RadialOverlay(cfg)
+    overlay.open_main_menu(center, center)
+    directions = overlay.sectors.names
+    cursors = [QtCore.QPoint(center + (i % 40), center - (i % 25)) for i in range(40)]
+
+    def frame_level0(i):
+        overlay._cursor_local = cursors[i % len(cursors)]
+        overlay.preview_direction = directions[i % len(directions)]
+        overlay.render(image)
+
+    def frame_level1(i):
+        overlay.highlight_index = i % n
+        overlay.render(image)
+
+    for name, frame, setup in (
+        ("level0", frame_level0, None),
+        ("level1", frame_level1, lambda: overlay.open_submenu("north", cfg.directions["north"].actionable)),
+    ):
+        if setup:
+            setup()
+        for i in range(n * 2):
+            frame(i)
+        peaks, retained = [], []
+        tracemalloc.start()
+        try:
+            for i in range(max(n, iterations)):
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                frame(i)
+                current, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - before)
+                retained.append(current - before)
+        finally:
+            tracemalloc.stop()
+        results[f"paint_alloc_{name}_{n}_items"] = {
+            "peak_bytes_per_frame": sum(peaks) / len(peaks),
+            "retained_bytes_per_frame": sum(retained) / len(retained),
+        }
+    overlay.close_menu()
+    overlay.deleteLater()
+    app.processEvents()
+    return results
+
+
+SECTOR_COUNTS = (4, 6, 8, 12)
+
+
+def bench_sectors(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """Кадр уровня 0 и поиск сектора под курсором при 4-12 секторах (должны не зависеть от числа секторов)."""
+    results = {}
+    image = QtGui.QImage(PieTest.OVERLAY_WINDOW_SIZE, PieTest.OVERLAY_WINDOW_SIZE, QtGui.QImage.Format_ARGB32_Premultiplied)
+    center = PieTest.OVERLAY_LOCAL_CENTER
+    for n in SECTOR_COUNTS:
+        cfg = _make_config(4, sectors=n)
+        overlay = PieTest.RadialOverlay(cfg)
+        overlay.open_main_menu(center, center)
+        names = overlay.sectors.names
+
+        def frame(i, overlay=overlay):
+            overlay.preview_direction = names[i % len(names)]
+            overlay.render(image)
+
+        results[f"paint_level0_{n}_sectors"] = _summary(_time_calls(frame, iterations))
+
+        table = overlay.sectors
+        offsets = [(100 * math.cos(math.radians(k)), 100 * math.sin(math.radians(k))) for k in range(360)]
+        count = iterations * 100
+        t0 = time.perf_counter_ns()
+        for i in range(count):
+            dx, dy = offsets[i % 360]
+            table.direction_at(dx, dy)
+        elapsed = time.perf_counter_ns() - t0
+        results[f"sector_lookup_{n}_sectors"] = {"lookups_per_s": count / (elapsed / 1e9)}
+        overlay.close_menu()
+        overlay.deleteLater()
+        app.processEvents()
+    return results
+
+
+def bench_hit_test(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """Пропускная способность mouseMoveEvent (попадание по шарикам подменю)."""
+    results = {}
+    center = PieTest.OVERLAY_LOCAL_CENTER
+    for n in (9, 36):
+        cfg = _make_config(n)
+        overlay = PieTest.RadialOverlay(cfg)
+        overlay.open_main_menu(center, center)
+        overlay.open_submenu("east", cfg.directions["east"].actionable)
+        # Заранее подготовленные события по кругу вокруг центра
+        events = []
+        for k in range(360):
+            angle = math.radians(k)
+            pos = QtCore.QPointF(center + 110 * math.cos(angle), center + 110 * math.sin(angle))
+            events.append(QtGui.QMouseEvent(QtCore.QEvent.MouseMove, pos, QtCore.Qt.NoButton, QtCore.Qt.NoButton, QtCore.Qt.NoModifier))
+
+        count = iterations * 10
+        t0 = time.perf_counter_ns()
+        for i in range(count):
+            overlay.mouseMoveEvent(events[i % len(events)])
+        elapsed = time.perf_counter_ns() - t0
+        results[f"hit_test_{n}_items"] = {"events_per_s": count / (elapsed / 1e9)}
+        overlay.close_menu()
+        overlay.deleteLater()
+        app.processEvents()
+    return results
+
+
+def bench_first_open(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """Открытие -> первый кадр у только что созданного оверлея: без прогрева и после warm_up()."""
+    results = {}
+    cfg = _make_config(9)
+    center = PieTest.OVERLAY_LOCAL_CENTER
+    for name, warm in (("cold", False), ("warm", True)):
+        samples = []
+        for i in range(max(3, iterations // 10)):
+            overlay = PieTest.RadialOverlay(cfg)
+            if warm:
+                overlay.warm_up()
+            overlay.open_main_menu(center, center)
+            deadline = time.perf_counter() + 2.0
+            while overlay.first_open_to_paint_ns is None and time.perf_counter() < deadline:
+                app.processEvents()
+            if overlay.first_open_to_paint_ns is None:
+                raise RuntimeError("overlay was not painted after open")
+            samples.append(overlay.first_open_to_paint_ns)
+            overlay.close_menu()
+            overlay.deleteLater()
+            app.processEvents()
+        results[f"open_to_first_paint_{name}"] = _summary(samples)
+    return results
+
+
+PROFILE_COUNT = 16
+
+
+def bench_profiles(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """Смена профиля при смене окна: сопоставление с профилями и переключение ссылок в оверлее."""
+    raw = _make_config(9).to_dict()
+    raw["profiles"] = {
+        f"app{i}": {"match": {"window_class": f"AppClass{i}"}, "directions": raw["directions"]}
+        for i in range(PROFILE_COUNT)
+    }
+    cfg = PieTest.RadialConfig.from_dict(raw)
+    overlay = PieTest.RadialOverlay(cfg)
+    # Худший случай для сопоставления - подходит последний профиль или ни один
+    windows = [PieTest.WindowInfo(f"AppClass{PROFILE_COUNT - 1}", "title"), PieTest.WindowInfo("Other", "title")]
+    count = iterations * 100
+    t0 = time.perf_counter_ns()
+    for i in range(count):
+        overlay.use_profile(cfg.match_profile(windows[i & 1]))
+    elapsed = time.perf_counter_ns() - t0
+    overlay.deleteLater()
+    app.processEvents()
+    return {f"profile_switch_{PROFILE_COUNT}_profiles": {"switches_per_s": count / (elapsed / 1e9)}}
+
+
+MACRO_STEPS = [{"chord": "ctrl+c"}, {"delay": 5}, {"hold": "w", "ms": 10}, {"delay": 2}, {"chord": "shift+tab"}]
+
+
+def bench_macro(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """Опоздание событий макроса относительно дедлайнов планировщика."""
+    item = PieTest.ItemConfig.from_dict({"label": "macro", "type": "macro", "steps": MACRO_STEPS})
+    plan = PieTest.compile_macro(INPUT, item.steps)
+    scheduler = PieTest.MacroScheduler(INPUT)
+    runs = [scheduler.run(plan) for _ in range(max(3, iterations // 10))]
+    INPUT.injected.clear()
+    # Поштучные опоздания - из гистограммы, которую планировщик ведёт в LATENCY
+    per_event = PieTest.LATENCY.snapshot()["macro_jitter"]
+    return {"macro_jitter": {
+        "mean_ms": sum(r["jitter_mean_ms"] for r in runs) / len(runs),
+        "p95_ms": per_event["p95_ms"],
+        "p99_ms": per_event["p99_ms"],
+        "max_ms": max(r["jitter_max_ms"] for r in runs),
+    }}
+
+
+TREE_FAN_OUT = 6
+TREE_DEPTH = 4
+
+
+def bench_submenu_tree(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """
+    Большое дерево подменю: открытие главного меню не должно зависеть от размера дерева,
+    уровни строятся при первом входе, а кэши геометрии и слоёв ограничены.
+    """
+    results = {}
+    image = QtGui.QImage(PieTest.OVERLAY_WINDOW_SIZE, PieTest.OVERLAY_WINDOW_SIZE, QtGui.QImage.Format_ARGB32_Premultiplied)
+    center = PieTest.OVERLAY_LOCAL_CENTER
+    for name, cfg in (("flat", _make_config(TREE_FAN_OUT)), ("tree", _make_tree_config(TREE_FAN_OUT, TREE_DEPTH))):
+        def startup(i, cfg=cfg):
+            overlay = PieTest.RadialOverlay(cfg)
+            overlay.open_main_menu(center, center)
+            overlay.render(image)
+            overlay.close_menu()
+            overlay.deleteLater()
+
+        results[f"open_main_menu_{name}"] = _summary(_time_calls(startup, max(5, iterations // 4), warmup=2))
+        app.processEvents()
+
+    cfg = _make_tree_config(TREE_FAN_OUT, TREE_DEPTH)
+    overlay = PieTest.RadialOverlay(cfg)
+    cold, warm = [], []
+    for i in range(iterations):
+        overlay.open_main_menu(center, center)
+        overlay.open_submenu("east", cfg.directions["east"].actionable)
+        # Путь в глубину по цифрам i в системе счисления fan_out: часть уровней повторяется
+        path = i
+        for _ in range(TREE_DEPTH - 1):
+            index = path % TREE_FAN_OUT
+            path //= TREE_FAN_OUT
+            key = (overlay.config_revision, overlay.breadcrumbs[-1].key + (index,))
+            samples = warm if key in overlay._geometry_cache else cold
+            t0 = time.perf_counter_ns()
+            overlay.enter_submenu_item(index)
+            overlay.render(image)
+            samples.append(time.perf_counter_ns() - t0)
+        overlay.close_menu()
+    results["enter_level_cold"] = _summary(cold)
+    results["enter_level_warm"] = _summary(warm or cold)
+    results["tree_cache_at_rest"] = {
+        "geometry_count": len(overlay._geometry_cache),
+        "layer_count": len(overlay._layer_cache._entries),
+    }
+    overlay.deleteLater()
+    app.processEvents()
+    return results
+
+
+def bench_config(tmp_dir: Path, iterations: int) -> Dict[str, Dict]:
+    """load_config/save_config на маленьком и очень большом конфиге."""
+    results = {}
+    original_path = PieTest.CONFIG_PATH
+    PieTest.CONFIG_PATH = tmp_dir / "radial_config.json"
+    try:
+        for name, n in (("small", 9), ("large", 5000)):
+            cfg = _make_config(n)
+            reps = iterations if n < 100 else max(3, iterations // 20)
+            results[f"save_config_{name}"] = _summary(_time_calls(lambda i: PieTest.save_config(cfg), reps, warmup=1))
+            results[f"load_config_{name}"] = _summary(_time_calls(lambda i: PieTest.load_config(), reps, warmup=1))
+    finally:
+        PieTest.CONFIG_PATH = original_path
+    return results
+
+
+def bench_round_trip(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """
+    Полный цикл через RadialController: активация -> выбор -> выполнение действия.
+    flick - тот же жест в режиме разметки: выбор по пути курсора, оверлей не показывается.
+    """
+    results = {}
+    for name, marking_delay_ms in (("round_trip_hotkey", 0), ("round_trip_flick", 300)):
+        cfg = _make_config(9, activation={"combo": "mouse x1", "mode": "hook", "marking_delay_ms": marking_delay_ms})
+        overlay = PieTest.RadialOverlay(cfg)
+        controller = PieTest.RadialController(cfg, overlay)
+        main_radius = overlay.main_radius
+        ring = PieTest.SubmenuGeometry.ring_radius_for(main_radius, cfg.directions["east"])
+        origin = QtCore.QPoint(600, 600)
+
+        def round_trip(i, overlay=overlay, controller=controller):
+            # Активатор нажимается через хук бэкенда, как с реальной кнопкой мыши
+            INPUT.move_cursor(origin.x(), origin.y())
+            INPUT.feed_button("x", True)
+            app.processEvents()
+            # Уводим курсор за порог на восток: открывается подменю с выделенным первым элементом
+            INPUT.move_cursor(origin.x() + main_radius + 5, origin.y())
+            if marking_delay_ms:
+                # Перемещения приходят из хука мыши через очередь событий Qt
+                app.processEvents()
+                # Второй штрих - вверх от точки перехода, к первому элементу
+                INPUT.move_cursor(origin.x() + main_radius, origin.y() - ring)
+                app.processEvents()
+            else:
+                overlay._on_monitor_tick()
+            app.processEvents()
+            INPUT.feed_button("x", False)
+            # Закрытие ждёт окно антидребезга отпускания
+            while controller._active:
+                app.processEvents()
+            while controller._executor.busy:
+                time.sleep(0.0002)
+
+        injected_before = len(INPUT.injected)
+        samples = _time_calls(round_trip, max(5, iterations // 10), warmup=2)
+        if len(INPUT.injected) == injected_before:
+            raise RuntimeError(f"{name} did not inject any input")
+        if marking_delay_ms and overlay.frames_painted:
+            raise RuntimeError(f"{name} painted the overlay")
+        controller.stop()
+        overlay.deleteLater()
+        app.processEvents()
+        results[name] = _summary(samples)
+    return results
+
+def bench_release(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """От фронта отпускания активатора до activation_ended: окно антидребезга в мс, а не тики опроса."""
+    results = {}
+    for mode in ("hook", "poll"):
+        cfg = _make_config(1, activation={"combo": "mouse x1", "mode": mode, "release_debounce_ms": 10})
+        overlay = PieTest.RadialOverlay(cfg)
+        controller = PieTest.RadialController(cfg, overlay)
+        ended = []
+        controller.activation_ended.connect(lambda: ended.append(time.perf_counter_ns()))
+        samples = []
+        for i in range(max(5, iterations // 10)):
+            INPUT.feed_button("x", True)
+            while not controller._active:
+                app.processEvents()
+            INPUT.feed_button("x", False)
+            t0 = time.perf_counter_ns()
+            while not ended:
+                app.processEvents()
+            samples.append(ended.pop() - t0)
+        controller.stop()
+        overlay.deleteLater()
+        app.processEvents()
+        results[f"release_to_close_{mode}"] = _summary(samples)
+    return results
+
+def bench_frame_pacing(app: QtWidgets.QApplication, iterations: int) -> Dict[str, Dict]:
+    """
+    Тики оверлея в живом цикле событий при частоте экрана и с потолком: отклонение тика от дедлайна,
+    время кадра и пропущенные дедлайны (на пропуск кадра).
+    """
+    results = {}
+    center = PieTest.OVERLAY_LOCAL_CENTER
+    for name, max_fps in (("display", 0), ("cap_30", 30)):
+        cfg = _make_config(8, visual={"max_fps": max_fps})
+        overlay = PieTest.RadialOverlay(cfg)
+        overlay.open_main_menu(600, 600)
+        pacer = overlay._frame_pacer
+        ticks = max(30, iterations // 5)
+        for i in range(ticks):
+            # Курсор ходит по кругу: каждый тик что-то перерисовывает
+            angle = i * 0.3
+            INPUT.move_cursor(600 + int(80 * math.cos(angle)), 600 + int(80 * math.sin(angle)))
+            start = pacer.ticks
+            while pacer.ticks == start:
+                app.processEvents(QtCore.QEventLoop.WaitForMoreEvents)
+        metrics = overlay.metrics()
+        overlay.close_menu()
+        overlay.deleteLater()
+        app.processEvents()
+        results[f"frame_pacing_{name}"] = {
+            "frame_interval_ms": metrics["frame_interval_ms"],
+            "tick_jitter_p50_ms": metrics["tick_jitter_ms"]["p50_ms"],
+            "tick_jitter_p95_ms": metrics["tick_jitter_ms"]["p95_ms"],
+            "paint_p95_ms": metrics["paint_ms"]["p95_ms"],
+            "missed_per_frame": metrics["frames_missed"] / max(1, metrics["frame_ticks"]),
+        }
+    return results
+
+# ------------------------------
+# Сравнение с базовой линией
+# ------------------------------
+
+def _flatten(results: Dict[str, Dict]) -> Dict[str, float]:
+    flat = {}
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            flat[f"{name}.{metric}"] = value
+    return flat
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Список регрессий: метрики, ухудшившиеся больше чем на tolerance процентов."""
+    regressions = []
+    current = _flatten(results)
+    for key, base in _flatten(baseline).items():
+        if key not in current or not base:
+            continue
+        value = current[key]
+        # Для *_per_s больше - лучше, для времени - меньше
+        higher_is_better = key.endswith("_per_s")
+        change = (base - value) / base * 100.0 if higher_is_better else (value - base) / base * 100.0
+        if change > tolerance:
+            regressions.append(f"{key}: {base:.4f} -> {value:.4f} ({change:+.1f}%)")
+    return regressions
+
+
+def run(iterations: int) -> Dict:
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        results.update(bench_first_open(app, iterations))
+        results.update(bench_paint(app, iterations))
+        results.update(bench_paint_allocations(app, iterations))
+        results.update(bench_frame_pacing(app, iterations))
+        results.update(bench_sectors(app, iterations))
+        results.update(bench_hit_test(app, iterations))
+        results.update(bench_submenu_tree(app, iterations))
+        results.update(bench_profiles(app, iterations))
+        results.update(bench_config(Path(tmp), iterations))
+        results.update(bench_round_trip(app, iterations))
+        results.update(bench_release(app, iterations))
+        results.update(bench_macro(app, iterations))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "qt": QtCore.QT_VERSION_STR,
+            "platform": platform.platform(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM"),
+            "iterations": iterations,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Radial menu headless benchmarks")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations (smoke run)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed regression, percent")
+    args = parser.parse_args()
+
+    iterations = 20 if args.quick else args.iterations
+    report = run(iterations)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    for name, metrics in report["results"].items():
+        print(f"{name:<28}" + "  ".join(f"{k}={v:.4f}" for k, v in metrics.items()))
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if args.baseline.exists():
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline.get("results", {}), args.tolerance)
+        if regressions:
+            print(f"REGRESSIONS (>{args.tolerance:.0f}% worse than {args.baseline}):")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,965 @@
+"""
+Окно настроек и захват хоткеев радиального меню.
+
+PieTest импортирует модуль лениво, при первом открытии настроек: до первой активации
+запуск не строит ни окно настроек, ни диалог захвата.
+"""
+import json
+import queue
+from typing import Dict, Optional
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+import PieTest
+from PieTest import (
+    DEFAULT_CONFIG, DEFAULT_SUBMENU_CONFIG, MAX_SECTORS, MIN_SECTORS, TEXT_INJECT_MODES,
+    ActionExecutor, InputBackend, InputEvent, ItemConfig, get_input_backend, save_config,
+)
+
+# Типы элементов, которые окно умеет редактировать; остальные сохраняются без изменений
+EDITABLE_ITEM_TYPES = ("hotkey", "text", "hotkey_and_text", "submenu", "macro")
+
+# ------------------------------
+# Построчная запись макроса
+# ------------------------------
+MACRO_SYNTAX_HELP = (
+    "One step per line:\n"
+    "  chord ctrl+c      - press and release a combo\n"
+    "  hold w 200        - hold keys for 200 ms\n"
+    "  text Hello        - type the rest of the line\n"
+    "  delay 50          - wait 50 ms\n"
+    "Empty lines and lines starting with # are ignored."
+)
+
+def parse_macro_lines(text: str) -> list:
+    """Разбирает построчную запись в шаги макроса конфига. ValueError - с номером строки."""
+    steps = []
+    for n, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        kind, _, rest = stripped.partition(" ")
+        kind = kind.lower()
+        if kind == "text":
+            # Текст берётся как есть, кроме одного пробела-разделителя
+            steps.append({"text": line.lstrip()[len("text") + 1:]})
+        elif kind == "chord":
+            steps.append({"chord": rest.strip()})
+        elif kind == "hold":
+            keys, _, ms = rest.strip().rpartition(" ")
+            if not keys:
+                raise ValueError(f"line {n}: expected 'hold <keys> <ms>'")
+            steps.append({"hold": keys.strip(), "ms": ms})
+        elif kind == "delay":
+            steps.append({"delay": rest.strip()})
+        else:
+            raise ValueError(f"line {n}: unknown step '{kind}'")
+    if not steps:
+        raise ValueError("macro has no steps")
+    # Общая проверка модели конфигурации (пустые значения, отрицательные и нечисловые мс)
+    item = ItemConfig.from_dict({"type": "macro", "steps": steps}, "macro")
+    return [PieTest.macro_step_to_dict(step) for step in item.steps]
+
+def format_macro_lines(steps: list) -> str:
+    """Обратное к parse_macro_lines: шаги конфига -> построчная запись."""
+    lines = []
+    for step in steps:
+        if "hold" in step:
+            lines.append(f"hold {step['hold']} {step.get('ms', 0)}")
+        elif "delay" in step:
+            lines.append(f"delay {step['delay']}")
+        elif "text" in step:
+            lines.append(f"text {step['text']}")
+        else:
+            lines.append(f"chord {step.get('chord', '')}")
+    return "\n".join(lines)
+
+# ------------------------------
+# Захват хоткея: свои хуки -> SimpleQueue -> сигнал в GUI-поток
+# ------------------------------
+class HotkeyCaptureDialog(QtWidgets.QDialog):
+    """
+    Захват хоткея без опроса: собственные хуки клавиатуры и мыши кладут события в очередь
+    и сигналом будят GUI-поток, который разбирает очередь. Захват завершается на отпускании.
+    """
+
+    # Испускается из потока хука; соединение с GUI-потоком всегда через очередь Qt
+    _events_ready = QtCore.pyqtSignal()
+
+    # Имена кнопок мыши бэкенда -> имя в конфиге
+    MOUSE_BUTTONS = {
+        "x": "mouse x1",
+        "x2": "mouse x2",
+        "left": "mouse left",
+        "right": "mouse right",
+        "middle": "mouse middle",
+    }
+
+    def __init__(self, parent=None, single_key_mode=False, input_backend: Optional[InputBackend] = None):
+        super().__init__(parent)
+        self.input = input_backend or get_input_backend()
+        self.setWindowFlags(self.windowFlags() & ~QtCore.Qt.WindowCloseButtonHint) 
+        self.setWindowTitle("Press and Release hotkey (Esc to cancel)")
+        self.setFixedSize(420, 80)
+        layout = QtWidgets.QVBoxLayout(self)
+        
+        self.label = QtWidgets.QLabel(
+            "Press and RELEASE your desired hotkey/combo (e.g., Shift+1, Ctrl+C). Press ESC to cancel.", self
+        )
+        layout.addWidget(self.label)
+        
+        self.result = None
+        self._capture_running = True 
+        
+        self.single_key_mode = single_key_mode 
+        
+        self._current_keys = set()
+        self._pressed_order = [] 
+        self._pending_button: Optional[str] = None  # кнопка мыши, ждущая отпускания
+        
+        self._events: "queue.SimpleQueue[InputEvent]" = queue.SimpleQueue()
+        self._events_ready.connect(self._drain_events, QtCore.Qt.QueuedConnection)
+        self._hooks = [
+            self.input.hook_keyboard(self._on_input_event),
+            self.input.hook_mouse(self._on_input_event),
+        ]
+
+    # ------------------------------
+    # Поток хука: только постановка в очередь
+    # ------------------------------
+    def _on_input_event(self, event: InputEvent):
+        """Колбэк хука (чужой поток): кладёт событие в очередь и будит GUI-поток."""
+        if not self._capture_running or event.event_type == InputEvent.MOVE:
+            return
+        self._events.put(event)
+        self._events_ready.emit()
+
+    # ------------------------------
+    # GUI-поток: разбор очереди
+    # ------------------------------
+    def _drain_events(self):
+        while self._capture_running:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if event.device == InputEvent.KEYBOARD:
+                    self._keyboard_event_handler(event)
+                else:
+                    self._mouse_event_handler(event)
+            except Exception as e:
+                print("Hotkey capture error:", e)
+                self._finish(None)
+
+    def _finish(self, result: Optional[str]):
+        """Снимает только свои хуки и закрывает диалог."""
+        if not self._capture_running:
+            return
+        self._capture_running = False
+        self.result = result
+        self._remove_hooks()
+        if result is None:
+            super().reject()
+        else:
+            self.accept()
+
+    def _remove_hooks(self):
+        hooks, self._hooks = self._hooks, []
+        for handle in hooks:
+            self.input.unhook(handle)
+
+    def _get_base_key_name(self, event) -> Optional[str]:
+        """Имя клавиши из события хука в том виде, в каком его отдаёт бэкенд; для мыши - None."""
+        if event.device != InputEvent.KEYBOARD: 
+            return None 
+
+        return event.name
+
+    def _normalize_key_name(self, key_name: str) -> str:
+        """Нормализует имена клавиш."""
+        key_name = key_name.lower()
+        
+        if key_name in ('caps lock', 'scroll lock', 'num lock', 'win'):
+            return None
+            
+        if key_name.endswith(' shift'): return 'shift'
+        if key_name == 'shift': return 'shift'
+
+        if key_name.endswith(' control') or key_name.endswith(' ctrl'): return 'ctrl'
+        if key_name in ('control', 'ctrl'): return 'ctrl'
+        
+        if key_name.endswith(' alt'): return 'alt'
+        if key_name == 'alt': return 'alt'
+        
+        if key_name in ('lcontrol', 'rcontrol'): return 'ctrl'
+        if key_name in ('lshift', 'rshift'): return 'shift'
+        if key_name in ('lmenu', 'rmenu'): return 'alt'
+        
+        return key_name
+
+    def _mouse_event_handler(self, event):
+        """Кнопка мыши захватывается, только если не зажата ни одна клавиша; итог — на отпускании."""
+        button = self.MOUSE_BUTTONS.get(event.name)
+        if button is None:
+            return
+        if event.event_type == InputEvent.DOWN:
+            if not self._pressed_order and self._pending_button is None:
+                self._pending_button = button
+        elif event.event_type == InputEvent.UP and button == self._pending_button:
+            self._finish(button)
+
+    def _keyboard_event_handler(self, event):
+        """Обрабатывает события клавиатуры."""
+        key_name_base = self._get_base_key_name(event)
+        
+        if key_name_base is None:
+            return
+
+        normalized_name = self._normalize_key_name(key_name_base)
+        
+        if normalized_name is None:
+            return
+
+        if normalized_name == 'esc':
+            # Отмена сразу на нажатии, чтобы Esc не стал частью комбинации
+            if event.event_type == InputEvent.DOWN:
+                self._finish(None)
+            return
+            
+        if event.event_type == InputEvent.DOWN:
+            if self._pending_button is not None:
+                return
+            if normalized_name not in self._current_keys:
+                self._current_keys.add(normalized_name)
+                self._pressed_order.append(normalized_name)
+            
+        elif event.event_type == InputEvent.UP:
+            
+            if normalized_name not in self._current_keys:
+                return
+            self._current_keys.remove(normalized_name)
+
+            if self.single_key_mode:
+                self._finish(self._pressed_order[0])
+                return
+            
+            if not self._current_keys and self._pressed_order:
+                
+                if len(self._pressed_order) == 1 and self._pressed_order[0] in ('shift', 'ctrl', 'alt'):
+                    self._pressed_order = []
+                    return
+                
+                self._finish("+".join(self._pressed_order))
+                
+    def reject(self):
+        """Корректное завершение при отмене (нажатии Esc)."""
+        self._finish(None)
+
+    def closeEvent(self, event):
+        """Снимает хуки при закрытии окна."""
+        self._capture_running = False
+        self._remove_hooks()
+        event.accept()
+
+# ------------------------------
+# Редактор списка элементов (уровень направления или вложенного подменю)
+# ------------------------------
+class ItemListEditor(QtWidgets.QWidget):
+    """
+    Список элементов одного уровня с кнопками добавления и правки. depth - уровень меню
+    (1 - элементы направления); подменю открываются тем же редактором на уровень глубже.
+    """
+
+    def __init__(self, items: list, depth: int = 1, parent=None):
+        super().__init__(parent)
+        self.depth = depth
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.list = QtWidgets.QListWidget()
+        self.list.setFixedHeight(140)
+        self.list.setFixedWidth(380)
+        # Drag & Drop for reordering
+        self.list.setDragDropMode(QtWidgets.QAbstractItemView.InternalMove)
+        self.list.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.set_items(items)
+        layout.addWidget(self.list)
+
+        # Набор кнопок для управления элементами
+        btns = QtWidgets.QVBoxLayout()
+        for text, slot in (
+            ("Add Hotkey", self._add_hotkey_item),
+            ("Add Text", self._add_text_item),
+            ("Add Hotkey + Text", self._add_hotkey_text_item),
+            ("Add Submenu", self._add_submenu_item),
+            ("Add Macro", self._add_macro_item),
+            ("Rename Selected", self._rename_item),
+            ("Reassign", self._reassign_item),
+            ("Text Mode", self._set_text_mode),
+        ):
+            btn = QtWidgets.QPushButton(text)
+            btn.clicked.connect(lambda _, slot=slot: slot())
+            btns.addWidget(btn)
+        btns.addStretch(1)
+        rem_btn = QtWidgets.QPushButton("Remove Selected")
+        rem_btn.clicked.connect(lambda _: self._remove_item())
+        btns.addWidget(rem_btn)
+        layout.addLayout(btns)
+
+    def set_items(self, items: list):
+        self.list.clear()
+        for it in items:
+            li = QtWidgets.QListWidgetItem(self._format_item_text(it))
+            li.setData(QtCore.Qt.UserRole, it)
+            self.list.addItem(li)
+
+    def items(self) -> list:
+        """Элементы в порядке списка (после перетаскивания)."""
+        items = []
+        for i in range(self.list.count()):
+            it = self.list.item(i).data(QtCore.Qt.UserRole)
+            if it:
+                items.append(it)
+        return items
+
+    def _format_item_text(self, item_data: Dict) -> str:
+        """Форматирует текст элемента для QListWidget."""
+        label = item_data.get("label", "")
+        item_type = item_data.get("type", "hotkey")
+        # Способ ввода текста показывается, только если он задан явно
+        inject = item_data.get("inject", "auto")
+        mode_suffix = f" ({inject})" if inject != "auto" else ""
+        
+        if item_type == "text":
+            value = item_data.get("value", "")
+            display_value = value.replace('\n', ' ')
+            display_value = display_value[:20] + "..." if len(display_value) > 20 else display_value
+            return f'{label}    [Text: "{display_value}"]{mode_suffix}'
+        
+        elif item_type == "submenu":
+            return f'{label}    [Submenu: {len(item_data.get("items", []))} items]'
+        
+        elif item_type == "macro":
+            return f'{label}    [Macro: {len(item_data.get("steps", []))} steps]'
+        
+        elif item_type not in EDITABLE_ITEM_TYPES:
+            return f'{label}    [{item_type}]'
+        
+        elif item_type == "hotkey_and_text":
+            keys = item_data.get("keys", "")
+            value = item_data.get("value", "")
+            display_value = value.replace('\n', ' ')
+            display_value = display_value[:10] + "..." if len(display_value) > 10 else display_value
+            return f'{label}    [{keys} + Text: "{display_value}"]{mode_suffix}'
+        
+        else: # hotkey
+            keys = item_data.get("keys", "")
+            return f'{label}    [{keys}]'
+
+    def _update_list_item(self, list_item: QtWidgets.QListWidgetItem, item_data: Dict):
+        """Вспомогательный метод для обновления текста элемента списка и его данных."""
+        list_item.setText(self._format_item_text(item_data))
+        list_item.setData(QtCore.Qt.UserRole, item_data)
+
+    def _add_hotkey_item(self):
+        lw = self.list
+            
+        text, ok = QtWidgets.QInputDialog.getText(self, "New Hotkey Action", "Enter the label for the hotkey action:")
+        if not ok or not text.strip(): return
+        label = text.strip()
+
+        final_keys = self._get_two_part_hotkey(label)
+        if final_keys is None: return
+
+        item = {"label": label, "keys": final_keys, "type": "hotkey"}
+        li = QtWidgets.QListWidgetItem(self._format_item_text(item))
+        li.setData(QtCore.Qt.UserRole, item)
+        lw.addItem(li)
+        
+    def _add_text_item(self):
+        lw = self.list
+            
+        text_label, ok = QtWidgets.QInputDialog.getText(self, "New Text Action", "Enter the label for the text action:")
+        if not ok or not text_label.strip(): return
+        label = text_label.strip()
+
+        text_value, ok = QtWidgets.QInputDialog.getMultiLineText(self, "Text Content", f"Enter the text to be typed when '{label}' is selected:")
+        if not ok: return
+
+        item = {"label": label, "type": "text", "value": text_value}
+        li = QtWidgets.QListWidgetItem(self._format_item_text(item))
+        li.setData(QtCore.Qt.UserRole, item)
+        lw.addItem(li)
+        
+    def _add_hotkey_text_item(self):
+        lw = self.list
+            
+        text_label, ok = QtWidgets.QInputDialog.getText(self, "New Hotkey + Text Action", "Enter the label for the action:")
+        if not ok or not text_label.strip(): return
+        label = text_label.strip()
+
+        final_keys = self._get_two_part_hotkey(label)
+        if final_keys is None: return
+        
+        text_value, ok = QtWidgets.QInputDialog.getMultiLineText(self, "Text Content", f"Enter the text to be typed when '{label}' is selected (after hotkey):")
+        if not ok: return
+
+        item = {"label": label, "keys": final_keys, "type": "hotkey_and_text", "value": text_value}
+        li = QtWidgets.QListWidgetItem(self._format_item_text(item))
+        li.setData(QtCore.Qt.UserRole, item)
+        lw.addItem(li)
+
+    def _add_submenu_item(self):
+        """Пустое вложенное подменю; его элементы правятся тем же редактором (Reassign)."""
+        lw = self.list
+            
+        text_label, ok = QtWidgets.QInputDialog.getText(self, "New Submenu", "Enter the label for the submenu:")
+        if not ok or not text_label.strip(): return
+
+        item = {"label": text_label.strip(), "type": "submenu", "items": []}
+        li = QtWidgets.QListWidgetItem(self._format_item_text(item))
+        li.setData(QtCore.Qt.UserRole, item)
+        lw.addItem(li)
+        lw.setCurrentItem(li)
+        self._reassign_item()
+
+    def _ask_macro_steps(self, label: str, current: str = "") -> Optional[list]:
+        """Запрашивает шаги макроса построчно, пока запись не станет корректной или не будет отмены."""
+        text = current
+        while True:
+            text, ok = QtWidgets.QInputDialog.getMultiLineText(self, f"Macro steps: {label}", MACRO_SYNTAX_HELP, text)
+            if not ok:
+                return None
+            try:
+                return parse_macro_lines(text)
+            except ValueError as e:
+                QtWidgets.QMessageBox.warning(self, "Macro", str(e))
+
+    @staticmethod
+    def ask_json_items(parent: QtWidgets.QWidget, label: str, items: list, depth: int) -> Optional[list]:
+        """Запасной путь: элементы уровня как JSON-список, проверяются моделью конфигурации до применения."""
+        text = json.dumps(items, indent=2, ensure_ascii=False)
+        while True:
+            text, ok = QtWidgets.QInputDialog.getMultiLineText(
+                parent, f"Submenu items: {label}", "JSON list of items (same format as in the config file):", text
+            )
+            if not ok:
+                return None
+            try:
+                children = json.loads(text)
+                ItemConfig.from_dict({"type": "submenu", "items": children}, "items", depth - 1)
+                return children
+            except ValueError as e:
+                QtWidgets.QMessageBox.warning(parent, "Submenu", str(e))
+
+    def _add_macro_item(self):
+        lw = self.list
+            
+        text_label, ok = QtWidgets.QInputDialog.getText(self, "New Macro", "Enter the label for the macro:")
+        if not ok or not text_label.strip(): return
+        label = text_label.strip()
+
+        steps = self._ask_macro_steps(label)
+        if steps is None: return
+
+        item = {"label": label, "type": "macro", "steps": steps}
+        li = QtWidgets.QListWidgetItem(self._format_item_text(item))
+        li.setData(QtCore.Qt.UserRole, item)
+        lw.addItem(li)
+
+    def _get_two_part_hotkey(self, label: str) -> Optional[str]:
+        """Вспомогательный метод для захвата хоткея в два этапа."""
+        
+        dlg1 = HotkeyCaptureDialog(self, single_key_mode=True)
+        dlg1.setWindowTitle(f"Record KEY 1 for: {label}")
+        dlg1.label.setText("Press the FIRST key (e.g., Shift, Ctrl, F1). Press ESC to cancel.")
+        
+        if dlg1.exec_() != QtWidgets.QDialog.Accepted: return None
+        
+        key1 = dlg1.result or ""
+        if not key1: return None
+
+        key2 = ""
+        dlg2 = HotkeyCaptureDialog(self, single_key_mode=True)
+        dlg2.setWindowTitle(f"Record KEY 2 for: {label}")
+        dlg2.label.setText(f"Press the SECOND key (or ESC for just '{key1}').")
+        
+        if dlg2.exec_() == QtWidgets.QDialog.Accepted and dlg2.result:
+            key2 = dlg2.result
+        
+        return f"{key1}+{key2}" if key2 else key1
+
+
+    def _remove_item(self):
+        lw = self.list
+        cur = lw.currentItem()
+        if cur:
+            lw.takeItem(lw.row(cur))
+
+    def _rename_item(self):
+        lw = self.list
+        cur = lw.currentItem()
+        if not cur:
+            QtWidgets.QMessageBox.information(self, "Select", "Choose an item to rename")
+            return
+            
+        it = cur.data(QtCore.Qt.UserRole)
+        newlab, ok = QtWidgets.QInputDialog.getText(self, "Rename Label", "Label:", text=it.get("label",""))
+        if not ok or not newlab.strip():
+            return
+            
+        it["label"] = newlab.strip()
+        self._update_list_item(cur, it)
+
+    def _reassign_item(self):
+        lw = self.list
+        cur = lw.currentItem()
+        if not cur:
+            QtWidgets.QMessageBox.information(self, "Select", "Choose an item to reassign")
+            return
+            
+        it = cur.data(QtCore.Qt.UserRole)
+        current_label = it.get("label", "Action")
+        item_type = it.get("type", "hotkey")
+        
+        if item_type == "submenu":
+            dlg = SubmenuItemsDialog(current_label, it.get("items", []), self.depth + 1, self)
+            if dlg.exec_() == QtWidgets.QDialog.Accepted:
+                it["items"] = dlg.items
+                self._update_list_item(cur, it)
+            return
+
+        # Неизвестные окну типы сохраняются как есть, без перезаписи полей
+        if item_type not in EDITABLE_ITEM_TYPES:
+            QtWidgets.QMessageBox.information(self, "Reassign", f"'{item_type}' items are edited in {PieTest.CONFIG_PATH.name}")
+            return
+
+        if item_type == "macro":
+            steps = self._ask_macro_steps(current_label, format_macro_lines(it.get("steps", [])))
+            if steps is not None:
+                it["steps"] = steps
+                self._update_list_item(cur, it)
+            return
+
+        if item_type == "text" or item_type == "hotkey_and_text": 
+            text_value, ok = QtWidgets.QInputDialog.getMultiLineText(self, "Edit Text Content", f"Enter the new text for '{current_label}':", text=it.get("value", ""))
+            if not ok:
+                return
+            it["value"] = text_value
+            
+            if item_type == "hotkey_and_text":
+                res = QtWidgets.QMessageBox.question(self, "Hotkey", "Do you want to reassign the hotkey part as well?", QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No | QtWidgets.QMessageBox.Cancel)
+                if res == QtWidgets.QMessageBox.Cancel:
+                    return
+                elif res == QtWidgets.QMessageBox.Yes:
+                    self._reassign_hotkey_only(it, current_label)
+                    
+            self._update_list_item(cur, it)
+            
+        else: # hotkey
+            self._reassign_hotkey_only(it, current_label)
+            self._update_list_item(cur, it)
+            
+    def _set_text_mode(self):
+        """Выбор способа ввода текста для элемента: auto, посимвольно или через буфер обмена."""
+        lw = self.list
+        cur = lw.currentItem()
+        if not cur:
+            QtWidgets.QMessageBox.information(self, "Select", "Choose a text item")
+            return
+            
+        it = cur.data(QtCore.Qt.UserRole)
+        if it.get("type", "hotkey") not in ("text", "hotkey_and_text"):
+            QtWidgets.QMessageBox.information(self, "Text Mode", "Only text items have a text mode")
+            return
+        
+        modes = list(TEXT_INJECT_MODES)
+        current = it.get("inject", "auto")
+        mode, ok = QtWidgets.QInputDialog.getItem(
+            self, "Text Mode",
+            "auto - paste long text, type short text\ntype - type character by character\npaste - always paste via clipboard",
+            modes, modes.index(current) if current in modes else 0, False
+        )
+        if not ok:
+            return
+        
+        if mode == "auto":
+            it.pop("inject", None)
+        else:
+            it["inject"] = mode
+        self._update_list_item(cur, it)
+
+    def _reassign_hotkey_only(self, item_data: Dict, label: str):
+        """Вспомогательный метод для переназначения только хоткея."""
+        final_keys = self._get_two_part_hotkey(label)
+        if final_keys is None:
+            return
+        item_data["keys"] = final_keys
+        
+
+
+class SubmenuItemsDialog(QtWidgets.QDialog):
+    """Элементы вложенного подменю в том же редакторе; JSON - запасной путь для ручной правки."""
+
+    def __init__(self, label: str, items: list, depth: int, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Submenu: {label}")
+        self._label = label
+        self.items: list = []
+        v = QtWidgets.QVBoxLayout(self)
+        self.editor = ItemListEditor(items, depth, self)
+        v.addWidget(self.editor)
+
+        hb = QtWidgets.QHBoxLayout()
+        json_btn = QtWidgets.QPushButton("Edit as JSON...")
+        json_btn.clicked.connect(self._edit_json)
+        hb.addWidget(json_btn)
+        hb.addStretch()
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        hb.addWidget(buttons)
+        v.addLayout(hb)
+
+    def _edit_json(self):
+        items = ItemListEditor.ask_json_items(self, self._label, self.editor.items(), self.editor.depth)
+        if items is not None:
+            self.editor.set_items(items)
+
+    def accept(self):
+        items = self.editor.items()
+        try:
+            # Глубина вложенности и шаги макросов проверяются моделью конфигурации
+            ItemConfig.from_dict({"type": "submenu", "items": items}, "items", self.editor.depth - 1)
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, "Submenu", str(e))
+            return
+        self.items = items
+        super().accept()
+
+# ------------------------------
+# Окно настроек
+# ------------------------------
+class SettingsWindow(QtWidgets.QWidget):
+    
+    config_saved = QtCore.pyqtSignal() # НОВЫЙ СИГНАЛ
+    
+    def __init__(self, cfg: Dict, save_callback=None):
+        super().__init__()
+        self.setWindowTitle("Radial Menu — Settings")
+        self.cfg = cfg
+        self.save_callback = save_callback
+        self.resize(850, 680) 
+        v = QtWidgets.QVBoxLayout(self)
+
+        # -------------------
+        # 1. Activation Settings
+        # -------------------
+        act_box = QtWidgets.QGroupBox("Activation (hold to open)")
+        hv = QtWidgets.QHBoxLayout(act_box)
+        hv.addWidget(QtWidgets.QLabel("Hotkey Combo:"))
+        
+        current_combo = self.cfg.get("activation",{}).get("combo", DEFAULT_CONFIG["activation"]["combo"])
+        
+        self.combo_edit = QtWidgets.QLineEdit(current_combo)
+        self.combo_edit.setFixedWidth(160)
+        hv.addWidget(self.combo_edit)
+        
+        self.capture_act_btn = QtWidgets.QPushButton("Record activation (press combo)")
+        hv.addWidget(self.capture_act_btn)
+        
+        # Режим детекта активатора: хуки (без опроса) или таймер
+        self.hook_mode_check = QtWidgets.QCheckBox("Event-driven (no polling)")
+        self.hook_mode_check.setChecked(self.cfg.get("activation", {}).get("mode", DEFAULT_CONFIG["activation"]["mode"]) == "hook")
+        hv.addWidget(self.hook_mode_check)
+        
+        # Режим разметки: быстрый жест срабатывает без показа меню
+        hv.addWidget(QtWidgets.QLabel("Marking delay (ms, 0 = off):"))
+        self.marking_delay_edit = QtWidgets.QLineEdit(str(self.cfg.get("activation", {}).get("marking_delay_ms", DEFAULT_CONFIG["activation"]["marking_delay_ms"])))
+        self.marking_delay_edit.setFixedWidth(50)
+        self.marking_delay_edit.setValidator(QtGui.QIntValidator(0, 5000))
+        hv.addWidget(self.marking_delay_edit)
+        
+        # Антидребезг отпускания: окно в мс от фронта отпускания активатора
+        hv.addWidget(QtWidgets.QLabel("Release debounce (ms):"))
+        self.release_debounce_edit = QtWidgets.QLineEdit(str(self.cfg.get("activation", {}).get("release_debounce_ms", DEFAULT_CONFIG["activation"]["release_debounce_ms"])))
+        self.release_debounce_edit.setFixedWidth(50)
+        self.release_debounce_edit.setValidator(QtGui.QIntValidator(0, 1000))
+        hv.addWidget(self.release_debounce_edit)
+        hv.addStretch()
+        v.addWidget(act_box)
+        self.capture_act_btn.clicked.connect(self._capture_activation)
+
+        # -------------------
+        # 2. Global Visual Settings
+        # -------------------
+        vis_box = QtWidgets.QGroupBox("Global Visual Settings")
+        hv_vis = QtWidgets.QHBoxLayout(vis_box)
+        vis_cfg = self.cfg.get("visual", DEFAULT_CONFIG["visual"])
+
+        # Main Menu Radius 
+        hv_vis.addWidget(QtWidgets.QLabel("Main Menu/Threshold Radius (px):"))
+        self.main_radius_edit = QtWidgets.QLineEdit(str(vis_cfg.get("main_radius", DEFAULT_CONFIG["visual"]["main_radius"])))
+        self.main_radius_edit.setFixedWidth(50)
+        self.main_radius_edit.setValidator(QtGui.QIntValidator(10, 500))
+        hv_vis.addWidget(self.main_radius_edit)
+        
+        # Потолок частоты кадров оверлея; 0 - частота экрана
+        hv_vis.addWidget(QtWidgets.QLabel("Max FPS (0 = display rate):"))
+        self.max_fps_edit = QtWidgets.QLineEdit(str(vis_cfg.get("max_fps", DEFAULT_CONFIG["visual"]["max_fps"])))
+        self.max_fps_edit.setFixedWidth(50)
+        self.max_fps_edit.setValidator(QtGui.QIntValidator(0, 1000))
+        hv_vis.addWidget(self.max_fps_edit)
+        
+        # Политика исполнителя, если новый выбор пришёл во время выполнения предыдущего
+        hv_vis.addWidget(QtWidgets.QLabel("While an action runs:"))
+        self.action_policy_combo = QtWidgets.QComboBox()
+        self.action_policy_combo.addItems(list(ActionExecutor.POLICIES))
+        self.action_policy_combo.setCurrentText(self.cfg.get("actions", {}).get("policy", DEFAULT_CONFIG["actions"]["policy"]))
+        hv_vis.addWidget(self.action_policy_combo)
+        
+        # Длинный текст вставляется через буфер обмена, а не печатается посимвольно
+        hv_vis.addWidget(QtWidgets.QLabel("Paste text from (chars):"))
+        self.paste_threshold_edit = QtWidgets.QLineEdit(str(self.cfg.get("actions", {}).get("paste_threshold", DEFAULT_CONFIG["actions"]["paste_threshold"])))
+        self.paste_threshold_edit.setFixedWidth(50)
+        self.paste_threshold_edit.setValidator(QtGui.QIntValidator(1, 100000))
+        hv_vis.addWidget(self.paste_threshold_edit)
+        
+        hv_vis.addStretch()
+        v.addWidget(vis_box)
+
+        # -------------------
+        # 3. Directions Settings (Per-Submenu Settings)
+        # -------------------
+        dirs_box = QtWidgets.QGroupBox("Directions (sectors, clockwise from the top) and their items & Per-Submenu Visuals")
+        dirs_layout = QtWidgets.QVBoxLayout(dirs_box)
+        self.dir_name_edits: Dict[str, QtWidgets.QLineEdit] = {}
+        self.items_lists: Dict[str, QtWidgets.QListWidget] = {}
+        
+        self.submenu_radius_edits: Dict[str, QtWidgets.QLineEdit] = {}
+        self.threshold_ratio_edits: Dict[str, QtWidgets.QLineEdit] = {}
+        self.item_size_edits: Dict[str, QtWidgets.QLineEdit] = {}
+        self.dir_widgets: Dict[str, QtWidgets.QWidget] = {}
+        self.remove_sector_btns: Dict[str, QtWidgets.QPushButton] = {}
+        
+        # Секторов может быть до MAX_SECTORS: список направлений прокручивается
+        scroll = QtWidgets.QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll_body = QtWidgets.QWidget()
+        self.dirs_vbox = QtWidgets.QVBoxLayout(scroll_body)
+        self.dirs_vbox.addStretch(1)
+        scroll.setWidget(scroll_body)
+        dirs_layout.addWidget(scroll)
+        
+        for d, dir_cfg in self.cfg["directions"].items():
+            self._add_direction_widgets(d, dir_cfg)
+        
+        sector_btns = QtWidgets.QHBoxLayout()
+        self.add_sector_btn = QtWidgets.QPushButton("Add Sector")
+        self.add_sector_btn.clicked.connect(self._add_sector)
+        sector_btns.addWidget(self.add_sector_btn)
+        sector_btns.addStretch()
+        dirs_layout.addLayout(sector_btns)
+        self._update_sector_buttons()
+
+        v.addWidget(dirs_box)
+
+        # -------------------
+        # 4. Save/Cancel
+        # -------------------
+        hb = QtWidgets.QHBoxLayout()
+        hb.addStretch()
+        save_btn = QtWidgets.QPushButton("Save")
+        cancel_btn = QtWidgets.QPushButton("Cancel")
+        hb.addWidget(save_btn)
+        hb.addWidget(cancel_btn)
+        save_btn.clicked.connect(self._save)
+        cancel_btn.clicked.connect(self.close)
+        v.addLayout(hb)
+        
+    def _add_direction_widgets(self, d: str, dir_cfg: Dict):
+        """Строит блок настроек одного направления (сектора) в прокручиваемом списке."""
+        box = QtWidgets.QWidget()
+        grid = QtWidgets.QGridLayout(box)
+        
+        # --- Row 1: Direction Label & Per-Submenu Visuals ---
+        row_idx = 0
+        
+        # Direction Label
+        grid.addWidget(QtWidgets.QLabel(d.upper()), row_idx, 0)
+        name = QtWidgets.QLineEdit(dir_cfg.get("label", d.capitalize()))
+        self.dir_name_edits[d] = name
+        grid.addWidget(name, row_idx, 1)
+        
+        # Submenu Radius 
+        sr_label = QtWidgets.QLabel("Submenu Dist (px):")
+        grid.addWidget(sr_label, row_idx, 2)
+        sr_edit = QtWidgets.QLineEdit(str(dir_cfg.get("submenu_radius", DEFAULT_SUBMENU_CONFIG["submenu_radius"])))
+        sr_edit.setFixedWidth(50)
+        sr_edit.setValidator(QtGui.QIntValidator(20, 1000))
+        self.submenu_radius_edits[d] = sr_edit
+        grid.addWidget(sr_edit, row_idx, 3)
+
+        # Threshold Ratio (Now in Percentages)
+        tr_label = QtWidgets.QLabel("Threshold % (10.0-100.0):")
+        grid.addWidget(tr_label, row_idx, 4)
+        # Отображаем как процент (умножаем на 100)
+        tr_value = dir_cfg.get('threshold_ratio', DEFAULT_SUBMENU_CONFIG['threshold_ratio']) * 100.0
+        # Форматируем с точкой
+        tr_edit = QtWidgets.QLineEdit(f"{tr_value:.2f}")
+        tr_edit.setFixedWidth(70)
+        
+        # ИСПРАВЛЕНИЕ: Валидатор для корректного ввода чисел с точкой 
+        ratio_validator = QtGui.QDoubleValidator(10.0, 100.0, 2, self)
+        ratio_validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
+        # Принудительное использование точки как разделителя
+        ratio_validator.setLocale(QtCore.QLocale(QtCore.QLocale.C)) 
+        tr_edit.setValidator(ratio_validator)
+        
+        self.threshold_ratio_edits[d] = tr_edit
+        grid.addWidget(tr_edit, row_idx, 5)
+        
+        # Item Size 
+        is_label = QtWidgets.QLabel("Item Size (Radius, px):")
+        grid.addWidget(is_label, row_idx, 6)
+        is_edit = QtWidgets.QLineEdit(str(dir_cfg.get("item_size", DEFAULT_SUBMENU_CONFIG["item_size"])))
+        is_edit.setFixedWidth(50)
+        is_edit.setValidator(QtGui.QIntValidator(10, 100))
+        self.item_size_edits[d] = is_edit
+        grid.addWidget(is_edit, row_idx, 7)
+        
+        # --- Row 2: Item List and Buttons ---
+        editor = ItemListEditor(dir_cfg.get("items", []), 1, box)
+        self.items_lists[d] = editor.list
+        grid.addWidget(editor, row_idx + 1, 2, 2, 4) # Span across list and buttons columns
+        
+        # Add a vertical separator line (optional, for visual clarity)
+        line = QtWidgets.QFrame()
+        line.setFrameShape(QtWidgets.QFrame.HLine)
+        line.setFrameShadow(QtWidgets.QFrame.Sunken)
+        grid.addWidget(line, row_idx + 2, 0, 1, 8) 
+        
+        remove_sector_btn = QtWidgets.QPushButton("Remove Sector")
+        grid.addWidget(remove_sector_btn, row_idx + 1, 0, 1, 2, QtCore.Qt.AlignTop)
+        remove_sector_btn.clicked.connect(lambda _, dd=d: self._remove_sector(dd))
+        self.remove_sector_btns[d] = remove_sector_btn
+        
+        self.dir_widgets[d] = box
+        # Перед растяжкой в конце списка
+        self.dirs_vbox.insertWidget(self.dirs_vbox.count() - 1, box)
+
+    def _update_sector_buttons(self):
+        count = len(self.dir_widgets)
+        self.add_sector_btn.setEnabled(count < MAX_SECTORS)
+        for btn in self.remove_sector_btns.values():
+            btn.setEnabled(count > MIN_SECTORS)
+
+    def _add_sector(self):
+        if len(self.dir_widgets) >= MAX_SECTORS:
+            return
+        label, ok = QtWidgets.QInputDialog.getText(self, "Add Sector", "Sector label:")
+        if not ok:
+            return
+        # Ключ направления в конфиге - стабильный идентификатор, подпись редактируется отдельно
+        n = 1
+        while f"sector{n}" in self.dir_widgets:
+            n += 1
+        d = f"sector{n}"
+        self._add_direction_widgets(d, {"label": label.strip() or d.capitalize(), "items": [], **DEFAULT_SUBMENU_CONFIG})
+        self._update_sector_buttons()
+
+    def _remove_sector(self, d: str):
+        if len(self.dir_widgets) <= MIN_SECTORS or d not in self.dir_widgets:
+            return
+        if self.items_lists[d].count() > 0:
+            reply = QtWidgets.QMessageBox.question(self, "Remove Sector", f"Remove '{self.dir_name_edits[d].text()}' and its {self.items_lists[d].count()} items?")
+            if reply != QtWidgets.QMessageBox.Yes:
+                return
+        box = self.dir_widgets.pop(d)
+        for edits in (self.dir_name_edits, self.items_lists, self.submenu_radius_edits, self.threshold_ratio_edits,
+                      self.item_size_edits, self.remove_sector_btns):
+            edits.pop(d, None)
+        box.deleteLater()
+        self._update_sector_buttons()
+
+    def _capture_activation(self):
+        dlg = HotkeyCaptureDialog(self, single_key_mode=False) 
+        result_code = dlg.exec_() 
+        if result_code == QtWidgets.QDialog.Accepted and dlg.result:
+            self.combo_edit.setText(dlg.result)
+            
+    def _save(self):
+        new_combo = self.combo_edit.text().strip().lower()
+        if not new_combo:
+            QtWidgets.QMessageBox.warning(self, "Error", "Activation hotkey combo cannot be empty.")
+            return
+
+        self.cfg["activation"]["combo"] = new_combo
+        self.cfg["activation"]["mode"] = "hook" if self.hook_mode_check.isChecked() else "poll"
+        self.cfg["activation"]["marking_delay_ms"] = int(self.marking_delay_edit.text() or 0)
+        self.cfg["activation"]["release_debounce_ms"] = int(self.release_debounce_edit.text() or 0)
+        self.cfg["activation"].pop("modifier", None)
+        self.cfg["activation"].pop("key", None)
+
+        try:
+            new_main_radius = int(self.main_radius_edit.text())
+            self.cfg["visual"]["main_radius"] = max(10, new_main_radius)
+            self.cfg["visual"]["max_fps"] = max(0, int(self.max_fps_edit.text() or 0))
+            actions_cfg = self.cfg.setdefault("actions", dict(DEFAULT_CONFIG["actions"]))
+            actions_cfg["policy"] = self.action_policy_combo.currentText()
+            actions_cfg["paste_threshold"] = max(1, int(self.paste_threshold_edit.text()))
+
+        except ValueError:
+            QtWidgets.QMessageBox.warning(self, "Error", "Global visual settings must be valid numbers.")
+            return
+
+        # Удалённые сектора пропадают, новые добавляются в порядке списка
+        old_directions = self.cfg["directions"]
+        self.cfg["directions"] = {d: old_directions.get(d, {}) for d in self.dir_name_edits}
+        
+        for d, edit in self.dir_name_edits.items():
+            
+            # 1. Update Direction Label
+            self.cfg["directions"][d]["label"] = edit.text().strip() or d.capitalize()
+            
+            # 2. Update Per-Submenu Visuals 
+            try:
+                new_submenu_radius = int(self.submenu_radius_edits[d].text())
+                
+                # Считываем как процент и переводим в ratio
+                # Используем .text().replace(',', '.') для надежного парсинга
+                threshold_text = self.threshold_ratio_edits[d].text().replace(',', '.')
+                new_threshold_percent = float(threshold_text)
+                
+                new_threshold_ratio = new_threshold_percent / 100.0
+                
+                new_item_size = int(self.item_size_edits[d].text())
+                
+                self.cfg["directions"][d]["submenu_radius"] = max(20, new_submenu_radius)
+                self.cfg["directions"][d]["threshold_ratio"] = max(0.1, min(1.0, new_threshold_ratio)) # Ограничение 0.1 до 1.0
+                self.cfg["directions"][d]["item_size"] = max(10, min(100, new_item_size))
+                
+            except ValueError:
+                QtWidgets.QMessageBox.warning(self, "Error", f"Visual settings for {d.upper()} must be valid numbers.")
+                return
+
+            # 3. Update Items
+            lw = self.items_lists[d]
+            new_items = []
+            for i in range(lw.count()):
+                it = lw.item(i).data(QtCore.Qt.UserRole)
+                if it:
+                    new_items.append(it)
+            self.cfg["directions"][d]["items"] = new_items
+        
+        save_config(self.cfg)
+        
+        # ОТПРАВКА СИГНАЛА об успешном сохранении
+        self.config_saved.emit()
+        
+        if self.save_callback:
+            self.save_callback()
+            
+        QtWidgets.QMessageBox.information(self, "Saved", f"Saved to {PieTest.CONFIG_PATH}")
+        self.close()
@@ -2,129 +2,2342 @@ import sys
 import os
 import json
 import math
+import platform
+import queue
+import shutil
 import threading
 import time
+import collections
+import contextlib
+import types
 from pathlib import Path
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Union, Callable, Sequence
+
+# Отметка для --profile-startup: дальше импорт Qt и тело модуля
+_IMPORT_STARTED_NS = time.perf_counter_ns()
 
 from PyQt5 import QtCore, QtGui, QtWidgets
-import keyboard
-import mouse 
 
-# ------------------------------
-# Конфигурация / utils
-# ------------------------------
+# ------------------------------
+# Конфигурация / utils
+# ------------------------------
+
+# ИСПРАВЛЕНИЕ ДЛЯ EXE: Определение пути к папке скрипта/исполняемого файла
+if getattr(sys, 'frozen', False):
+    # Приложение упаковано (EXE)
+    SCRIPT_DIR = Path(sys.executable).parent
+else:
+    # Обычный скрипт Python
+    SCRIPT_DIR = Path(__file__).parent
+    
+CONFIG_PATH = SCRIPT_DIR / "radial_config.json"
+CONFIG_BACKUP_PATH = SCRIPT_DIR / "radial_config.json.bak"
+
+DEFAULT_SUBMENU_CONFIG = {
+    "submenu_radius": 110,     # Расстояние элементов подменю от центра (px)
+    "threshold_ratio": 0.6,    # Коэффициент порога от main_radius (0.1 - 1.0)
+    "item_size": 30            # Радиус элементов подменю (шариков) (px)
+}
+
+# Политики исполнителя действий (см. ActionExecutor)
+ACTION_POLICIES = ("queue", "coalesce", "cancel")
+
+# Способы ввода текста элемента: "auto" - вставка для длинного текста, иначе посимвольно
+TEXT_INJECT_MODES = ("auto", "type", "paste")
+
+# Версия схемы radial_config.json (файлы без "version" - версия 0)
+CONFIG_VERSION = 2
+
+# Направления главного меню по умолчанию (в схеме v1 - единственно возможные)
+DIRECTIONS = ("north", "east", "south", "west")
+
+# Допустимое число секторов главного меню; сектора идут по часовой стрелке начиная с верхнего
+MIN_SECTORS = 2
+MAX_SECTORS = 12
+
+# Типы элементов подменю ("submenu" - вложенное подменю со своими items, "macro" - последовательность steps)
+ITEM_TYPES = ("hotkey", "text", "hotkey_and_text", "submenu", "macro")
+
+# Шаги макроса: {"chord": "ctrl+c"}, {"hold": "w", "ms": 200}, {"text": "..."}, {"delay": 50}
+MACRO_STEP_KINDS = ("chord", "hold", "text", "delay")
+MAX_MACRO_STEPS = 256
+
+# Максимальная глубина вложенных подменю (уровень направления - первый)
+MAX_MENU_DEPTH = 8
+
+# Профиль с направлениями верхнего уровня конфигурации (используется, когда ни один профиль не подошёл)
+DEFAULT_PROFILE = "default"
+
+# Задержки ввода хранятся по машинам: ключ - сетевое имя компьютера
+MACHINE_ID = platform.node() or "default"
+
+# Задержки ввода до калибровки (мс): между шагами комбинации и от комбинации до текста
+DEFAULT_TIMING = {"key_step_ms": 10.0, "text_gap_ms": 50.0}
+
+DEFAULT_CONFIG = {
+    "version": CONFIG_VERSION,
+    "activation": {
+        "combo": "alt+x",
+        "mode": "hook",            # "hook" - по событиям хуков, "poll" - опрос таймером
+        "marking_delay_ms": 0,     # Режим разметки: меню показывается, только если курсор замер дольше (0 - сразу)
+        "release_debounce_ms": 10  # Отпускание активатора засчитывается, если нажатие не вернулось за это время
+    },
+    "visual": {
+        "main_radius": 60,         # Радиус главного меню/порога (px)
+        "timer_interval_ms": 25,   # Интервал таймера мониторинга (ms)
+        "max_fps": 0,              # Потолок частоты кадров оверлея (0 - частота экрана)
+        "theme": "black_red"
+    },
+    "actions": {
+        "policy": "queue",         # "queue" | "coalesce" | "cancel" - что делать с новым выбором, пока выполняется предыдущий
+        "queue_size": 8,           # Максимум ожидающих действий
+        "watchdog_ms": 3000,       # Через сколько мс зависшее действие бросается, а поток исполнителя пересоздаётся
+        "paste_threshold": 64,     # Текст с режимом "auto" не короче этого (символов) вставляется через буфер обмена
+        "paste_chord": "ctrl+v",   # Комбинация вставки
+        "paste_restore_ms": 150    # Через сколько мс после вставки вернуть прежнее содержимое буфера
+    },
+    "directions": {
+        "north": {"label": "North", "items": [], **DEFAULT_SUBMENU_CONFIG},
+        "east": {"label": "East", "items": [], **DEFAULT_SUBMENU_CONFIG},
+        "south": {"label": "South", "items": [], **DEFAULT_SUBMENU_CONFIG},
+        "west": {"label": "West", "items": [], **DEFAULT_SUBMENU_CONFIG}
+    },
+    # Профили приложений: {"имя": {"match": {"window_class": ..., "title": ...}, "directions": {...}}}
+    "profiles": {},
+    # Откалиброванные задержки ввода: {"имя компьютера": {"key_step_ms": ..., "text_gap_ms": ...}}
+    "timing": {}
+}
+
+# ------------------------------
+# Модель конфигурации
+# ------------------------------
+
+class _FrozenModel:
+    """База моделей конфигурации: __slots__, запрет изменения после создания, сравнение по значению."""
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._values() == other._values()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+def _section(raw: Dict, key: str, where: str) -> Dict:
+    value = raw.get(key, {})
+    if not isinstance(value, dict):
+        raise ValueError(f"{where}{key}: expected an object, got {type(value).__name__}")
+    return value
+
+def _as_str(value) -> str:
+    return value if type(value) is str else str(value)
+
+def _number(raw: Dict, key: str, default, where: str, cast=int):
+    try:
+        return cast(raw.get(key, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"{where}{key}: expected a number, got {raw.get(key)!r}")
+
+
+class ActivationConfig(_FrozenModel):
+    __slots__ = ("combo", "mode", "marking_delay_ms", "release_debounce_ms")
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "ActivationConfig":
+        defaults = DEFAULT_CONFIG["activation"]
+        mode = raw.get("mode")
+        return cls(
+            combo=str(raw.get("combo", defaults["combo"])).strip().lower() or defaults["combo"],
+            mode=mode if mode in ("hook", "poll") else defaults["mode"],
+            marking_delay_ms=max(0, _number(raw, "marking_delay_ms", defaults["marking_delay_ms"], "activation.")),
+            release_debounce_ms=max(0, _number(raw, "release_debounce_ms", defaults["release_debounce_ms"], "activation.")),
+        )
+
+    @property
+    def marking(self) -> bool:
+        return self.marking_delay_ms > 0
+
+    def to_dict(self) -> Dict:
+        return {"combo": self.combo, "mode": self.mode, "marking_delay_ms": self.marking_delay_ms,
+                "release_debounce_ms": self.release_debounce_ms}
+
+
+class VisualConfig(_FrozenModel):
+    __slots__ = ("main_radius", "timer_interval_ms", "max_fps", "theme")
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "VisualConfig":
+        defaults = DEFAULT_CONFIG["visual"]
+        return cls(
+            main_radius=_number(raw, "main_radius", defaults["main_radius"], "visual."),
+            timer_interval_ms=_number(raw, "timer_interval_ms", defaults["timer_interval_ms"], "visual."),
+            max_fps=max(0, _number(raw, "max_fps", defaults["max_fps"], "visual.")),
+            theme=str(raw.get("theme", defaults["theme"])),
+        )
+
+    def to_dict(self) -> Dict:
+        return {"main_radius": self.main_radius, "timer_interval_ms": self.timer_interval_ms,
+                "max_fps": self.max_fps, "theme": self.theme}
+
+
+class ActionsConfig(_FrozenModel):
+    __slots__ = ("policy", "queue_size", "watchdog_ms", "paste_threshold", "paste_chord", "paste_restore_ms")
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "ActionsConfig":
+        defaults = DEFAULT_CONFIG["actions"]
+        policy = raw.get("policy")
+        return cls(
+            policy=policy if policy in ACTION_POLICIES else defaults["policy"],
+            queue_size=_number(raw, "queue_size", defaults["queue_size"], "actions."),
+            watchdog_ms=_number(raw, "watchdog_ms", defaults["watchdog_ms"], "actions."),
+            paste_threshold=_number(raw, "paste_threshold", defaults["paste_threshold"], "actions."),
+            paste_chord=str(raw.get("paste_chord", defaults["paste_chord"])),
+            paste_restore_ms=_number(raw, "paste_restore_ms", defaults["paste_restore_ms"], "actions."),
+        )
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ItemConfig(_FrozenModel):
+    """
+    Элемент подменю. value - текст для типов text/hotkey_and_text, inject - способ ввода текста.
+    У "submenu" items - все вложенные элементы, children - только те, что можно выбрать.
+    У "macro" steps - кортежи (вид, значение, мс) в порядке выполнения.
+    """
+    __slots__ = ("label", "type", "keys", "value", "inject", "items", "children", "steps")
+
+    @classmethod
+    def from_dict(cls, raw: Dict, where: str = "", depth: int = 1) -> "ItemConfig":
+        # Элементов могут быть тысячи: без **kwargs и лишних преобразований уже готовых строк
+        if not isinstance(raw, dict):
+            raise ValueError(f"{where}: expected an object, got {type(raw).__name__}")
+        get = raw.get
+        item_type = get("type", "hotkey")
+        if item_type not in ITEM_TYPES:
+            raise ValueError(f"{where}.type: unknown item type {item_type!r}")
+        inject = get("inject", "auto")
+        item = object.__new__(cls)
+        init = object.__setattr__
+        init(item, "label", _as_str(get("label", "")))
+        init(item, "type", item_type)
+        init(item, "keys", _as_str(get("keys", "")))
+        init(item, "value", _as_str(get("value", "")))
+        init(item, "inject", inject if inject in TEXT_INJECT_MODES else "auto")
+        if item_type == "submenu":
+            if depth >= MAX_MENU_DEPTH:
+                raise ValueError(f"{where}: submenus are nested deeper than {MAX_MENU_DEPTH} levels")
+            items = _parse_items(get("items", []), f"{where}.items", depth + 1)
+            init(item, "items", items)
+            init(item, "children", _actionable(items))
+        else:
+            init(item, "items", ())
+            init(item, "children", ())
+        init(item, "steps", _parse_macro_steps(get("steps", []), f"{where}.steps") if item_type == "macro" else ())
+        return item
+
+    @property
+    def has_text(self) -> bool:
+        return self.type in ("text", "hotkey_and_text")
+
+    @property
+    def has_hotkey(self) -> bool:
+        return self.type in ("hotkey", "hotkey_and_text") and bool(self.keys)
+
+    @property
+    def is_submenu(self) -> bool:
+        return self.type == "submenu"
+
+    @property
+    def is_macro(self) -> bool:
+        return self.type == "macro"
+
+    def to_dict(self) -> Dict:
+        # Тот же вид, что создаёт окно настроек: только значимые для типа поля
+        out = {"label": self.label}
+        if self.is_submenu:
+            out["type"] = self.type
+            out["items"] = [it.to_dict() for it in self.items]
+            return out
+        if self.is_macro:
+            out["type"] = self.type
+            out["steps"] = [macro_step_to_dict(step) for step in self.steps]
+            return out
+        if self.type != "text":
+            out["keys"] = self.keys
+        out["type"] = self.type
+        if self.has_text:
+            out["value"] = self.value
+        if self.inject != "auto":
+            out["inject"] = self.inject
+        return out
+
+
+def _parse_items(raw_items, where: str, depth: int = 1) -> tuple:
+    if not isinstance(raw_items, list):
+        raise ValueError(f"{where}: expected a list")
+    from_dict = ItemConfig.from_dict
+    try:
+        return tuple([from_dict(it, "", depth) for it in raw_items])
+    except ValueError:
+        # Повторный проход только ради пути к ошибочному элементу
+        for i, it in enumerate(raw_items):
+            from_dict(it, f"{where}[{i}]", depth)
+        raise
+
+def _actionable(items: tuple) -> tuple:
+    """Элементы, которые можно выбрать: с действием, непустой макрос или непустое подменю."""
+    return tuple(it for it in items if it.keys or it.value or it.steps or it.children)
+
+def _macro_ms(value, where: str) -> int:
+    try:
+        ms = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{where}: expected a number, got {value!r}")
+    if ms < 0:
+        raise ValueError(f"{where}: must not be negative")
+    return ms
+
+def _parse_macro_steps(raw_steps, where: str) -> tuple:
+    """Разбирает шаги макроса в кортежи (вид, значение, мс): ("chord", "ctrl+c", 0), ("delay", "", 50)."""
+    if not isinstance(raw_steps, list):
+        raise ValueError(f"{where}: expected a list")
+    if len(raw_steps) > MAX_MACRO_STEPS:
+        raise ValueError(f"{where}: more than {MAX_MACRO_STEPS} steps")
+    steps = []
+    for i, raw in enumerate(raw_steps):
+        at = f"{where}[{i}]"
+        if not isinstance(raw, dict):
+            raise ValueError(f"{at}: expected an object, got {type(raw).__name__}")
+        kinds = [kind for kind in MACRO_STEP_KINDS if kind in raw]
+        if len(kinds) != 1:
+            raise ValueError(f"{at}: expected exactly one of {', '.join(MACRO_STEP_KINDS)}")
+        kind = kinds[0]
+        if kind == "delay":
+            steps.append((kind, "", _macro_ms(raw[kind], f"{at}.delay")))
+            continue
+        value = _as_str(raw[kind])
+        if not value.strip():
+            raise ValueError(f"{at}.{kind}: must not be empty")
+        ms = _macro_ms(raw.get("ms", 0), f"{at}.ms") if kind == "hold" else 0
+        steps.append((kind, value, ms))
+    return tuple(steps)
+
+def macro_step_to_dict(step: tuple) -> Dict:
+    kind, value, ms = step
+    if kind == "delay":
+        return {"delay": ms}
+    if kind == "hold":
+        return {"hold": value, "ms": ms}
+    return {kind: value}
+
+def iter_leaf_items(items: Sequence[ItemConfig]):
+    """Обходит дерево элементов и выдаёт все элементы-действия (не подменю)."""
+    for it in items:
+        if it.is_submenu:
+            yield from iter_leaf_items(it.items)
+        else:
+            yield it
+
+
+class DirectionConfig(_FrozenModel):
+    """Направление главного меню и его подменю. items - все элементы, actionable - только те, что можно выбрать."""
+    __slots__ = ("name", "label", "submenu_radius", "threshold_ratio", "item_size", "items", "actionable")
+
+    @classmethod
+    def from_dict(cls, name: str, raw: Dict, prefix: str = "") -> "DirectionConfig":
+        where = f"{prefix}directions.{name}."
+        items = _parse_items(raw.get("items", []), f"{where}items")
+        return cls(
+            name=name,
+            label=str(raw.get("label") or name.capitalize()),
+            submenu_radius=_number(raw, "submenu_radius", DEFAULT_SUBMENU_CONFIG["submenu_radius"], where),
+            threshold_ratio=_number(raw, "threshold_ratio", DEFAULT_SUBMENU_CONFIG["threshold_ratio"], where, float),
+            item_size=_number(raw, "item_size", DEFAULT_SUBMENU_CONFIG["item_size"], where),
+            items=items,
+            actionable=_actionable(items),
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "label": self.label,
+            "items": [it.to_dict() for it in self.items],
+            "submenu_radius": self.submenu_radius,
+            "threshold_ratio": self.threshold_ratio,
+            "item_size": self.item_size,
+        }
+
+
+def _parse_directions(raw: Dict, prefix: str = "") -> types.MappingProxyType:
+    raw_dirs = _section(raw, "directions", prefix)
+    if not MIN_SECTORS <= len(raw_dirs) <= MAX_SECTORS:
+        raise ValueError(f"{prefix}directions: expected {MIN_SECTORS}-{MAX_SECTORS} sectors, got {len(raw_dirs)}")
+    # Порядок направлений в файле задаёт порядок секторов
+    directions = {}
+    for d in raw_dirs:
+        directions[d] = DirectionConfig.from_dict(d, _section(raw_dirs, d, f"{prefix}directions."), prefix)
+    return types.MappingProxyType(directions)
+
+
+class ProfileConfig(_FrozenModel):
+    """
+    Профиль приложения: свой набор направлений для окон, у которых класс или заголовок
+    содержит заданную строку (без учёта регистра). Пустая строка условия не проверяется.
+    """
+    __slots__ = ("name", "window_class", "title", "directions")
+
+    @classmethod
+    def from_dict(cls, name: str, raw: Dict) -> "ProfileConfig":
+        where = f"profiles.{name}."
+        match = _section(raw, "match", where)
+        window_class = _as_str(match.get("window_class", "")).strip()
+        title = _as_str(match.get("title", "")).strip()
+        if not (window_class or title):
+            raise ValueError(f"{where}match: expected window_class and/or title")
+        return cls(
+            name=name,
+            window_class=window_class,
+            title=title,
+            directions=_parse_directions(raw, where),
+        )
+
+    def matches(self, window: "WindowInfo") -> bool:
+        if self.window_class and self.window_class.lower() not in window.window_class.lower():
+            return False
+        if self.title and self.title.lower() not in window.title.lower():
+            return False
+        return True
+
+    def to_dict(self) -> Dict:
+        match = {}
+        if self.window_class:
+            match["window_class"] = self.window_class
+        if self.title:
+            match["title"] = self.title
+        return {
+            "match": match,
+            "directions": {d: dir_cfg.to_dict() for d, dir_cfg in self.directions.items()},
+        }
+
+
+class TimingConfig(_FrozenModel):
+    """Задержки ввода одной машины (мс): пауза между шагами комбинации и от комбинации до текста."""
+    __slots__ = ("key_step_ms", "text_gap_ms")
+
+    @classmethod
+    def from_dict(cls, raw: Dict, where: str = "") -> "TimingConfig":
+        values = {}
+        for key in cls.__slots__:
+            value = _number(raw, key, DEFAULT_TIMING[key], where, float)
+            if value < 0:
+                raise ValueError(f"{where}{key}: must not be negative")
+            values[key] = value
+        return cls(**values)
+
+    def to_dict(self) -> Dict:
+        return {"key_step_ms": self.key_step_ms, "text_gap_ms": self.text_gap_ms}
+
+    @property
+    def key_step_s(self) -> float:
+        return self.key_step_ms / 1000.0
+
+    @property
+    def text_gap_s(self) -> float:
+        return self.text_gap_ms / 1000.0
+
+
+DEFAULT_TIMING_CONFIG = TimingConfig.from_dict({})
+
+
+class RadialConfig(_FrozenModel):
+    """
+    Проверенный, неизменяемый снимок конфигурации со всеми подставленными дефолтами.
+    На диске остаётся JSON: from_dict мигрирует старые версии схемы, to_dict возвращает текущую.
+    """
+    __slots__ = ("version", "activation", "visual", "actions", "directions", "profiles", "timing")
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "RadialConfig":
+        if not isinstance(raw, dict):
+            raise ValueError("config: expected an object")
+        raw = _migrate_config(raw)
+        raw_profiles = _section(raw, "profiles", "")
+        # Порядок профилей в файле задаёт приоритет при сопоставлении с окном
+        profiles = {}
+        for name in raw_profiles:
+            if name == DEFAULT_PROFILE:
+                raise ValueError(f"profiles.{name}: name is reserved for the top-level directions")
+            profiles[name] = ProfileConfig.from_dict(name, _section(raw_profiles, name, "profiles."))
+        raw_timing = _section(raw, "timing", "")
+        timing = {machine: TimingConfig.from_dict(_section(raw_timing, machine, "timing."), f"timing.{machine}.")
+                  for machine in raw_timing}
+        return cls(
+            version=CONFIG_VERSION,
+            activation=ActivationConfig.from_dict(_section(raw, "activation", "")),
+            visual=VisualConfig.from_dict(_section(raw, "visual", "")),
+            actions=ActionsConfig.from_dict(_section(raw, "actions", "")),
+            directions=_parse_directions(raw),
+            profiles=types.MappingProxyType(profiles),
+            timing=types.MappingProxyType(timing),
+        )
+
+    def profile_directions(self, profile: str) -> types.MappingProxyType:
+        """Направления профиля (DEFAULT_PROFILE - направления верхнего уровня)."""
+        if profile == DEFAULT_PROFILE:
+            return self.directions
+        return self.profiles[profile].directions
+
+    def profile_view(self, profile: str) -> "RadialConfig":
+        """Снимок, в котором направления верхнего уровня заменены направлениями профиля."""
+        if profile == DEFAULT_PROFILE:
+            return self
+        return RadialConfig(
+            version=self.version, activation=self.activation, visual=self.visual, actions=self.actions,
+            directions=self.profiles[profile].directions, profiles=types.MappingProxyType({}), timing=self.timing,
+        )
+
+    def machine_timing(self, machine: str = MACHINE_ID) -> TimingConfig:
+        """Задержки ввода, откалиброванные на этой машине, иначе значения по умолчанию."""
+        return self.timing.get(machine, DEFAULT_TIMING_CONFIG)
+
+    def match_profile(self, window: Optional["WindowInfo"]) -> str:
+        """Первый по порядку профиль, подходящий окну, иначе DEFAULT_PROFILE."""
+        if window is not None:
+            for profile in self.profiles.values():
+                if profile.matches(window):
+                    return profile.name
+        return DEFAULT_PROFILE
+
+    def to_dict(self) -> Dict:
+        """Изменяемая JSON-копия (для окна настроек и сохранения)."""
+        return {
+            "version": self.version,
+            "activation": self.activation.to_dict(),
+            "visual": self.visual.to_dict(),
+            "actions": self.actions.to_dict(),
+            "directions": {d: dir_cfg.to_dict() for d, dir_cfg in self.directions.items()},
+            "profiles": {name: profile.to_dict() for name, profile in self.profiles.items()},
+            "timing": {machine: timing.to_dict() for machine, timing in self.timing.items()},
+        }
+
+# ------------------------------
+# Миграции схемы: один шаг на каждую старую версию
+# ------------------------------
+
+def _migrate_v0(cfg: Dict) -> Dict:
+    """v0 (без "version"): activation.modifier/key и глобальные visual.radius/threshold/submenu_radius."""
+    act_cfg = cfg.get("activation")
+    if isinstance(act_cfg, dict) and "combo" not in act_cfg:
+        act_cfg = cfg["activation"] = dict(act_cfg)
+        mod = act_cfg.pop("modifier", "alt")
+        key = act_cfg.pop("key", "x")
+        act_cfg["combo"] = f"{mod}+{key}"
+    
+    vis_cfg = cfg.get("visual")
+    if isinstance(vis_cfg, dict):
+        vis_cfg = cfg["visual"] = dict(vis_cfg)
+        main_rad = vis_cfg.pop("radius", None)
+        if main_rad is not None and "main_radius" not in vis_cfg:
+            vis_cfg["main_radius"] = main_rad
+        # Глобальные параметры подменю заменены настройками каждого направления
+        vis_cfg.pop("threshold", None)
+        vis_cfg.pop("submenu_radius", None)
+        vis_cfg.pop("threshold_ratio", None)
+    return cfg
+
+def _migrate_v1(cfg: Dict) -> Dict:
+    """
+    v1: недостающие стороны света дополнялись при загрузке. С v2 сектора задаются списком:
+    файл только со сторонами света дополняется до четырёх, как раньше, а собственная раскладка
+    (любые другие имена секторов) сохраняется как есть, в порядке файла.
+    """
+    raw_dirs = cfg.get("directions")
+    raw_dirs = raw_dirs if isinstance(raw_dirs, dict) else {}
+    if all(d in DIRECTIONS for d in raw_dirs):
+        cfg["directions"] = {d: raw_dirs.get(d, {}) for d in DIRECTIONS}
+    return cfg
+
+_MIGRATIONS: Dict[int, Callable[[Dict], Dict]] = {
+    0: _migrate_v0,
+    1: _migrate_v1,
+}
+
+def _migrate_config(raw: Dict) -> Dict:
+    """Приводит сырой JSON к текущей версии схемы (исходный словарь не меняется: шаги копируют то, что правят)."""
+    cfg = dict(raw)
+    version = cfg.pop("version", 0)
+    if not isinstance(version, int) or version < 0:
+        raise ValueError(f"version: invalid schema version {version!r}")
+    if version > CONFIG_VERSION:
+        raise ValueError(f"version: schema {version} is newer than supported {CONFIG_VERSION}")
+    while version < CONFIG_VERSION:
+        cfg = _MIGRATIONS[version](cfg)
+        version += 1
+    return cfg
+
+
+# Ошибки последней загрузки файла конфигурации (контроллер показывает их вместе с config_errors)
+CONFIG_LOAD_ERRORS: List[str] = []
+
+def load_config() -> RadialConfig:
+    """
+    Читает radial_config.json. Значения по умолчанию записываются только при отсутствии файла:
+    неразборчивый или неверный файл не трогается (копия - в radial_config.json.bak),
+    ошибка попадает в CONFIG_LOAD_ERRORS, а работа продолжается на умолчаниях в памяти.
+    """
+    CONFIG_LOAD_ERRORS.clear()
+    if not CONFIG_PATH.exists():
+        save_config(DEFAULT_CONFIG)
+        return RadialConfig.from_dict(DEFAULT_CONFIG)
+    
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            return RadialConfig.from_dict(json.load(f))
+            
+    except Exception as e:
+        print("Failed loading config, using defaults (file left unchanged):", e)
+        CONFIG_LOAD_ERRORS.append(f"{CONFIG_PATH.name}: {e} (running on defaults)")
+        backup_config()
+        return RadialConfig.from_dict(DEFAULT_CONFIG)
+
+def backup_config():
+    """Копирует файл конфигурации в radial_config.json.bak (файл не загрузился - правка пользователя не теряется)."""
+    try:
+        shutil.copyfile(CONFIG_PATH, CONFIG_BACKUP_PATH)
+    except OSError as e:
+        print("Failed backing up config:", e)
+
+def save_config(cfg: Union[Dict, RadialConfig]):
+    if isinstance(cfg, RadialConfig):
+        cfg = cfg.to_dict()
+    # Файл на диске не загрузился: перед перезаписью сохраняем копию того, что там сейчас
+    if CONFIG_LOAD_ERRORS and CONFIG_PATH.exists():
+        backup_config()
+    try:
+        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, indent=4, ensure_ascii=False)
+    except Exception as e:
+        print("Failed saving config:", e)
+
+def save_machine_timing(timing: "TimingConfig", machine_id: str = MACHINE_ID) -> Optional[str]:
+    """
+    Записывает задержки машины в timing[machine_id] файла, не трогая остальное содержимое:
+    правки, сделанные в файле после загрузки, сохраняются. Неразборчивый файл не перезаписывается -
+    возвращается текст ошибки (None - записано).
+    """
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        if not isinstance(raw, dict):
+            raise ValueError("expected a JSON object")
+        timings = raw.setdefault("timing", {})
+        if not isinstance(timings, dict):
+            raise ValueError("timing: expected an object")
+    except (OSError, ValueError) as e:
+        return f"{CONFIG_PATH.name}: {e}"
+    timings[machine_id] = timing.to_dict()
+    save_config(raw)
+    return None
+
+
+class ConfigChanges:
+    """Какие разделы конфигурации, направления и профили изменились между двумя снимками."""
+    __slots__ = ("activation", "visual", "actions", "directions", "profiles", "timing")
+
+    def __init__(self, activation: bool = False, visual: bool = False, actions: bool = False,
+                 directions: frozenset = frozenset(), profiles: frozenset = frozenset(), timing: bool = False):
+        self.activation = activation
+        self.visual = visual
+        self.actions = actions
+        self.directions = directions
+        self.profiles = profiles
+        self.timing = timing  # изменились задержки ввода этой машины
+
+    @property
+    def empty(self) -> bool:
+        return not (self.activation or self.visual or self.actions or self.directions or self.profiles or self.timing)
+
+    def __repr__(self):
+        return (f"ConfigChanges(activation={self.activation}, visual={self.visual}, "
+                f"actions={self.actions}, directions={sorted(self.directions)}, profiles={sorted(self.profiles)}, "
+                f"timing={self.timing})")
+
+
+def diff_config(old: RadialConfig, new: RadialConfig) -> ConfigChanges:
+    """Сравнивает два снимка по разделам; направления и профили сравниваются по отдельности."""
+    old_dirs = old.directions
+    new_dirs = new.directions
+    old_profiles = old.profiles
+    new_profiles = new.profiles
+    return ConfigChanges(
+        activation=old.activation != new.activation,
+        visual=old.visual != new.visual,
+        actions=old.actions != new.actions,
+        directions=frozenset(d for d in set(old_dirs) | set(new_dirs) if old_dirs.get(d) != new_dirs.get(d)),
+        profiles=frozenset(p for p in set(old_profiles) | set(new_profiles) if old_profiles.get(p) != new_profiles.get(p)),
+        timing=old.machine_timing() != new.machine_timing(),
+    )
+
+
+class ConfigReloader(QtCore.QObject):
+    """
+    Следит за файлом конфигурации через QFileSystemWatcher (сохранение из настроек и ручные правки)
+    и сводит серию записей к одному разбору. Наружу отдаёт готовый снимок и список изменений.
+    """
+    # (новый конфиг, ConfigChanges)
+    reloaded = QtCore.pyqtSignal(object, object)
+    # Файл изменился, но не загрузился (текст ошибки); рабочая конфигурация остаётся прежней
+    failed = QtCore.pyqtSignal(str)
+
+    # Окно, в котором серия записей схлопывается в одну перезагрузку
+    DEBOUNCE_MS = 150
+
+    def __init__(self, current_cfg: RadialConfig, is_busy: Optional[Callable[[], bool]] = None, parent=None):
+        super().__init__(parent)
+        self._current = current_cfg
+        self._is_busy = is_busy
+        self._last_raw = self._read_raw()
+        self.reloads = 0
+        
+        self._debounce = QtCore.QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._reload)
+        
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self.schedule)
+        # Каталог тоже: редакторы часто заменяют файл целиком, и слежение за ним теряется
+        self._watcher.directoryChanged.connect(self.schedule)
+        self._watch()
+
+    def _watch(self):
+        for path in (str(CONFIG_PATH.parent), str(CONFIG_PATH)):
+            if os.path.exists(path) and path not in self._watcher.files() + self._watcher.directories():
+                self._watcher.addPath(path)
+
+    @staticmethod
+    def _read_raw() -> Optional[bytes]:
+        try:
+            return CONFIG_PATH.read_bytes()
+        except OSError:
+            return None
+
+    @QtCore.pyqtSlot()
+    @QtCore.pyqtSlot(str)
+    def schedule(self, *_):
+        """Запрашивает перезагрузку; повторные запросы в пределах окна продлевают его."""
+        self._debounce.start()
+
+    def _reload(self):
+        self._watch()
+        # Пока меню открыто, снимок не подменяем - откладываем до закрытия
+        if self._is_busy is not None and self._is_busy():
+            self._debounce.start()
+            return
+        
+        raw = self._read_raw()
+        if raw is None or raw == self._last_raw:
+            return
+        try:
+            new_cfg = RadialConfig.from_dict(json.loads(raw.decode("utf-8")))
+        except Exception as e:
+            # Недописанный или ошибочный файл не затирает рабочую конфигурацию; ошибка видна как при запуске
+            print("Config reload failed, keeping current config:", e)
+            self._last_raw = raw
+            CONFIG_LOAD_ERRORS[:] = [f"{CONFIG_PATH.name}: {e} (keeping the previous config)"]
+            backup_config()
+            self.failed.emit(CONFIG_LOAD_ERRORS[0])
+            return
+        self._last_raw = raw
+        # Файл снова разбирается: ошибка загрузки при запуске больше не актуальна
+        CONFIG_LOAD_ERRORS.clear()
+        
+        changes = diff_config(self._current, new_cfg)
+        if changes.empty:
+            return
+        self._current = new_cfg
+        self.reloads += 1
+        print("Config reloaded:", changes)
+        self.reloaded.emit(new_cfg, changes)
+
+# ------------------------------
+# Метрики
+# ------------------------------
+
+class WakeupMeter:
+    """Счётчик пробуждений процесса (тики таймеров, колбэки хуков) за скользящее окно."""
+
+    def __init__(self, window_s: float = 1.0):
+        self.window_s = window_s
+        self.total = 0
+        self._stamps = collections.deque()
+        self._lock = threading.Lock()
+
+    def tick(self, *_):
+        """Регистрирует одно пробуждение. Безопасно вызывать из потоков хуков."""
+        now = time.monotonic()
+        with self._lock:
+            self.total += 1
+            self._stamps.append(now)
+            self._prune(now)
+
+    def per_second(self) -> float:
+        """Количество пробуждений в секунду за последнее окно."""
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._stamps) / self.window_s
+
+    def _prune(self, now: float):
+        cutoff = now - self.window_s
+        while self._stamps and self._stamps[0] < cutoff:
+            self._stamps.popleft()
+
+# Глобальный счётчик: таймеры и хуки всего процесса отмечаются здесь
+WAKEUPS = WakeupMeter()
+
+
+class LatencyHistogram:
+    """
+    Скользящая гистограмма в стиле HDR: значения (нс) раскладываются по логарифмическим
+    диапазонам с линейным делением внутри (точность ~3%), хранятся последние window замеров.
+    """
+
+    SUB_BUCKET_BITS = 5
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    HALF_BUCKETS = SUB_BUCKETS // 2
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.total = 0
+        self._counts: Dict[int, int] = {}
+        self._recent = collections.deque()
+        self._max_recent = collections.deque()
+
+    @classmethod
+    def bucket_index(cls, value: int) -> int:
+        if value < cls.SUB_BUCKETS:
+            return max(0, value)
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS
+        return cls.SUB_BUCKETS + (shift - 1) * cls.HALF_BUCKETS + ((value >> shift) - cls.HALF_BUCKETS)
+
+    @classmethod
+    def bucket_value(cls, index: int) -> int:
+        """Середина диапазона бакета."""
+        if index < cls.SUB_BUCKETS:
+            return index
+        shift = (index - cls.SUB_BUCKETS) // cls.HALF_BUCKETS + 1
+        mantissa = (index - cls.SUB_BUCKETS) % cls.HALF_BUCKETS + cls.HALF_BUCKETS
+        return (mantissa << shift) + (1 << (shift - 1))
+
+    def record(self, value_ns: int):
+        index = self.bucket_index(int(value_ns))
+        if len(self._recent) >= self.window:
+            evicted = self._recent.popleft()
+            self._counts[evicted] -= 1
+            if not self._counts[evicted]:
+                del self._counts[evicted]
+        self._recent.append(index)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.total += 1
+
+    def __len__(self):
+        return len(self._recent)
+
+    def percentile(self, p: float) -> int:
+        """Значение (нс), ниже которого лежит p процентов замеров окна."""
+        n = len(self._recent)
+        if not n:
+            return 0
+        target = max(1, math.ceil(n * p / 100.0))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self._counts))
+
+    def snapshot(self) -> Dict:
+        """Сводка в миллисекундах."""
+        return {
+            "count": len(self._recent),
+            "total": self.total,
+            "p50_ms": round(self.percentile(50) / 1e6, 3),
+            "p95_ms": round(self.percentile(95) / 1e6, 3),
+            "p99_ms": round(self.percentile(99) / 1e6, 3),
+            "max_ms": round(self.percentile(100) / 1e6, 3),
+        }
+
+
+class LatencyTrace:
+    """Отметки времени (perf_counter_ns) одной активации: от фронта активатора до конца ввода."""
+    __slots__ = ("t0", "marks")
+
+    def __init__(self, t0: int):
+        self.t0 = t0
+        self.marks: Dict[str, int] = {}
+
+
+class LatencyTracker:
+    """Собирает задержки этапов конвейера активация -> выбор -> ввод в скользящие гистограммы."""
+
+    # Этапы в порядке прохождения; каждая гистограмма хранит смещение этапа от фронта активатора
+    STAGES = ("shown", "first_paint", "threshold", "selection", "inject_start", "inject_end")
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, LatencyHistogram] = {stage: LatencyHistogram(window) for stage in self.STAGES}
+        self.current: Optional[LatencyTrace] = None
+
+    def begin(self, t0_ns: Optional[int] = None) -> LatencyTrace:
+        """Начинает трассу новой активации (t0 - момент фронта, если он известен точнее)."""
+        trace = LatencyTrace(t0_ns if t0_ns is not None else time.perf_counter_ns())
+        with self._lock:
+            self.current = trace
+        return trace
+
+    def mark(self, stage: str, trace: Optional[LatencyTrace] = None):
+        """Отмечает этап (только первый раз за трассу). Безопасно вызывать из любого потока."""
+        now = time.perf_counter_ns()
+        with self._lock:
+            trace = trace or self.current
+            if trace is None or stage in trace.marks:
+                return
+            trace.marks[stage] = now
+            self._histogram(stage).record(now - trace.t0)
+
+    def record(self, name: str, value_ns: int):
+        """Записывает произвольную длительность в именованную гистограмму."""
+        with self._lock:
+            self._histogram(name).record(value_ns)
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = LatencyHistogram(self.window)
+        return hist
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: hist.snapshot() for name, hist in self.histograms.items()}
+
+    def format_table(self) -> str:
+        """Текстовая таблица p50/p95/p99 для окна статистики."""
+        lines = [f"{'stage':<20}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms from activation edge)"]
+        for name, snap in self.snapshot().items():
+            lines.append(f"{name:<20}{snap['count']:>6}{snap['p50_ms']:>9.2f}{snap['p95_ms']:>9.2f}{snap['p99_ms']:>9.2f}{snap['max_ms']:>9.2f}")
+        return "\n".join(lines)
+
+# Глобальный трекер задержек: этапы отмечаются из контроллера, оверлея и исполнителя
+LATENCY = LatencyTracker()
+
+
+class StartupProfile:
+    """Длительности фаз запуска (--profile-startup печатает их, когда цикл событий уже работает)."""
+
+    def __init__(self, t0_ns: int):
+        self.t0_ns = t0_ns
+        self._last_ns = t0_ns
+        self.phases: List[tuple] = []
+
+    def phase(self, name: str):
+        """Закрывает фазу, начавшуюся в конце предыдущей."""
+        now = time.perf_counter_ns()
+        self.phases.append((name, now - self._last_ns))
+        self._last_ns = now
+
+    def format_table(self) -> str:
+        lines = [f"{'phase':<24}{'ms':>9}"]
+        for name, elapsed_ns in self.phases:
+            lines.append(f"{name:<24}{elapsed_ns / 1e6:>9.2f}")
+        lines.append(f"{'total':<24}{(self._last_ns - self.t0_ns) / 1e6:>9.2f}")
+        return "\n".join(lines)
+
+METRICS_DUMP_PATH = SCRIPT_DIR / "latency_metrics.json"
+
+# ------------------------------
+# Бэкенды ввода
+# ------------------------------
+
+class InputEvent:
+    """Событие ввода, независимое от бэкенда."""
+    __slots__ = ("device", "event_type", "name", "scan_code", "x", "y", "time_ns")
+
+    KEYBOARD = "keyboard"
+    MOUSE = "mouse"
+    DOWN = "down"
+    UP = "up"
+    MOVE = "move"
+
+    def __init__(self, device: str, event_type: str, name: Optional[str] = None, scan_code: Optional[int] = None,
+                 x: Optional[int] = None, y: Optional[int] = None, time_ns: Optional[int] = None):
+        self.device = device          # "keyboard" | "mouse"
+        self.event_type = event_type  # "down" | "up" | "move"
+        self.name = name              # имя клавиши или кнопки мыши ("x", "x2", "left", ...)
+        self.scan_code = scan_code
+        self.x = x
+        self.y = y
+        self.time_ns = time_ns if time_ns is not None else time.perf_counter_ns()
+
+
+# Управляющие символы текста, которые набираются отдельными клавишами
+_TEXT_KEY_NAMES = {"\n": "enter", "\b": "backspace", "\t": "tab"}
+
+
+class InputBackend:
+    """
+    Интерфейс ввода: глобальные хуки, опрос состояния, выдача нажатий/текста и позиция курсора.
+    Колбэки хуков могут вызываться из чужого потока.
+    """
+
+    name = "base"
+
+    # Таблица нажатых клавиш, которой сообщается о каждом выданном нажатии/отпускании
+    key_state: Optional["KeyStateTable"] = None
+
+    def _note_injected(self, key, down: bool):
+        """Вызывается бэкендом перед выдачей события, чтобы его эхо в хуке не сочли физическим."""
+        table = self.key_state
+        if table is not None:
+            table.expect(key, down)
+
+    def _text_echoes(self, text: str):
+        """Контекст выдачи текста: эхо набираемых символов не попадает в таблицу нажатых клавиш."""
+        table = self.key_state
+        return table.writing(self.text_strokes(text)) if table is not None else contextlib.nullcontext()
+
+    def text_strokes(self, text: str) -> List[tuple]:
+        """
+        Нажатия (клавиша, нажатие), которыми набирается текст: заглавные буквы - с Shift.
+        Символы, для которых клавиши нет, пропускаются - их эхо таблица не ждёт.
+        """
+        strokes = []
+        for ch in text:
+            try:
+                code = self.resolve_key(_TEXT_KEY_NAMES.get(ch, ch))[0]
+                shift = self.resolve_key("shift")[0] if ch.isupper() else None
+            except (ValueError, IndexError):
+                continue
+            if shift is None:
+                strokes += [(code, True), (code, False)]
+            else:
+                strokes += [(shift, True), (code, True), (code, False), (shift, False)]
+        return strokes
+
+    def hook_keyboard(self, callback: Callable[[InputEvent], None]):
+        """Устанавливает хук клавиатуры. Возвращает дескриптор для unhook()."""
+        raise NotImplementedError
+
+    def hook_mouse(self, callback: Callable[[InputEvent], None]):
+        """Устанавливает хук мыши (кнопки и перемещения). Возвращает дескриптор для unhook()."""
+        raise NotImplementedError
+
+    def unhook(self, handle):
+        """Снимает ранее установленный хук (только его)."""
+        raise NotImplementedError
+
+    def is_key_pressed(self, key: str) -> bool:
+        """Нажата ли клавиша (имя, код из resolve_key или комбинация 'alt+x')."""
+        raise NotImplementedError
+
+    def is_mouse_pressed(self, button: str) -> bool:
+        raise NotImplementedError
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def release(self, key):
+        raise NotImplementedError
+
+    def write(self, text: str):
+        raise NotImplementedError
+
+    def resolve_key(self, name: str) -> tuple:
+        """Разрешает имя клавиши в кортеж кодов (первый используется для нажатия). ValueError - неизвестная клавиша."""
+        raise NotImplementedError
+
+    def play(self, events, cancel_event: Optional[threading.Event] = None):
+        """
+        Проигрывает заранее скомпилированные события (код, нажатие, пауза после) одной пачкой.
+        После отмены новые нажатия пропускаются, но всё уже нажатое обязательно отпускается.
+        """
+        held = []
+        try:
+            for code, down, delay in events:
+                if down:
+                    if cancel_event is not None and cancel_event.is_set():
+                        continue
+                    self.press(code)
+                    held.append(code)
+                elif code in held:
+                    self.release(code)
+                    held.remove(code)
+                else:
+                    continue
+                if delay:
+                    if cancel_event is not None:
+                        cancel_event.wait(delay)
+                    else:
+                        time.sleep(delay)
+        finally:
+            for code in reversed(held):
+                try:
+                    self.release(code)
+                except Exception:
+                    pass
+
+    def cursor_pos(self) -> QtCore.QPoint:
+        """Позиция курсора в логических координатах Qt (вызывать из GUI-потока)."""
+        return QtGui.QCursor.pos()
+
+
+class KeyboardMouseBackend(InputBackend):
+    """Реальный ввод через библиотеки keyboard и mouse (импортируются при создании)."""
+
+    name = "keyboard"
+
+    def __init__(self):
+        import keyboard
+        import mouse
+        self._keyboard = keyboard
+        self._mouse = mouse
+
+    def hook_keyboard(self, callback):
+        def _on_event(event):
+            callback(InputEvent(InputEvent.KEYBOARD, event.event_type, event.name, event.scan_code))
+        self._keyboard.hook(_on_event)
+        return ("keyboard", _on_event)
+
+    def hook_mouse(self, callback):
+        mouse = self._mouse
+
+        def _on_event(event):
+            if isinstance(event, mouse.ButtonEvent):
+                # Двойной клик приходит вместо второго нажатия
+                event_type = InputEvent.UP if event.event_type == mouse.UP else InputEvent.DOWN
+                callback(InputEvent(InputEvent.MOUSE, event_type, event.button))
+            elif isinstance(event, mouse.MoveEvent):
+                callback(InputEvent(InputEvent.MOUSE, InputEvent.MOVE, x=event.x, y=event.y))
+        mouse.hook(_on_event)
+        return ("mouse", _on_event)
+
+    def unhook(self, handle):
+        device, callback = handle
+        if device == "keyboard":
+            self._keyboard.unhook(callback)
+        else:
+            self._mouse.unhook(callback)
+
+    def is_key_pressed(self, key):
+        return self._keyboard.is_pressed(key)
+
+    def is_mouse_pressed(self, button):
+        return self._mouse.is_pressed(button=button)
+
+    def press(self, key):
+        self._note_injected(key, True)
+        self._keyboard.press(key)
+
+    def release(self, key):
+        self._note_injected(key, False)
+        self._keyboard.release(key)
+
+    def write(self, text):
+        with self._text_echoes(text):
+            self._keyboard.write(text)
+
+    def text_strokes(self, text: str) -> List[tuple]:
+        if sys.platform == "win32":
+            # keyboard.write на Windows набирает символы юникод-пакетами (без Shift);
+            # клавишами уходят только перевод строки и забой
+            text = "".join(ch for ch in text if ch in "\n\b")
+        return super().text_strokes(text)
+
+    def resolve_key(self, name):
+        # key_to_scan_codes бросает ValueError для неизвестных имён
+        return tuple(self._keyboard.key_to_scan_codes(name))
+
+
+class MemoryInputBackend(InputBackend):
+    """
+    Ввод в памяти для бенчмарков и проверок без устройств: ввод подаётся методами feed_*,
+    а все выданные нажатия и текст записываются в injected с метками perf_counter_ns.
+    Как и ОС, возвращает выданные нажатия в хуки клавиатуры (loopback).
+    """
+
+    name = "memory"
+
+    def __init__(self, loopback: bool = True):
+        self.loopback = loopback
+        self.injected: List[tuple] = []   # (time_ns, "press" | "release" | "write", key или текст)
+        self._lock = threading.Lock()
+        self._keys = set()
+        self._buttons = set()
+        self._cursor = QtCore.QPoint(0, 0)
+        self._keyboard_hooks: List[Callable] = []
+        self._mouse_hooks: List[Callable] = []
+
+    # --- хуки ---
+    def hook_keyboard(self, callback):
+        with self._lock:
+            self._keyboard_hooks.append(callback)
+        return ("keyboard", callback)
+
+    def hook_mouse(self, callback):
+        with self._lock:
+            self._mouse_hooks.append(callback)
+        return ("mouse", callback)
+
+    def unhook(self, handle):
+        device, callback = handle
+        with self._lock:
+            hooks = self._keyboard_hooks if device == "keyboard" else self._mouse_hooks
+            if callback in hooks:
+                hooks.remove(callback)
+
+    def _dispatch(self, event: InputEvent):
+        with self._lock:
+            hooks = list(self._keyboard_hooks if event.device == InputEvent.KEYBOARD else self._mouse_hooks)
+        for callback in hooks:
+            callback(event)
+
+    # --- подача ввода ---
+    def feed_key(self, name: str, down: bool):
+        name = name.lower()
+        with self._lock:
+            (self._keys.add if down else self._keys.discard)(name)
+        self._dispatch(InputEvent(InputEvent.KEYBOARD, InputEvent.DOWN if down else InputEvent.UP, name))
+
+    def feed_button(self, button: str, down: bool):
+        with self._lock:
+            (self._buttons.add if down else self._buttons.discard)(button)
+        self._dispatch(InputEvent(InputEvent.MOUSE, InputEvent.DOWN if down else InputEvent.UP, button))
+
+    def move_cursor(self, x: int, y: int):
+        with self._lock:
+            self._cursor = QtCore.QPoint(x, y)
+        self._dispatch(InputEvent(InputEvent.MOUSE, InputEvent.MOVE, x=x, y=y))
+
+    # --- опрос ---
+    def is_key_pressed(self, key):
+        parts = [k.strip() for k in str(key).lower().split('+') if k.strip()]
+        with self._lock:
+            return bool(parts) and all(k in self._keys for k in parts)
+
+    def is_mouse_pressed(self, button):
+        with self._lock:
+            return button in self._buttons
+
+    def cursor_pos(self):
+        with self._lock:
+            return QtCore.QPoint(self._cursor)
+
+    # --- выдача ---
+    def _record(self, action: str, value):
+        with self._lock:
+            self.injected.append((time.perf_counter_ns(), action, value))
+
+    def press(self, key):
+        self._record("press", key)
+        self._note_injected(key, True)
+        if self.loopback:
+            self.feed_key(str(key), True)
+
+    def release(self, key):
+        self._record("release", key)
+        self._note_injected(key, False)
+        if self.loopback:
+            self.feed_key(str(key), False)
+
+    def write(self, text):
+        self._record("write", text)
+        if not self.loopback:
+            return
+        # Эхо набора, как у keyboard.write: заглавные буквы - с Shift
+        with self._text_echoes(text):
+            for ch in text:
+                shifted = ch.isupper()
+                if shifted:
+                    self.feed_key("shift", True)
+                self.feed_key(ch, True)
+                self.feed_key(ch, False)
+                if shifted:
+                    self.feed_key("shift", False)
+
+    def resolve_key(self, name):
+        name = str(name).strip().lower()
+        if not name:
+            raise ValueError("empty key name")
+        return (name,)
+
+
+_INPUT_BACKEND: Optional[InputBackend] = None
+
+def get_input_backend() -> InputBackend:
+    """Текущий бэкенд ввода (по умолчанию - keyboard/mouse, создаётся при первом обращении)."""
+    global _INPUT_BACKEND
+    if _INPUT_BACKEND is None:
+        _INPUT_BACKEND = KeyboardMouseBackend()
+    return _INPUT_BACKEND
+
+def set_input_backend(backend: InputBackend):
+    """Подменяет бэкенд ввода (до создания оверлея/контроллера)."""
+    global _INPUT_BACKEND
+    _INPUT_BACKEND = backend
+
+
+class KeyStateTable:
+    """
+    Живая таблица физически нажатых клавиш, которую ведёт хук клавиатуры: запрос состояния
+    не обращается к ОС. Эхо нажатий, выданных самим приложением, гасится счётчиками ожидаемых
+    событий (бэкенд сообщает о них через _note_injected), поэтому таблица не меняется от инъекций.
+    Клавиша - код из resolve_key (скан-код или имя, в зависимости от бэкенда).
+    """
+
+    # Ожидание эха, которое так и не пришло, не должно навсегда глотать реальные события
+    EXPECT_TTL_NS = 1_000_000_000
+    # Эхо набранного текста может прийти из потока хука уже после возврата write()
+    WRITE_ECHO_GRACE_NS = 50_000_000
+
+    def __init__(self, input_backend: InputBackend):
+        self.input = input_backend
+        self._lock = threading.Lock()
+        self._pressed = set()
+        self._expected: Dict[tuple, List[int]] = {}  # (клавиша, нажатие) -> сроки ожидания эха
+        self._writes = 0
+        self._quiet_until_ns = 0
+        self._handle = None
+
+    @property
+    def installed(self) -> bool:
+        return self._handle is not None
+
+    def install(self) -> bool:
+        """Ставит собственный хук клавиатуры. Без хука запросы уходят в опрос бэкенда."""
+        if self._handle is not None:
+            return True
+        try:
+            self._handle = self.input.hook_keyboard(self._on_event)
+        except Exception as e:
+            print("Failed installing key state hook:", e)
+            return False
+        self.input.key_state = self
+        return True
+
+    def uninstall(self):
+        if self._handle is not None:
+            try:
+                self.input.unhook(self._handle)
+            except Exception:
+                pass
+            self._handle = None
+        if self.input.key_state is self:
+            self.input.key_state = None
+        with self._lock:
+            self._pressed.clear()
+            self._expected.clear()
+
+    def seed(self, codes):
+        """Заносит клавиши, зажатые до установки хука (однократный опрос)."""
+        for code in codes:
+            try:
+                down = self.input.is_key_pressed(code)
+            except Exception:
+                continue
+            with self._lock:
+                (self._pressed.add if down else self._pressed.discard)(code)
+
+    def _key_of(self, key):
+        if isinstance(key, str):
+            try:
+                return self.input.resolve_key(key)[0]
+            except (ValueError, IndexError):
+                return key.lower()
+        return key
+
+    def expect(self, key, down: bool):
+        """Регистрирует выданное событие: его эхо в хуке будет пропущено."""
+        deadline = time.perf_counter_ns() + self.EXPECT_TTL_NS
+        with self._lock:
+            self._expected.setdefault((self._key_of(key), down), []).append(deadline)
+
+    @contextlib.contextmanager
+    def writing(self, strokes: Sequence[tuple] = ()):
+        """
+        Выдача текста: эхо нажатий из strokes (бэкенд знает, какими клавишами набирает текст)
+        ожидается поштучно, как у expect. Прочие нажатия за время выдачи и короткое окно после
+        не заносятся в таблицу - это может быть эхо символов без клавиши. Отпускания не
+        отбрасываются никогда: физически отпущенный модификатор не должен считаться зажатым.
+        """
+        for key, down in strokes:
+            self.expect(key, down)
+        with self._lock:
+            self._writes += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._writes -= 1
+                self._quiet_until_ns = time.perf_counter_ns() + self.WRITE_ECHO_GRACE_NS
+
+    def _on_event(self, event: InputEvent):
+        if event.event_type not in (InputEvent.DOWN, InputEvent.UP):
+            return
+        key = event.scan_code if event.scan_code is not None else event.name
+        down = event.event_type == InputEvent.DOWN
+        now = time.perf_counter_ns()
+        with self._lock:
+            pending = self._expected.get((key, down))
+            if pending:
+                while pending and pending[0] < now:
+                    pending.pop(0)
+                if pending:
+                    pending.pop(0)
+                    return
+            if down and (self._writes or now < self._quiet_until_ns):
+                return
+            (self._pressed.add if down else self._pressed.discard)(key)
+
+    def is_pressed(self, code) -> bool:
+        if self._handle is None:
+            try:
+                return self.input.is_key_pressed(code)
+            except Exception:
+                return False
+        with self._lock:
+            return code in self._pressed
+
+    def held_code(self, codes) -> Optional[object]:
+        """Первый физически нажатый код из набора (например, левый или правый Shift) или None."""
+        for code in codes:
+            if self.is_pressed(code):
+                return code
+        return None
+
+
+class ModifierGuard:
+    """
+    Транзакция над модификаторами на время действия: снимок и отпускание при входе,
+    восстановление при выходе - в том числе после исключения. Восстанавливаются только
+    клавиши, которые пользователь всё ещё держит. Пауз нет: события ввода выдаются
+    в очередь ОС по порядку, поэтому восстановление не обгоняет действие.
+    """
+    __slots__ = ("input", "keys", "codes", "held")
+
+    def __init__(self, input_backend: InputBackend, key_state: KeyStateTable, modifier_codes: Dict[str, tuple]):
+        self.input = input_backend
+        self.keys = key_state
+        self.codes = modifier_codes
+        self.held: List[object] = []
+
+    def __enter__(self):
+        held = []
+        for codes in self.codes.values():
+            code = self.keys.held_code(codes)
+            if code is not None:
+                held.append(code)
+        self.held = held
+        for code in held:
+            try:
+                self.input.release(code)
+            except Exception as e:
+                print(f"Error releasing modifier {code}: {e}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for code in self.held:
+            if not self.keys.is_pressed(code):
+                continue  # отпущен пользователем во время действия
+            try:
+                self.input.press(code)
+            except Exception as e:
+                print(f"Error restoring modifier {code}: {e}")
+        self.held = []
+        return False
+
+    def abandon(self) -> List[object]:
+        """Забирает отпущенные коды: поздний выход брошенного действия уже ничего не восстановит."""
+        held, self.held = self.held, []
+        return held
+
+# ------------------------------
+# Активное окно (для профилей приложений)
+# ------------------------------
+
+class WindowInfo:
+    """Класс и заголовок окна переднего плана."""
+    __slots__ = ("window_class", "title")
+
+    def __init__(self, window_class: str = "", title: str = ""):
+        self.window_class = window_class
+        self.title = title
+
+    def __eq__(self, other):
+        return isinstance(other, WindowInfo) and (self.window_class, self.title) == (other.window_class, other.title)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"WindowInfo({self.window_class!r}, {self.title!r})"
+
+
+class WindowProvider(QtCore.QObject):
+    """
+    Источник окна переднего плана. changed испускается в GUI-потоке при каждой смене окна;
+    start/stop включают и выключают слежение.
+    """
+    changed = QtCore.pyqtSignal(object)
+
+    name = "base"
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def current(self) -> Optional[WindowInfo]:
+        return None
+
+
+class StaticWindowProvider(WindowProvider):
+    """Окно задаётся вручную через set_window (тесты, бенчмарки и платформы без поддержки)."""
+
+    name = "static"
+
+    def __init__(self, window: Optional[WindowInfo] = None, parent=None):
+        super().__init__(parent)
+        self._window = window
+
+    def current(self) -> Optional[WindowInfo]:
+        return self._window
+
+    def set_window(self, window_class: str = "", title: str = ""):
+        window = WindowInfo(window_class, title)
+        if window != self._window:
+            self._window = window
+            self.changed.emit(window)
+
+
+class Win32WindowProvider(WindowProvider):
+    """
+    SetWinEventHook(EVENT_SYSTEM_FOREGROUND) без опроса. Хук вне контекста вызывается
+    через очередь сообщений потока, который его поставил, - то есть в GUI-потоке Qt.
+    """
+
+    name = "win32"
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    # События от окон самого приложения (оверлей, настройки) профиль не переключают
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._user32 = ctypes.windll.user32
+        proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                       wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        self._user32.SetWinEventHook.restype = wintypes.HANDLE
+        self._user32.SetWinEventHook.argtypes = (wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, proc_type,
+                                                 wintypes.DWORD, wintypes.DWORD, wintypes.DWORD)
+        self._user32.UnhookWinEvent.argtypes = (wintypes.HANDLE,)
+        self._user32.GetForegroundWindow.restype = wintypes.HWND
+        # Ссылка на колбэк должна жить, пока стоит хук
+        self._proc = proc_type(self._on_win_event)
+        self._hook = None
+        self._window: Optional[WindowInfo] = None
+
+    def start(self):
+        if self._hook:
+            return
+        self._hook = self._user32.SetWinEventHook(
+            self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND, None, self._proc, 0, 0,
+            self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+        )
+        if not self._hook:
+            print("SetWinEventHook failed: per-application profiles are disabled")
+            return
+        self._update(self._user32.GetForegroundWindow())
+
+    def stop(self):
+        if self._hook:
+            self._user32.UnhookWinEvent(self._hook)
+            self._hook = None
+
+    def current(self) -> Optional[WindowInfo]:
+        return self._window
+
+    def _on_win_event(self, hook, event, hwnd, id_object, id_child, thread_id, time_ms):
+        try:
+            self._update(hwnd)
+        except Exception as e:
+            print("Foreground window hook error:", e)
+
+    def _update(self, hwnd):
+        if not hwnd:
+            return
+        buf = self._ctypes.create_unicode_buffer(256)
+        self._user32.GetClassNameW(hwnd, buf, len(buf))
+        window_class = buf.value
+        self._user32.GetWindowTextW(hwnd, buf, len(buf))
+        window = WindowInfo(window_class, buf.value)
+        if window != self._window:
+            self._window = window
+            self.changed.emit(window)
+
+
+_WINDOW_PROVIDER: Optional[WindowProvider] = None
+
+def get_window_provider() -> WindowProvider:
+    """Текущий источник активного окна (Win32-хук на Windows, иначе статический)."""
+    global _WINDOW_PROVIDER
+    if _WINDOW_PROVIDER is None:
+        _WINDOW_PROVIDER = Win32WindowProvider() if sys.platform == "win32" else StaticWindowProvider()
+    return _WINDOW_PROVIDER
+
+def set_window_provider(provider: WindowProvider):
+    """Подменяет источник активного окна (до создания контроллера)."""
+    global _WINDOW_PROVIDER
+    _WINDOW_PROVIDER = provider
+
+# ------------------------------
+# Компиляция хоткеев в планы событий
+# ------------------------------
+
+# Пауза между этапами нажатия комбинации до калибровки (для надежности)
+KEY_STEP_DELAY = DEFAULT_TIMING["key_step_ms"] / 1000.0
+
+class KeyPlan:
+    """Комбинация, заранее разрешённая в коды клавиш: события (код, нажатие, пауза после)."""
+    __slots__ = ("source", "events")
+
+    def __init__(self, source: str, events: tuple):
+        self.source = source
+        self.events = events
+
+
+class ActivationPlan:
+    """Разрешённый активатор: кнопка мыши или набор клавиш (для каждой - все её коды)."""
+    __slots__ = ("source", "mouse_button", "keys")
+
+    def __init__(self, source: str, mouse_button: Optional[str] = None, keys: tuple = ()):
+        self.source = source
+        self.mouse_button = mouse_button
+        self.keys = keys
+
+    def is_active(self, backend: InputBackend) -> bool:
+        if self.mouse_button:
+            return backend.is_mouse_pressed(self.mouse_button)
+        return bool(self.keys) and all(any(backend.is_key_pressed(c) for c in codes) for codes in self.keys)
+
+
+def _split_combo(seq: str) -> List[str]:
+    # Например, 'alt+2' -> ['alt', '2']
+    return [k.strip() for k in seq.lower().split('+') if k.strip()]
+
+def _resolve_names(backend: InputBackend, seq: str) -> list:
+    """Разрешает 'ctrl+x' в список кодов (по первому коду на клавишу). ValueError - неверная клавиша."""
+    names = _split_combo(seq)
+    if not names:
+        raise ValueError("empty key combo")
+    codes = []
+    for name in names:
+        try:
+            codes.append(backend.resolve_key(name)[0])
+        except (ValueError, IndexError):
+            raise ValueError(f"unknown key '{name}'")
+    return codes
+
+def compile_hotkey(backend: InputBackend, seq: str, step_delay: float = KEY_STEP_DELAY) -> KeyPlan:
+    """
+    Компилирует строку 'ctrl+shift+x' в план: нажать модификаторы, пауза, нажать и отпустить
+    основную клавишу, отпустить модификаторы в обратном порядке. ValueError - неверная клавиша.
+    """
+    codes = _resolve_names(backend, seq)
+    
+    # Последний ключ — основное действие, все остальные — модификаторы
+    modifiers, action_key = codes[:-1], codes[-1]
+    events = [(mod, True, 0.0) for mod in modifiers]
+    if events:
+        events[-1] = (modifiers[-1], True, step_delay)
+    events.append((action_key, True, step_delay))
+    events.append((action_key, False, step_delay))
+    events.extend((mod, False, 0.0) for mod in reversed(modifiers))
+    return KeyPlan(seq, tuple(events))
+
+def compile_activation(backend: InputBackend, combo: str) -> ActivationPlan:
+    """Компилирует активатор ('mouse x1', 'alt+x'). ValueError - неверная клавиша."""
+    button = _mouse_button_for_combo(combo)
+    if button:
+        return ActivationPlan(combo, mouse_button=button)
+    names = _split_combo(combo)
+    if not names:
+        raise ValueError("empty activation combo")
+    keys = []
+    for name in names:
+        try:
+            keys.append(tuple(backend.resolve_key(name)))
+        except (ValueError, IndexError):
+            raise ValueError(f"unknown key '{name}'")
+    return ActivationPlan(combo, keys=tuple(keys))
+
+
+class MacroPlan:
+    """
+    Макрос, разрешённый в коды клавиш: события (смещение от якоря в нс, действие, аргумент),
+    действие - "press" | "release" | "write". Длительность ввода текста заранее неизвестна,
+    поэтому после "write" якорем становится момент его завершения, а смещения идут от нуля.
+    duration_ns - сумма запланированных пауз и удержаний (без времени ввода текста).
+    """
+    __slots__ = ("source", "events", "duration_ns")
+
+    def __init__(self, source: tuple, events: tuple, duration_ns: int = 0):
+        self.source = source
+        self.events = events
+        self.duration_ns = duration_ns
+
+
+def compile_macro(backend: InputBackend, steps: tuple, step_delay: float = KEY_STEP_DELAY) -> MacroPlan:
+    """Компилирует шаги макроса в расписание событий. ValueError - неверная клавиша в шаге."""
+    events = []
+    t = elapsed = 0
+    for i, (kind, value, ms) in enumerate(steps):
+        try:
+            if kind == "chord":
+                for code, down, delay in compile_hotkey(backend, value, step_delay).events:
+                    events.append((t, "press" if down else "release", code))
+                    t += int(delay * 1e9)
+            elif kind == "hold":
+                codes = _resolve_names(backend, value)
+                events.extend((t, "press", code) for code in codes)
+                t += ms * 1_000_000
+                events.extend((t, "release", code) for code in reversed(codes))
+            elif kind == "text":
+                events.append((t, "write", value))
+                elapsed += t
+                t = 0
+            else:
+                t += ms * 1_000_000
+        except ValueError as e:
+            raise ValueError(f"step {i + 1} ({kind} '{value}'): {e}")
+    return MacroPlan(steps, tuple(events), elapsed + t)
+
+
+# Приоритет потока проигрывания на Windows (THREAD_PRIORITY_HIGHEST)
+_WIN_THREAD_PRIORITY_HIGHEST = 2
+
+
+@contextlib.contextmanager
+def _precise_timing():
+    """
+    На Windows на время проигрывания: системный таймер с разрешением 1 мс (иначе сон просыпается
+    по тику 15.6 мс) и повышенный приоритет потока, чтобы его реже вытесняли. На других ОС - ничего.
+    """
+    if sys.platform != "win32":
+        yield
+        return
+    import ctypes
+    winmm = ctypes.windll.winmm
+    kernel32 = ctypes.windll.kernel32
+    thread = kernel32.GetCurrentThread()
+    priority = kernel32.GetThreadPriority(thread)
+    period_set = winmm.timeBeginPeriod(1) == 0
+    kernel32.SetThreadPriority(thread, _WIN_THREAD_PRIORITY_HIGHEST)
+    try:
+        yield
+    finally:
+        kernel32.SetThreadPriority(thread, priority)
+        if period_set:
+            winmm.timeEndPeriod(1)
+
+
+class MacroScheduler:
+    """
+    Выполняет MacroPlan по дедлайнам perf_counter_ns: до срока - сон короткими порциями
+    (с проверкой отмены), последние spin_ns - активное ожидание. Опоздание каждого события
+    относительно дедлайна пишется в LATENCY ("macro_jitter") и возвращается сводкой.
+
+    Окно ожидания - полтора затухающих максимума перелёта сна на этой машине, так что сон
+    не переходит через дедлайн; на Windows проигрывание идёт с таймером 1 мс и повышенным
+    приоритетом (_precise_timing). Типичное опоздание - микросекунды; вытеснение самого потока
+    планировщиком ОС добавляет свои миллисекунды поверх (см. jitter_max_ms в сводке).
+    """
+
+    SPIN_NS = 2_000_000
+    # Потолок окна покрывает тик 15.6 мс Windows, если разрешение таймера поднять не удалось
+    MAX_SPIN_NS = 24_000_000
+    SLEEP_SLICE_S = 0.005
+    # Доля, на которую оценка перелёта сна затухает за каждый сон
+    OVERSHOOT_DECAY = 0.98
+
+    def __init__(self, input_backend: InputBackend):
+        self.input = input_backend
+        self.spin_ns = self.SPIN_NS
+        self._overshoot_ns = 0.0
+        # Клавиши, зажатые идущими проигрываниями (по списку на проигрывание), - для release_held()
+        self._lock = threading.Lock()
+        self._runs: List[list] = []
+
+    def _sleep(self, seconds: float):
+        """Сон с замером перелёта: окно ожидания растёт до наблюдаемого перелёта и медленно спадает."""
+        t0 = time.perf_counter_ns()
+        time.sleep(seconds)
+        overshoot = time.perf_counter_ns() - t0 - seconds * 1e9
+        self._overshoot_ns = max(overshoot, self._overshoot_ns * self.OVERSHOOT_DECAY)
+        self.spin_ns = int(min(self.MAX_SPIN_NS, max(self.SPIN_NS, self._overshoot_ns * 1.5)))
+
+    def wait_until(self, deadline_ns: int, cancel_event: Optional[threading.Event] = None) -> bool:
+        """Ждёт до дедлайна. False - ожидание прервано отменой."""
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            now = time.perf_counter_ns()
+            spin_from = deadline_ns - self.spin_ns
+            if now >= spin_from:
+                break
+            self._sleep(min((spin_from - now) / 1e9, self.SLEEP_SLICE_S))
+        while time.perf_counter_ns() < deadline_ns:
+            pass
+        return True
+
+    def release_held(self):
+        """Отпускает всё, что держат проигрывания (сторож бросил зависший макрос посреди удержания)."""
+        with self._lock:
+            codes = [code for held in self._runs for code in reversed(held)]
+            for held in self._runs:
+                held.clear()
+        for code in codes:
+            try:
+                self.input.release(code)
+            except Exception as e:
+                print(f"Error releasing macro key {code}: {e}")
+
+    def run(self, plan: MacroPlan, cancel_event: Optional[threading.Event] = None) -> Dict:
+        """Проигрывает план; всё нажатое отпускается даже при отмене или ошибке. Возвращает сводку джиттера."""
+        held = []
+        with self._lock:
+            self._runs.append(held)
+        late_total = late_max = done = 0
+        timing = _precise_timing()
+        timing.__enter__()
+        anchor = time.perf_counter_ns()
+        try:
+            for offset, op, arg in plan.events:
+                deadline = anchor + offset
+                if not self.wait_until(deadline, cancel_event):
+                    break
+                late = time.perf_counter_ns() - deadline
+                if op == "press":
+                    self.input.press(arg)
+                    with self._lock:
+                        held.append(arg)
+                elif op == "release":
+                    self.input.release(arg)
+                    with self._lock:
+                        if arg in held:
+                            held.remove(arg)
+                else:
+                    self.input.write(arg)
+                    anchor = time.perf_counter_ns()
+                LATENCY.record("macro_jitter", late)
+                late_total += late
+                late_max = max(late_max, late)
+                done += 1
+        finally:
+            with self._lock:
+                self._runs.remove(held)
+                leftover = held[::-1]
+                held.clear()
+            for code in leftover:
+                try:
+                    self.input.release(code)
+                except Exception:
+                    pass
+            timing.__exit__(None, None, None)
+        return {
+            "events": done,
+            "total": len(plan.events),
+            "jitter_mean_ms": round(late_total / done / 1e6, 4) if done else 0.0,
+            "jitter_max_ms": round(late_max / 1e6, 4),
+        }
+
+# ------------------------------
+# Overlay (визуальное меню)
+# ------------------------------
+
+class LayerCache:
+    """LRU-кэш пререндеренных слоёв оверлея (QPixmap) с ключом (ревизия конфига, слой, направление, DPR)."""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "collections.OrderedDict[tuple, QtGui.QPixmap]" = collections.OrderedDict()
+
+    def get(self, key: tuple, size: QtCore.QSize, dpr: float, render: Callable[[QtGui.QPainter], None]) -> QtGui.QPixmap:
+        """Возвращает слой из кэша или рендерит его через render(painter)."""
+        pixmap = self._entries.get(key)
+        if pixmap is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return pixmap
+        
+        self.misses += 1
+        pixmap = QtGui.QPixmap(int(size.width() * dpr), int(size.height() * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(QtCore.Qt.transparent)
+        qp = QtGui.QPainter(pixmap)
+        qp.setRenderHint(QtGui.QPainter.Antialiasing)
+        try:
+            render(qp)
+        finally:
+            qp.end()
+        
+        self._entries[key] = pixmap
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return pixmap
+
+    def clear(self) -> List[tuple]:
+        """Сбрасывает все слои; возвращает их ключи (от давно использованных к недавним)."""
+        keys = list(self._entries)
+        self._entries.clear()
+        return keys
+
+    def trim(self, keep: int):
+        """Оставляет только keep последних использованных слоёв (память в простое)."""
+        while len(self._entries) > keep:
+            self._entries.popitem(last=False)
+
+    def evict(self, match: Callable[[tuple], bool]) -> List[tuple]:
+        """Удаляет слои, ключи которых подходят под условие; возвращает их ключи."""
+        keys = [k for k in self._entries if match(k)]
+        for key in keys:
+            del self._entries[key]
+        return keys
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Частота, если экран не сообщает свою (Гц)
+FALLBACK_REFRESH_HZ = 60.0
+
+class FramePacer(QtCore.QObject):
+    """
+    Тики перерисовки оверлея с частотой экрана (не выше max_fps). Каждый тик ставится к своему
+    дедлайну в наносекундах, а не через целый интервал в мс, поэтому на 144/240 Гц частота не дрейфует.
+    Учёт кадров: длительность отрисовки, отклонение тика от дедлайна, пропущенные дедлайны.
+    """
+    tick = QtCore.pyqtSignal()
+
+    def __init__(self, parent: Optional[QtCore.QObject] = None, window: int = 512):
+        super().__init__(parent)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.timeout.connect(self._on_timeout)
+        self._running = False
+        self._deadline_ns = 0
+        self.refresh_hz = FALLBACK_REFRESH_HZ
+        self.max_fps = 0
+        self.period_ns = int(1e9 / FALLBACK_REFRESH_HZ)
+        # Скользящие окна: время paintEvent и |тик - дедлайн|
+        self.paint_times = LatencyHistogram(window)
+        self.tick_jitter = LatencyHistogram(window)
+        self.ticks = 0
+        # Дедлайны, которые прошли без тика (тик опоздал на целый период и больше)
+        self.frames_missed = 0
+        # Отрисовки дольше периода кадра
+        self.paints_over_budget = 0
+
+    def configure(self, refresh_hz: float, max_fps: int = 0):
+        """Период кадра по частоте экрана с потолком max_fps (0 - без потолка)."""
+        self.refresh_hz = refresh_hz if refresh_hz and refresh_hz > 0 else FALLBACK_REFRESH_HZ
+        self.max_fps = max(0, int(max_fps))
+        rate = min(self.refresh_hz, self.max_fps) if self.max_fps else self.refresh_hz
+        self.period_ns = int(1e9 / rate)
+
+    @property
+    def frame_rate_hz(self) -> float:
+        return 1e9 / self.period_ns
+
+    def isActive(self) -> bool:
+        return self._running
+
+    def start(self):
+        now = time.perf_counter_ns()
+        self._running = True
+        self._deadline_ns = now + self.period_ns
+        self._arm(now)
+
+    def stop(self):
+        self._running = False
+        self._timer.stop()
+
+    def _arm(self, now: int):
+        self._timer.start(max(0, round((self._deadline_ns - now) / 1e6)))
+
+    def _on_timeout(self):
+        if not self._running:
+            return
+        now = time.perf_counter_ns()
+        late = now - self._deadline_ns
+        self.ticks += 1
+        self.tick_jitter.record(abs(late))
+        if late >= self.period_ns:
+            # Опоздавший тик не догоняет пропущенные кадры: фаза сохраняется, слоты засчитываются
+            missed = late // self.period_ns
+            self.frames_missed += missed
+            self._deadline_ns += missed * self.period_ns
+        self._deadline_ns += self.period_ns
+        self.tick.emit()
+        # Обработчик тика мог закрыть меню
+        if self._running:
+            self._arm(time.perf_counter_ns())
+
+    def record_paint(self, elapsed_ns: int):
+        self.paint_times.record(elapsed_ns)
+        if elapsed_ns > self.period_ns:
+            self.paints_over_budget += 1
+
+    def metrics(self) -> Dict:
+        return {
+            "refresh_hz": round(self.refresh_hz, 2),
+            "frame_rate_hz": round(self.frame_rate_hz, 2),
+            "frame_interval_ms": round(self.period_ns / 1e6, 3),
+            "frame_ticks": self.ticks,
+            "frames_missed": self.frames_missed,
+            "paints_over_budget": self.paints_over_budget,
+            "paint_ms": self.paint_times.snapshot(),
+            "tick_jitter_ms": self.tick_jitter.snapshot(),
+        }
+
+
+# Установим фиксированный размер окна (достаточно большой для всех меню)
+OVERLAY_WINDOW_SIZE = 500 
+OVERLAY_LOCAL_CENTER = OVERLAY_WINDOW_SIZE // 2 # 250
+
+class SectorTable:
+    """
+    Сектора главного меню, посчитанные один раз на конфигурацию: углы, векторы подписей, цвета
+    и позиции кнопки "Назад". Направление под курсором - один atan2 и целочисленное деление.
+    """
+    __slots__ = ("names", "count", "step", "angles", "vectors", "colors", "back_offsets", "_lookup", "_offset")
+
+    # Первый сектор смотрит вверх, остальные идут по часовой стрелке (ось Y экрана направлена вниз)
+    START_ANGLE = -math.pi / 2
+
+    def __init__(self, names: Sequence[str], back_dist: int, palette: Optional[Dict[str, QtGui.QColor]] = None):
+        palette = palette or {}
+        self.names = tuple(names)
+        self.count = len(self.names)
+        self.step = 2 * math.pi / self.count
+        self.angles: Dict[str, float] = {}
+        self.vectors: Dict[str, tuple] = {}
+        self.colors: Dict[str, QtGui.QColor] = {}
+        self.back_offsets: Dict[str, Dict[str, int]] = {}
+        for i, name in enumerate(self.names):
+            angle = self.START_ANGLE + i * self.step
+            # Округление убирает хвосты вида 6e-17 у осевых направлений
+            vx, vy = round(math.cos(angle), 12), round(math.sin(angle), 12)
+            self.angles[name] = angle
+            self.vectors[name] = (vx, vy)
+            # Известные направления сохраняют свои цвета, остальные равномерно по кругу оттенков
+            self.colors[name] = palette.get(name) or QtGui.QColor.fromHsv(int(i * 360 / self.count) % 360, 220, 220)
+            # Кнопка "Назад" - напротив направления подменю
+            self.back_offsets[name] = {'dx': -round(vx * back_dist), 'dy': -round(vy * back_dist)}
+        # Лишний элемент на случай, когда округление даёт индекс ровно count
+        self._lookup = self.names + self.names[:1]
+        # Сдвиг, при котором сектор 0 начинается с нуля
+        self._offset = -self.START_ANGLE + self.step / 2
+
+    def direction_at(self, dx: float, dy: float) -> str:
+        return self._lookup[int(((math.atan2(dy, dx) + self._offset) % (2 * math.pi)) // self.step)]
+
+
+class SubmenuGeometry:
+    """
+    Предрасчитанная геометрия подменю: центры шариков, радиусы и угловые секторы.
+    Общий источник данных для отрисовки и для попадания курсора.
+    """
+
+    __slots__ = ("center_x", "center_y", "ring_radius", "item_radius", "hit_radius", "label_width",
+                 "count", "start_angle", "sector", "centers", "points",
+                 "back_center", "back_point", "back_hit_radius")
+
+    # Первый элемент сверху, далее по часовой стрелке
+    START_ANGLE = -math.pi / 2
+    # Запас вокруг шарика, в котором он считается наведённым (px)
+    HIT_MARGIN = 6
+
+    def __init__(self, center_x: int, center_y: int, ring_radius: float, item_radius: int, count: int,
+                 back_offset: Optional[Dict] = None, back_hit_radius: int = 0):
+        self.center_x = center_x
+        self.center_y = center_y
+        self.ring_radius = ring_radius
+        self.item_radius = item_radius
+        self.hit_radius = item_radius + self.HIT_MARGIN
+        # Ширина подписи внутри шарика (невыделенные подписи обрезаются до неё)
+        self.label_width = int(item_radius * 2 * 0.9)
+        self.count = count
+        self.start_angle = self.START_ANGLE
+        self.sector = (2 * math.pi / count) if count else 0.0
+        
+        centers = []
+        for i in range(count):
+            angle = self.start_angle + self.sector * i
+            centers.append((center_x + math.cos(angle) * ring_radius, center_y + math.sin(angle) * ring_radius))
+        self.centers = tuple(centers)
+        self.points = tuple(QtCore.QPoint(int(px), int(py)) for px, py in centers)
+        
+        if back_offset:
+            self.back_center = (center_x + back_offset['dx'], center_y + back_offset['dy'])
+            self.back_point = QtCore.QPoint(*self.back_center)
+        else:
+            self.back_center = None
+            self.back_point = None
+        self.back_hit_radius = back_hit_radius
+
+    @staticmethod
+    def ring_radius_for(main_radius: int, dir_cfg: "DirectionConfig") -> int:
+        """Радиус кольца подменю направления: шарики всегда снаружи главного круга."""
+        return max(dir_cfg.submenu_radius, main_radius + 10 + dir_cfg.item_size)
+
+    def sector_at(self, x: float, y: float) -> Optional[int]:
+        """Индекс элемента, в угловой сектор которого попадает точка (без учёта расстояния)."""
+        if not self.count:
+            return None
+        return int(round((math.atan2(y - self.center_y, x - self.center_x) - self.start_angle) / self.sector)) % self.count
+
+    def item_at(self, x: float, y: float) -> Optional[int]:
+        """Индекс шарика под точкой: один atan2 даёт сектор, затем проверка расстояния до его центра."""
+        i = self.sector_at(x, y)
+        if i is None:
+            return None
+        px, py = self.centers[i]
+        if (x - px) ** 2 + (y - py) ** 2 < self.hit_radius ** 2:
+            return i
+        return None
+
+    def is_over_back(self, x: float, y: float) -> bool:
+        if self.back_center is None:
+            return False
+        bx, by = self.back_center
+        return (x - bx) ** 2 + (y - by) ** 2 < self.back_hit_radius ** 2
+
+
+class MarkingTracker:
+    """
+    Режим разметки (marking menu): путь курсора разбирается по выборкам без оверлея.
+    Сначала направление главного меню (выход за main_radius), затем сектор элемента относительно
+    точки перехода, а выход за кольцо над вложенным подменю ведёт в него. Координаты глобальные;
+    уровни раскладываются так же, как их показал бы оверлей.
+    """
+    __slots__ = ("origin", "main_radius", "sectors", "directions", "direction", "levels", "path", "index")
+
+    # Элемент распознаётся, когда курсор отошёл от центра уровня на эту долю радиуса кольца
+    ITEM_RATIO = 0.5
+
+    def __init__(self):
+        self.reset(0, 0, None, {}, 0)
+
+    def reset(self, x: int, y: int, sectors: Optional[SectorTable], directions: Dict[str, "DirectionConfig"], main_radius: int):
+        self.origin = (x, y)
+        self.sectors = sectors
+        self.directions = directions
+        self.main_radius = main_radius
+        self.direction: Optional[str] = None
+        # (геометрия, элементы) открытых уровней; path - индексы подменю, через которые прошли
+        self.levels: List[tuple] = []
+        self.path: List[int] = []
+        self.index: Optional[int] = None
 
-# ИСПРАВЛЕНИЕ ДЛЯ EXE: Определение пути к папке скрипта/исполняемого файла
-if getattr(sys, 'frozen', False):
-    # Приложение упаковано (EXE)
-    SCRIPT_DIR = Path(sys.executable).parent
-else:
-    # Обычный скрипт Python
-    SCRIPT_DIR = Path(__file__).parent
-    
-CONFIG_PATH = SCRIPT_DIR / "radial_config.json"
+    def feed(self, x: int, y: int) -> bool:
+        """Обрабатывает выборку курсора. True - распознанное направление или элемент изменились."""
+        if self.direction is None:
+            ox, oy = self.origin
+            dx, dy = x - ox, y - oy
+            if dx * dx + dy * dy <= self.main_radius * self.main_radius:
+                return False
+            self.direction = self.sectors.direction_at(dx, dy)
+            # Точка перехода - там же, где контроллер поставил бы центр подменю
+            angle = self.sectors.angles[self.direction]
+            center = (int(ox + math.cos(angle) * self.main_radius), int(oy + math.sin(angle) * self.main_radius))
+            self._enter(center, self.directions[self.direction].actionable)
+            return True
+        
+        geometry, items = self.levels[-1]
+        dx, dy = x - geometry.center_x, y - geometry.center_y
+        dist_sq = dx * dx + dy * dy
+        ring = geometry.ring_radius
+        # Рядом с центром уровня последний распознанный элемент сохраняется
+        if dist_sq < (ring * self.ITEM_RATIO) ** 2:
+            return False
+        index = geometry.sector_at(x, y)
+        changed = index != self.index
+        self.index = index
+        if index is not None and items[index].is_submenu and dist_sq >= ring * ring:
+            self.path.append(index)
+            self._enter(geometry.centers[index], items[index].children)
+            return True
+        return changed
 
-DEFAULT_SUBMENU_CONFIG = {
-    "submenu_radius": 110,     # Расстояние элементов подменю от центра (px)
-    "threshold_ratio": 0.6,    # Коэффициент порога от main_radius (0.1 - 1.0)
-    "item_size": 30            # Радиус элементов подменю (шариков) (px)
-}
+    def _enter(self, center: tuple, items: Sequence[ItemConfig]):
+        dir_cfg = self.directions[self.direction]
+        geometry = SubmenuGeometry(
+            int(center[0]), int(center[1]), SubmenuGeometry.ring_radius_for(self.main_radius, dir_cfg),
+            dir_cfg.item_size, len(items)
+        )
+        self.levels.append((geometry, items))
+        self.index = None
 
-DEFAULT_CONFIG = {
-    "activation": {
-        "combo": "alt+x" 
-    },
-    "visual": {
-        "main_radius": 60,         # Радиус главного меню/порога (px)
-        "timer_interval_ms": 25,   # Интервал таймера мониторинга (ms)
-        "theme": "black_red"
-    },
-    "directions": {
-        "north": {"label": "North", "items": [], **DEFAULT_SUBMENU_CONFIG},
-        "east": {"label": "East", "items": [], **DEFAULT_SUBMENU_CONFIG},
-        "south": {"label": "South", "items": [], **DEFAULT_SUBMENU_CONFIG},
-        "west": {"label": "West", "items": [], **DEFAULT_SUBMENU_CONFIG}
-    }
-}
+    @property
+    def selection(self) -> Optional[ItemConfig]:
+        """Выбранный лист (подменю и незавершённый жест - не выбор)."""
+        if not self.levels or self.index is None:
+            return None
+        item = self.levels[-1][1][self.index]
+        return None if item.is_submenu else item
 
-def load_config() -> Dict:
-    if not CONFIG_PATH.exists():
-        save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG.copy()
-    
-    try:
-        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            cfg = json.load(f)
-            
-            # Миграция и дефолты для активации и визуальных настроек
-            if "activation" in cfg and "combo" not in cfg["activation"]:
-                mod = cfg["activation"].pop("modifier", "alt")
-                key = cfg["activation"].pop("key", "x")
-                cfg["activation"]["combo"] = f"{mod}+{key}"
-                
-            vis_cfg = cfg.get("visual", {})
-            main_rad = vis_cfg.pop("radius", None) 
-            if main_rad is None: 
-                main_rad = vis_cfg.get("main_radius", DEFAULT_CONFIG["visual"]["main_radius"])
-            vis_cfg["main_radius"] = main_rad
 
-            # Удаление старых глобальных параметров, если они есть
-            vis_cfg.pop("threshold", None) 
-            vis_cfg.pop("submenu_radius", None) 
-            vis_cfg.pop("threshold_ratio", None) 
-            
-            if "timer_interval_ms" not in vis_cfg: vis_cfg["timer_interval_ms"] = DEFAULT_CONFIG["visual"]["timer_interval_ms"]
-            
-            cfg["visual"] = vis_cfg
-            
-            # --- Per-Submenu Migration/Defaulting ---
-            for d in ["north", "east", "south", "west"]:
-                dir_cfg = cfg.get("directions", {}).get(d, {})
-                
-                # Применение дефолтов, если отсутствуют
-                if "submenu_radius" not in dir_cfg:
-                    dir_cfg["submenu_radius"] = DEFAULT_SUBMENU_CONFIG["submenu_radius"] 
-                
-                if "threshold_ratio" not in dir_cfg:
-                    dir_cfg["threshold_ratio"] = DEFAULT_SUBMENU_CONFIG["threshold_ratio"] 
-                
-                if "item_size" not in dir_cfg:
-                    dir_cfg["item_size"] = DEFAULT_SUBMENU_CONFIG["item_size"]
-                    
-                cfg["directions"][d] = dir_cfg
+class PaintKit:
+    """
+    Перья, кисти и шрифты оверлея, созданные один раз на набор секторов (профиль конфигурации),
+    и подписи, заранее разложенные в QStaticText с обрезкой по ширине через кэшированные QFontMetrics.
+    Кадр только ссылается на готовые объекты и ничего не создаёт.
+    """
 
+    FONT_FAMILY = "Sans"
 
-            return cfg
-            
-    except Exception:
-        save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG.copy()
+    def __init__(self, sectors: SectorTable):
+        bold = QtGui.QFont.Bold
+        self.fonts = {
+            "label": QtGui.QFont(self.FONT_FAMILY, 9),
+            "label_bold": QtGui.QFont(self.FONT_FAMILY, 9, bold),
+            "item": QtGui.QFont(self.FONT_FAMILY, 8),
+            "back": QtGui.QFont(self.FONT_FAMILY, 10, bold),
+        }
+        self.metrics = {name: QtGui.QFontMetrics(font) for name, font in self.fonts.items()}
+        # Подписи: шрифт -> ширина (0 - без обрезки) -> текст -> (QStaticText, половина ширины, половина высоты)
+        self._texts: Dict[str, Dict[int, Dict[str, tuple]]] = {name: {} for name in self.fonts}
 
-def save_config(cfg: Dict):
-    try:
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        print("Failed saving config:", e)
+        self.cursor_line_pen = self._pen(QtGui.QColor(255, 255, 255, 150), 2)
+        self.text_pen = QtGui.QPen(QtGui.QColor(255, 255, 255, 230))
+        self.text_pen_bright = QtGui.QPen(QtGui.QColor(255, 255, 255, 255))
+        self.ring_pen = self._pen(QtGui.QColor(255, 255, 255, 230), 2)
+        self.ring_pen_bright = self._pen(QtGui.QColor(255, 255, 255, 255), 2)
+        self.empty_pen = QtGui.QPen(QtGui.QColor(180, 180, 180, 200))
+        self.label_brush = QtGui.QBrush(QtGui.QColor(30, 30, 30, 220))
+        self.item_brush = QtGui.QBrush(QtGui.QColor(35, 35, 35, 255))
+        self.back_brush = QtGui.QBrush(QtGui.QColor(255, 255, 255, 180))
+        self.back_brush_hover = QtGui.QBrush(QtGui.QColor(255, 255, 255, 255))
+        self.back_pen = QtGui.QPen(QtGui.QColor(0, 0, 0, 200))
+        self.back_pen_hover = QtGui.QPen(QtGui.QColor(0, 0, 0, 255))
+        self.main_outline_pen = self._pen(QtGui.QColor(180, 20, 20, 200), 4)
+        self.neutral_outline_pen = self._pen(QtGui.QColor(180, 180, 180, 250), 4)
+        # Фон колеса: внешний и внутренний круг для каждой прозрачности слоя
+        self.wheel_brushes = {
+            alpha: (QtGui.QBrush(QtGui.QColor(0, 0, 0, alpha)), QtGui.QBrush(QtGui.QColor(20, 20, 20, alpha)))
+            for alpha in (150, 220)
+        }
 
-CONFIG = load_config()
+        # Цвет направления: обводка колеса подменю, подсвеченная обводка и заливка превью/выделения
+        self.outline_pens: Dict[str, QtGui.QPen] = {}
+        self.highlight_pens: Dict[str, QtGui.QPen] = {}
+        self.accent_brushes: Dict[str, QtGui.QBrush] = {}
+        for d, color in sectors.colors.items():
+            outline = QtGui.QColor(color)
+            outline.setAlpha(250)
+            self.outline_pens[d] = self._pen(outline, 4)
+            highlight = outline.lighter(120)
+            highlight.setAlpha(255)
+            self.highlight_pens[d] = self._pen(highlight, 4)
+            self.accent_brushes[d] = QtGui.QBrush(color)
 
-# ------------------------------
-# Overlay (визуальное меню)
-# ------------------------------
+    @staticmethod
+    def _pen(color: QtGui.QColor, width: int) -> QtGui.QPen:
+        pen = QtGui.QPen(color)
+        pen.setWidth(width)
+        return pen
+
+    def text(self, text: str, font: str, width: int = 0) -> tuple:
+        """Подпись, обрезанная многоточием до width (0 - без обрезки); раскладывается при первом обращении."""
+        by_width = self._texts[font].get(width)
+        if by_width is None:
+            by_width = self._texts[font][width] = {}
+        entry = by_width.get(text)
+        if entry is None:
+            metrics = self.metrics[font]
+            shown = metrics.elidedText(text, QtCore.Qt.ElideRight, width) if width > 0 else text
+            static = QtGui.QStaticText(shown)
+            static.setTextFormat(QtCore.Qt.PlainText)
+            static.prepare(QtGui.QTransform(), self.fonts[font])
+            entry = by_width[text] = (static, metrics.horizontalAdvance(shown) // 2, metrics.height() // 2)
+        return entry
+
+    def draw_text(self, qp: QtGui.QPainter, x: int, y: int, text: str, font: str, width: int = 0):
+        """Рисует подпись с центром в (x, y)."""
+        static, half_w, half_h = self.text(text, font, width)
+        qp.setFont(self.fonts[font])
+        qp.drawStaticText(x - half_w, y - half_h, static)
+
+
+class MenuFrame:
+    """
+    Звено цепочки открытых подменю. key - путь (профиль, направление, индекс, ...), он же ключ
+    кэшей геометрии и слоёв; origin - глобальная точка, в которую был поставлен центр уровня.
+    """
+    __slots__ = ("key", "direction", "item", "items", "origin", "back_offset")
+
+    def __init__(self, key: tuple, direction: str, item: Optional[ItemConfig], items: Sequence[ItemConfig],
+                 origin: Optional[QtCore.QPoint], back_offset: Optional[Dict]):
+        self.key = key
+        self.direction = direction
+        self.item = item
+        self.items = items
+        self.origin = origin
+        self.back_offset = back_offset
+
+    @property
+    def title(self) -> str:
+        return self.item.label if self.item is not None else self.direction
 
-# Установим фиксированный размер окна (достаточно большой для всех меню)
-OVERLAY_WINDOW_SIZE = 500 
-OVERLAY_LOCAL_CENTER = OVERLAY_WINDOW_SIZE // 2 # 250
 
 class RadialOverlay(QtWidgets.QWidget):
     
     # Сигнал для перехода на подменю 
     direction_passed_threshold = QtCore.pyqtSignal(str) 
-    back_to_main_menu = QtCore.pyqtSignal(str) # НОВЫЙ СИГНАЛ ДЛЯ ВОЗВРАТА
+    # Возврат на уровень выше (в родительское подменю или в главное меню)
+    back_requested = QtCore.pyqtSignal()
+    # Вход во вложенное подменю: индекс элемента текущего уровня
+    submenu_item_entered = QtCore.pyqtSignal(int)
     _last_selected_direction: Optional[str] = None
     
+    # Цвета известных направлений; для остальных цвет выводит SectorTable
     SUBMENU_COLORS = {
         'north': QtGui.QColor(200, 20, 20, 255),  # Красный
         'east': QtGui.QColor(255, 200, 0, 255),   # Жёлтый
@@ -134,20 +2347,23 @@ class RadialOverlay(QtWidgets.QWidget):
     
     # --- НОВЫЕ КОНСТАНТЫ ДЛЯ КНОПКИ "НАЗАД" ---
     BACK_BUTTON_RADIUS = 25 # Радиус кнопки "Назад" (шарика)
-    BACK_BUTTON_DIST = 60   # Расстояние от центра
-    # Позиции кнопки "Назад" (противоположно направлению подменю)
-    BACK_POSITIONS = {
-        'north': {'dx': 0, 'dy': BACK_BUTTON_DIST},  # North (СЕВЕР) -> Back button at SOUTH (ЮГ)
-        'east': {'dx': -BACK_BUTTON_DIST, 'dy': 0},  # East (ВОСТОК) -> Back button at WEST (ЗАПАД)
-        'south': {'dx': 0, 'dy': -BACK_BUTTON_DIST}, # South (ЮГ) -> Back button at NORTH (СЕВЕР)
-        'west': {'dx': BACK_BUTTON_DIST, 'dy': 0}    # West (ЗАПАД) -> Back button at EAST (ВОСТОК)
-    }
+    BACK_BUTTON_DIST = 60   # Расстояние от центра (кнопка ставится напротив направления подменю)
     # ---------------------------------------------
     
+    # Подписи направлений главного меню
+    LABEL_PADDING = 30
+    LABEL_WIDTH = 100
+    LABEL_MIN_WIDTH = 48
+    
+    # Геометрия уровней строится при первом входе и хранится в ограниченном LRU
+    GEOMETRY_CACHE_SIZE = 32
+    # Сколько пререндеренных слоёв оставлять после закрытия меню
+    LAYERS_KEPT_AT_REST = 4
 
-    def __init__(self, cfg: Dict):
+    def __init__(self, cfg: RadialConfig, input_backend: Optional[InputBackend] = None):
         super().__init__(None, QtCore.Qt.WindowStaysOnTopHint | QtCore.Qt.FramelessWindowHint | QtCore.Qt.Tool)
         self.cfg = cfg
+        self.input = input_backend or get_input_backend()
         self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
         
         # --- ИЗМЕНЕНИЕ 1: Фиксируем размер окна вместо полноэкранного режима ---
@@ -160,32 +2376,69 @@ class RadialOverlay(QtWidgets.QWidget):
         # КООРДИНАТЫ ЦЕНТРА МЕНЮ (теперь это центр окна OVERLAY_WINDOW_SIZE)
         self.center_x = OVERLAY_LOCAL_CENTER
         self.center_y = OVERLAY_LOCAL_CENTER
+        self._center_point = QtCore.QPoint(self.center_x, self.center_y)
         
-        self.menu_level = 0 
-        self.menu_data: Union[Dict, List] = {} 
+        # Цепочка открытых подменю (пусто - главное меню); уровень меню - её длина
+        self.breadcrumbs: List[MenuFrame] = []
+        self.menu_data: Union[Dict, Sequence] = {} 
         self.current_direction = None 
         self.highlight_index: Optional[int] = None 
         
         # НОВАЯ ПЕРЕМЕННАЯ: Флаг наведения на кнопку "Назад"
         self._mouse_over_back_button = False
         
-        vis_cfg = cfg.get("visual", DEFAULT_CONFIG["visual"])
-        
-        self.main_radius = vis_cfg.get("main_radius", DEFAULT_CONFIG["visual"]["main_radius"])
+        self.main_radius = cfg.visual.main_radius
+        # Профили приложений: снимок с направлениями профиля, таблица секторов и подписи
+        # готовятся заранее, переключение - только смена ссылок (self.cfg - снимок активного профиля)
+        self.base_cfg = cfg
+        self.profile = DEFAULT_PROFILE
+        self._profiles: Dict[str, tuple] = {}
+        self._prepare_profiles()
+        self.use_profile(DEFAULT_PROFILE)
         
         self.current_submenu_radius = 0 
         self.current_threshold = 0 
         self.current_item_size = 0 
+        # Геометрия открытого подменю (берётся из кэша при входе на уровень)
+        self.geometry: Optional[SubmenuGeometry] = None
+        self._geometry_cache: "collections.OrderedDict[tuple, SubmenuGeometry]" = collections.OrderedDict()
         
         self.preview_direction = None
+        
+        # Пререндеренные статические слои; ревизия растёт при каждой установке конфига
+        self.config_revision = 0
+        self._layer_cache = LayerCache()
 
         self._tooltip_timer = QtCore.QTimer(self)
         self._tooltip_timer.setSingleShot(True)
         self._tooltip_timer.timeout.connect(self._hide_tooltip)
         
-        self._monitor_timer = QtCore.QTimer(self)
-        self._monitor_timer.setInterval(16)  
-        self._monitor_timer.timeout.connect(self.update)
+        # Тики по частоте экрана, на котором открыто меню (с потолком visual.max_fps)
+        self._frame_pacer = FramePacer(self)
+        self._frame_pacer.configure(FALLBACK_REFRESH_HZ, cfg.visual.max_fps)
+        self._frame_pacer.tick.connect(self._on_monitor_tick)
+        self._frame_pacer.tick.connect(WAKEUPS.tick)
+        
+        # Последняя позиция курсора в локальных координатах окна (для линии и грязных областей)
+        self._cursor_local = QtCore.QPoint(self.center_x, self.center_y)
+        
+        # Счётчики: сколько тиков/событий привели к перерисовке, а сколько были пропущены
+        self.frames_painted = 0
+        self.frames_skipped = 0
+        
+        # Открытие -> первый кадр: первое открытие после запуска сравнивается с остальными
+        self._open_ns: Optional[int] = None
+        self.opens = 0
+        self.first_open_to_paint_ns: Optional[int] = None
+        self.warm_up_ns: Optional[int] = None
+        # Слои, сброшенные последней горячей перезагрузкой: (слой, путь), и время их повторного рендера
+        self._stale_layers: List[tuple] = []
+        self.reload_prerender_ns: Optional[int] = None
+        self._warming = False
+
+    @property
+    def menu_level(self) -> int:
+        return len(self.breadcrumbs)
 
     def _show_tooltip(self, text: str):
         """Отображает всплывающую подсказку с полным текстом."""
@@ -213,8 +2466,8 @@ class RadialOverlay(QtWidgets.QWidget):
         self.center_y = OVERLAY_LOCAL_CENTER
         # --- КОНЕЦ ИЗМЕНЕНИЯ 2 ---
         
-        self.menu_level = 0
-        self.menu_data = self.cfg['directions'] 
+        self.breadcrumbs = []
+        self.menu_data = self.cfg.directions 
         self.active = True
         self.current_direction = None
         self.highlight_index = None
@@ -226,11 +2479,61 @@ class RadialOverlay(QtWidgets.QWidget):
         self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents, True)
         self._hide_tooltip()
 
-        threshold_ratio = self.menu_data.get('north', {}).get("threshold_ratio", DEFAULT_SUBMENU_CONFIG["threshold_ratio"])
-        self.current_threshold = int(self.main_radius * threshold_ratio) 
+        self.current_threshold = int(self.main_radius * self.cfg.directions[self.sectors.names[0]].threshold_ratio) 
+        self._cursor_local = self._local_cursor()
         
+        # Возврат в главное меню из подменю - не открытие
+        if not self.isVisible():
+            self._open_ns = time.perf_counter_ns()
         self.show()
-        self._monitor_timer.start()
+        # Смена уровня меню перерисовывает окно целиком, дальше - только грязные области
+        self.update()
+        self._pace_to_screen()
+        if not self._frame_pacer.isActive():
+            self._frame_pacer.start()
+
+    def _pace_to_screen(self):
+        """Частота тиков - по экрану под центром меню (у мониторов она может быть разной)."""
+        at = QtCore.QPoint(self.x() + self.center_x, self.y() + self.center_y)
+        screen = QtGui.QGuiApplication.screenAt(at) or QtGui.QGuiApplication.primaryScreen()
+        refresh_hz = screen.refreshRate() if screen is not None else FALLBACK_REFRESH_HZ
+        self._frame_pacer.configure(refresh_hz, self.cfg.visual.max_fps)
+
+    def warm_up(self):
+        """
+        Прогрев при запуске: нативное окно, прозрачный backing store, кэши шрифтов и слой главного меню
+        создаются невидимым открытием (WA_DontShowOnScreen), а не при первой активации.
+        """
+        t0 = time.perf_counter_ns()
+        self._warming = True
+        self.setAttribute(QtCore.Qt.WA_DontShowOnScreen, True)
+        try:
+            self.winId()
+            # Путь отрисовки подменю (шарики, кнопка "Назад", мелкий шрифт)
+            first = self.sectors.names[0]
+            self.open_main_menu(0, 0, move_window=False)
+            self.open_submenu(first, self.cfg.directions[first].actionable)
+            self.repaint()
+            # Главное меню - последним, чтобы его слой пережил обрезку кэша при закрытии
+            self.open_main_menu(0, 0, move_window=False)
+            self.repaint()
+            self.close_menu()
+        finally:
+            self.setAttribute(QtCore.Qt.WA_DontShowOnScreen, False)
+            self._warming = False
+            self._open_ns = None
+        self.warm_up_ns = time.perf_counter_ns() - t0
+
+    def _record_open_to_paint(self, elapsed_ns: int):
+        self._open_ns = None
+        if self._warming:
+            return
+        self.opens += 1
+        if self.opens == 1:
+            self.first_open_to_paint_ns = elapsed_ns
+            LATENCY.record("open_to_paint_first", elapsed_ns)
+        else:
+            LATENCY.record("open_to_paint", elapsed_ns)
 
     # --- НОВЫЙ МЕТОД: Возврат в главное меню (Level 0) с правильным позиционированием ---
     def go_to_main_menu(self, global_x: int, global_y: int):
@@ -239,11 +2542,41 @@ class RadialOverlay(QtWidgets.QWidget):
         self.open_main_menu(global_x, global_y, move_window=True)
     # -------------------------------------------------------------------------------------
 
-    def open_submenu(self, direction: str, items: List[Dict]):
+    def open_submenu(self, direction: str, items: Sequence[ItemConfig], origin: Optional[QtCore.QPoint] = None):
+        """Первый уровень подменю - элементы направления главного меню."""
+        self.breadcrumbs = []
+        self._enter_frame(MenuFrame((self.profile, direction), direction, None, items, origin, self.sectors.back_offsets.get(direction)))
+
+    def enter_submenu_item(self, index: int, origin: Optional[QtCore.QPoint] = None):
+        """Входит во вложенное подменю элемента index текущего уровня (окно уже перемещено контроллером)."""
+        if not self.breadcrumbs or not (0 <= index < len(self.menu_data)):
+            return
+        item = self.menu_data[index]
+        if not item.is_submenu:
+            return
+        parent = self.breadcrumbs[-1]
+        # Кнопка "Назад" - напротив направления, по которому пришли в подменю
+        px, py = self.geometry.centers[index]
+        vx, vy = px - self.geometry.center_x, py - self.geometry.center_y
+        length = math.hypot(vx, vy) or 1.0
+        back_offset = {'dx': -round(vx / length * self.BACK_BUTTON_DIST), 'dy': -round(vy / length * self.BACK_BUTTON_DIST)}
+        self._enter_frame(MenuFrame(parent.key + (index,), parent.direction, item, item.children, origin, back_offset))
+
+    def leave_submenu(self) -> Optional[MenuFrame]:
+        """Возвращается на уровень выше. Возвращает новый текущий уровень (None - уровень направления закрыт)."""
+        if len(self.breadcrumbs) <= 1:
+            return None
+        self.breadcrumbs.pop()
+        frame = self.breadcrumbs.pop()
+        self._enter_frame(frame)
+        return frame
+
+    def _enter_frame(self, frame: MenuFrame):
         # self.center_x и self.center_y уже зафиксированы в локальном центре окна
-        self.menu_level = 1
-        self.menu_data = [it for it in items if it.get('keys') or it.get('value')]
-        self.current_direction = direction
+        self.breadcrumbs.append(frame)
+        # Элементы без действия уже отфильтрованы моделью (actionable / children)
+        self.menu_data = frame.items
+        self.current_direction = frame.direction
         self._mouse_over_back_button = False
         
         # При открытии подменю, если элементов нет, highlight_index остаётся None
@@ -259,26 +2592,40 @@ class RadialOverlay(QtWidgets.QWidget):
         # Выключаем игнорирование событий мыши, чтобы можно было ловить mouseMoveEvent И wheelEvent И click
         self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents, False)
         
-        dir_cfg = self.cfg['directions'].get(direction, {})
-        
-        submenu_rad_config = dir_cfg.get("submenu_radius", DEFAULT_SUBMENU_CONFIG["submenu_radius"])
-        item_size = dir_cfg.get("item_size", DEFAULT_SUBMENU_CONFIG["item_size"])
+        dir_cfg = self.cfg.directions[frame.direction]
+        self.current_threshold = int(self.main_radius * dir_cfg.threshold_ratio) 
+        self.geometry = self._frame_geometry(frame, dir_cfg)
+        self.current_submenu_radius = self.geometry.ring_radius
+        self.current_item_size = self.geometry.item_radius
         
-        # Обеспечение, что "шарики" всегда снаружи
-        min_required_dist = self.main_radius + 10 + item_size
-        self.current_submenu_radius = max(submenu_rad_config, min_required_dist)
-        
-        threshold_ratio = dir_cfg.get("threshold_ratio", DEFAULT_SUBMENU_CONFIG["threshold_ratio"])
-        self.current_threshold = int(self.main_radius * threshold_ratio) 
-        self.current_item_size = item_size
-        
-        # Окно уже перемещено в _on_direction_selected контроллера, просто показываем.
+        # Окно уже перемещено контроллером, просто показываем.
         self.show() 
-        self._monitor_timer.start()
+        self.update()
+        self._pace_to_screen()
+        if not self._frame_pacer.isActive():
+            self._frame_pacer.start()
+
+    def _frame_geometry(self, frame: MenuFrame, dir_cfg: DirectionConfig) -> SubmenuGeometry:
+        """Геометрия уровня: строится при первом входе, дальше берётся из ограниченного LRU."""
+        key = (self.config_revision, frame.key)
+        geometry = self._geometry_cache.get(key)
+        if geometry is not None:
+            self._geometry_cache.move_to_end(key)
+            return geometry
+        
+        geometry = SubmenuGeometry(
+            self.center_x, self.center_y, SubmenuGeometry.ring_radius_for(self.main_radius, dir_cfg),
+            dir_cfg.item_size, len(frame.items), frame.back_offset, self.BACK_BUTTON_RADIUS + 10
+        )
+        self._geometry_cache[key] = geometry
+        while len(self._geometry_cache) > self.GEOMETRY_CACHE_SIZE:
+            self._geometry_cache.popitem(last=False)
+        return geometry
         
     def close_menu(self):
         self.active = False
         self.hide()
+        self.breadcrumbs = []
         self.current_direction = None
         self.highlight_index = None
         self.menu_data = {}
@@ -286,62 +2633,49 @@ class RadialOverlay(QtWidgets.QWidget):
         self.current_submenu_radius = 0
         self.current_threshold = 0
         self.current_item_size = 0
-        self._monitor_timer.stop()
+        self.geometry = None
+        self._frame_pacer.stop()
         self._hide_tooltip()
         self.preview_direction = None
         self._mouse_over_back_button = False
         
         # Восстанавливаем игнорирование событий мыши
         self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents, True)
+        # В простое держим только несколько последних слоёв
+        self._layer_cache.trim(self.LAYERS_KEPT_AT_REST)
         self.update()
 
     def mouseMoveEvent(self, event):
         """Обрабатывает перемещение мыши для обновления выделения и тултипов."""
-        if not self.active or self.menu_level != 1:
+        if not self.active or self.menu_level == 0:
             return
             
         # mx, my - координаты относительно окна 500x500
         mx, my = event.pos().x(), event.pos().y()
+        old_highlight_index = self.highlight_index
+        old_over_back = self._mouse_over_back_button
         
         # --- Логика для кнопки "Назад" ---
-        back_pos = self.BACK_POSITIONS.get(self.current_direction)
-        if back_pos:
-            back_x = self.center_x + back_pos['dx']
-            back_y = self.center_y + back_pos['dy']
-            d_back = math.hypot(mx - back_x, my - back_y)
-            
-            # НОВЫЙ ПОРОГ АКТИВАЦИИ КНОПКИ "НАЗАД"
-            if d_back < self.BACK_BUTTON_RADIUS + 10: 
-                self._mouse_over_back_button = True
-                self.highlight_index = None # Сброс выделения подменю
-                self._show_tooltip("Back to Main Menu")
-                self.update()
-                return
-            else:
-                self._mouse_over_back_button = False
+        # НОВЫЙ ПОРОГ АКТИВАЦИИ КНОПКИ "НАЗАД" (радиус + 10 заложен в геометрию)
+        if self.geometry.is_over_back(mx, my):
+            self._mouse_over_back_button = True
+            self.highlight_index = None # Сброс выделения подменю
+            if not old_over_back:
+                parent = self.breadcrumbs[-2].title if len(self.breadcrumbs) > 1 else "Main Menu"
+                self._show_tooltip(f"Back to {parent}")
+            self._update_highlight(old_highlight_index, old_over_back)
+            return
+        self._mouse_over_back_button = False
 
-        # Логика для menu_level 1 (Submenu) - Наведение мышью имеет приоритет
-        items = self.menu_data 
-        n = len(items)
-        old_highlight_index = self.highlight_index
-        mouse_over_index = None
+        # Логика для подменю - Наведение мышью имеет приоритет
+        n = len(self.menu_data)
+        mouse_over_index = self.geometry.item_at(mx, my)
         
-        if n > 0:
-            start_angle = -90 
-            item_radius = self.current_item_size 
-            
-            for i in range(n):
-                angle_deg = start_angle + (360 / n) * i
-                angle = math.radians(angle_deg)
-                
-                # В Submenu, центр - это self.center_x/y (250, 250)
-                px = self.center_x + math.cos(angle) * self.current_submenu_radius
-                py = self.center_y + math.sin(angle) * self.current_submenu_radius
-                d = math.hypot(mx - px, my - py)
-                
-                if d < item_radius + 6: 
-                    mouse_over_index = i
-                    break
+        # Вложенное подменю открывается, когда курсор проходит его шарик наружу
+        if mouse_over_index is not None and self.menu_data[mouse_over_index].is_submenu:
+            if math.hypot(mx - self.geometry.center_x, my - self.geometry.center_y) >= self.geometry.ring_radius:
+                self.submenu_item_entered.emit(mouse_over_index)
+                return
         
         # Если мышь наведена на элемент, устанавливаем его как выделенный
         if mouse_over_index is not None:
@@ -357,16 +2691,21 @@ class RadialOverlay(QtWidgets.QWidget):
         elif self.highlight_index is None and old_highlight_index is not None and not self._mouse_over_back_button:
             self._hide_tooltip()
             
-        self.update() 
+        self._update_highlight(old_highlight_index, old_over_back)
         
     def mouseReleaseEvent(self, event: QtGui.QMouseEvent):
         """Обрабатывает отпускание кнопки мыши для активации кнопки 'Назад'."""
-        if self.active and self.menu_level == 1 and event.button() == QtCore.Qt.LeftButton:
+        if self.active and self.menu_level > 0 and event.button() == QtCore.Qt.LeftButton:
             
             # Проверяем, было ли наведение на кнопку "Назад"
             if self._mouse_over_back_button:
                 # Отправка сигнала в контроллер для возврата
-                self.back_to_main_menu.emit(self.current_direction) 
+                self.back_requested.emit() 
+                return
+            
+            # Клик по вложенному подменю открывает его
+            if self.highlight_index is not None and self.menu_data[self.highlight_index].is_submenu:
+                self.submenu_item_entered.emit(self.highlight_index)
                 return
             
             # Если кнопка "Назад" не наведена, позволяем основному коду
@@ -379,23 +2718,25 @@ class RadialOverlay(QtWidgets.QWidget):
 
     def wheelEvent(self, event: QtGui.QWheelEvent):
         """Обрабатывает прокрутку колеса мыши для навигации по подменю."""
-        if not self.active or self.menu_level != 1:
+        if not self.active or self.menu_level == 0:
             super().wheelEvent(event)
             return
 
         # Сброс флага наведения на кнопку "Назад" при прокрутке
+        old_over_back = self._mouse_over_back_button
         self._mouse_over_back_button = False
         
         items = self.menu_data
         n = len(items)
         if n == 0:
+            self._update_highlight(self.highlight_index, old_over_back)
             return
 
         # Инициализируем highlight_index, если он None (например, после ухода с кнопки "Назад")
         if self.highlight_index is None:
             self.highlight_index = 0
             self._update_tooltip_for_highlighted_item()
-            self.update()
+            self._update_highlight(None, old_over_back)
             return
             
         # numDegrees() для точной прокрутки, < 0 для прокрутки вверх, > 0 для прокрутки вниз
@@ -413,20 +2754,24 @@ class RadialOverlay(QtWidgets.QWidget):
 
             if self.highlight_index != old_highlight_index:
                 self._update_tooltip_for_highlighted_item()
-                self.update()
+            self._update_highlight(old_highlight_index, old_over_back)
                 
     def _update_tooltip_for_highlighted_item(self):
         """Обновляет тултип для текущего выделенного элемента."""
         if self.highlight_index is not None and not self._mouse_over_back_button:
             selected_item = self.menu_data[self.highlight_index]
-            label = selected_item.get('label', '')
-            keys = selected_item.get('keys', '')
+            label = selected_item.label
+            keys = selected_item.keys
             
             tooltip_text = f"**{label}**"
-            if keys and selected_item.get('type') != 'text':
+            if selected_item.is_submenu:
+                tooltip_text += f"\nSubmenu: {len(selected_item.children)} items"
+            elif selected_item.is_macro:
+                tooltip_text += f"\nMacro: {len(selected_item.steps)} steps"
+            elif keys and selected_item.type != 'text':
                 tooltip_text += f"\nHotkey: {keys}"
-            if selected_item.get('type') in ('text', 'hotkey_and_text'):
-                value = selected_item.get('value', '').strip()
+            if selected_item.has_text:
+                value = selected_item.value.strip()
                 if len(value) > 0:
                     tooltip_text += "\nText Action:\n" + value
                     
@@ -434,222 +2779,374 @@ class RadialOverlay(QtWidgets.QWidget):
         else:
              self._hide_tooltip()
 
-    def paintEvent(self, event):
+    # ------------------------------
+    # Тик монитора: выбор направления и грязные области
+    # ------------------------------
+    def _local_cursor(self) -> QtCore.QPoint:
+        pos = self.input.cursor_pos()
+        return QtCore.QPoint(pos.x() - self.x(), pos.y() - self.y())
+
+    def _line_rect(self, cursor: QtCore.QPoint) -> QtCore.QRect:
+        """Область, занимаемая линией от центра до курсора (с запасом на толщину пера)."""
+        return QtCore.QRect(QtCore.QPoint(self.center_x, self.center_y), cursor).normalized().adjusted(-3, -3, 3, 3)
+
+    def _label_rect(self, d: Optional[str]) -> QtCore.QRect:
+        """Область подписи направления на главном меню."""
+        if not d:
+            return QtCore.QRect()
+        return self._label_rects[d].adjusted(-2, -2, 2, 2)
+
+    def _item_rect(self, index: Optional[int]) -> QtCore.QRect:
+        """Область шарика подменю."""
+        if index is None or self.geometry is None or not (0 <= index < self.geometry.count):
+            return QtCore.QRect()
+        r = self.geometry.item_radius + 2
+        pt = self.geometry.points[index]
+        return QtCore.QRect(pt.x() - r, pt.y() - r, 2 * r, 2 * r)
+
+    def _wheel_rect(self) -> QtCore.QRect:
+        r = self.main_radius + 14
+        return QtCore.QRect(self.center_x - r, self.center_y - r, 2 * r, 2 * r)
+
+    def _back_rect(self) -> QtCore.QRect:
+        if self.geometry is None or self.geometry.back_point is None:
+            return QtCore.QRect()
+        r = self.BACK_BUTTON_RADIUS + 2
+        pt = self.geometry.back_point
+        return QtCore.QRect(pt.x() - r, pt.y() - r, 2 * r, 2 * r)
+
+    def _request_repaint(self, dirty: QtCore.QRect):
+        """Перерисовывает только изменившуюся область либо засчитывает пропущенный кадр."""
+        if dirty.isEmpty():
+            self.frames_skipped += 1
+        else:
+            self.update(dirty)
+
+    def _update_highlight(self, old_index: Optional[int], old_back: bool):
+        """Перерисовка после смены подсветки в подменю: старый и новый шарик, обводка, кнопка "Назад"."""
+        dirty = QtCore.QRect()
+        if old_index != self.highlight_index:
+            dirty = dirty.united(self._item_rect(old_index)).united(self._item_rect(self.highlight_index))
+            # Обводка колеса подсвечивается, пока что-то выделено
+            if (old_index is None) != (self.highlight_index is None):
+                dirty = dirty.united(self._wheel_rect())
+        if old_back != self._mouse_over_back_button:
+            dirty = dirty.united(self._back_rect())
+        self._request_repaint(dirty)
+
+    def _on_monitor_tick(self):
         if not self.active:
             return
-            
-        # Курсор в мировых (глобальных) координатах
-        pos = QtGui.QCursor.pos() 
-        global_mx, global_my = pos.x(), pos.y()
         
-        # Глобальные координаты центра меню (для расчета расстояния/угла)
-        global_center_x = self.x() + self.center_x
-        global_center_y = self.y() + self.center_y
+        old_cursor = self._cursor_local
+        old_preview = self.preview_direction
+        cursor = self._local_cursor()
+        self._cursor_local = cursor
+        
+        # В подменю курсор не рисуется: подсветку обновляют mouseMoveEvent/wheelEvent
+        if self.menu_level != 0:
+            self.frames_skipped += 1
+            return
         
         # Курсор относительно центра МЕНЮ (для расчета расстояния/угла)
-        dx = global_mx - global_center_x
-        dy = global_my - global_center_y
+        dx = cursor.x() - self.center_x
+        dy = cursor.y() - self.center_y
         dist = math.hypot(dx, dy)
         
         # --- SELECTION LOGIC for Menu Level 0 (Main Menu) ---
         current_preview_direction = None
-        if self.menu_level == 0:
             
-            # Логика определения направления (для превью и активации)
-            if dist > self.main_radius * 0.5: # 50% Radius for Preview
-                
-                angle = math.degrees(math.atan2(dy, dx))
-                if angle < 0: angle += 360
+        # Логика определения направления (для превью и активации)
+        if dist > self.main_radius * 0.5: # 50% Radius for Preview
+            # Сектор под курсором по таблице (без перебора направлений)
+            current_preview_direction = self.sectors.direction_at(dx, dy)
+                 
+        # Обновление текущего направления для отрисовки превью
+        self.preview_direction = current_preview_direction 
+        
+        # ВАЖНО: Мы переключаемся на submenu, если dist > main_radius.
+        if dist > self.main_radius:
+            if self.current_direction != current_preview_direction and current_preview_direction:
+                self.current_direction = current_preview_direction
+                # Отправка сигнала для переключения в RadialController
+                self.direction_passed_threshold.emit(self.current_direction) 
+                # Контроллер мог открыть подменю: оно перерисовано целиком
+                if self.menu_level != 0:
+                    return
+        else:
+             self.current_direction = None
+        
+        # --- Грязные области: старая и новая линия курсора, старое и новое превью ---
+        dirty = QtCore.QRect()
+        if cursor != old_cursor:
+            dirty = dirty.united(self._line_rect(old_cursor)).united(self._line_rect(cursor))
+        if self.preview_direction != old_preview:
+            dirty = dirty.united(self._label_rect(old_preview)).united(self._label_rect(self.preview_direction))
+        self._request_repaint(dirty)
 
-                directions = [('east', 0), ('south', 90), ('west', 180), ('north', 270)]
-                
-                min_diff = 360
-                closest_direction = None
-                
-                # Находим ближайшее направление
-                for d, target_angle in directions:
-                    diff = abs(angle - target_angle)
-                    diff = min(diff, 360 - diff) 
-                    
-                    if diff < min_diff:
-                        min_diff = diff
-                        closest_direction = d
-                
-                MAX_ANGLE_DIFF = 45 
-                
-                if min_diff < MAX_ANGLE_DIFF:
-                     current_preview_direction = closest_direction
-                     
-                
-            # Обновление текущего направления для отрисовки превью
-            self.preview_direction = current_preview_direction 
-            
-            # ВАЖНО: Мы переключаемся на submenu, если dist > main_radius.
-            if dist > self.main_radius:
-                if self.current_direction != current_preview_direction and current_preview_direction:
-                    self.current_direction = current_preview_direction
-                    # Отправка сигнала для переключения в RadialController
-                    self.direction_passed_threshold.emit(self.current_direction) 
-            else:
-                 self.current_direction = None
+    def metrics(self) -> Dict:
+        """Счётчики отрисовки оверлея и учёт кадров (частота, время отрисовки, джиттер тиков, пропуски)."""
+        return {
+            "frames_painted": self.frames_painted,
+            "frames_skipped": self.frames_skipped,
+            "layer_cache_hits": self._layer_cache.hits,
+            "layer_cache_misses": self._layer_cache.misses,
+            "warm_up_ms": self.warm_up_ns / 1e6 if self.warm_up_ns is not None else None,
+            "reload_prerender_ms": self.reload_prerender_ns / 1e6 if self.reload_prerender_ns is not None else None,
+            "first_open_to_paint_ms": self.first_open_to_paint_ns / 1e6 if self.first_open_to_paint_ns is not None else None,
+            **self._frame_pacer.metrics(),
+        }
+
+    def paintEvent(self, event):
+        if not self.active:
+            return
+        t0 = time.perf_counter_ns()
+        self.frames_painted += 1
+        if not self._warming:
+            LATENCY.mark("first_paint")
+        
+        cursor = self._cursor_local
+        dist = math.hypot(cursor.x() - self.center_x, cursor.y() - self.center_y)
 
         # --- DRAWING LOGIC ---
         qp = QtGui.QPainter(self)
         qp.setRenderHint(QtGui.QPainter.Antialiasing)
 
-        qp.setPen(QtCore.Qt.NoPen)
-        qp.setBrush(QtGui.QBrush(QtGui.QColor(0,0,0,0)))
-        qp.drawRect(self.rect())
-
-        base_center = QtCore.QPoint(self.center_x, self.center_y) # Локальный центр (250, 250)
-        
         # --- 1. Draw Mouse Line (Only Menu Level 0) ---
         if self.menu_level == 0:
             if dist > 0:
-                # Координаты курсора относительно ОКНА (не относительно центра)
-                relative_mx = global_mx - self.x() 
-                relative_my = global_my - self.y() 
-
-                line_pen = QtGui.QPen(QtGui.QColor(255, 255, 255, 150))
-                line_pen.setWidth(2)
-                qp.setPen(line_pen)
-                # Линия от локального центра до курсора (относительно окна)
-                qp.drawLine(self.center_x, self.center_y, relative_mx, relative_my)
+                qp.setPen(self._paint.cursor_line_pen)
+                # Линия от локального центра до курсора (координаты относительно окна)
+                qp.drawLine(self._center_point, cursor)
         
-        # --- 2. Draw Main Wheel ---
+        # --- 2. Статический слой (колесо, подписи/шарики, кнопка "Назад") из кэша ---
+        qp.drawPixmap(0, 0, self._static_layer())
         
+        # --- 3. Динамические части поверх кэшированного слоя ---
         if self.menu_level == 0:
-            # Полупрозрачное главное меню
-            bg_alpha = 150 
-            outline_color = QtGui.QColor(180, 20, 20, bg_alpha + 50)
-        else: # menu_level 1
-            bg_alpha = 220
-            outline_color = self.SUBMENU_COLORS.get(self.current_direction, QtGui.QColor(180, 180, 180, bg_alpha + 30))
-            outline_color.setAlpha(bg_alpha + 30)
-            
+            if self.preview_direction:
+                self._draw_direction_label(qp, self.preview_direction, True)
+        
+        else:
             if self.highlight_index is not None:
-                outline_color = outline_color.lighter(120)
-                outline_color.setAlpha(255) 
+                # Подсвеченная обводка колеса
+                qp.setPen(self._paint.highlight_pens.get(self.current_direction, self._paint.neutral_outline_pen))
+                qp.setBrush(QtCore.Qt.NoBrush)
+                qp.drawEllipse(self._center_point, self.main_radius + 10, self.main_radius + 10)
+                
+                if 0 <= self.highlight_index < len(self.menu_data):
+                    self._draw_submenu_item(qp, self.highlight_index, self.menu_data[self.highlight_index], True)
+            
+            if self._mouse_over_back_button:
+                self._draw_back_button(qp, True)
+        qp.end()
+        self._frame_pacer.record_paint(time.perf_counter_ns() - t0)
+        
+        if self._open_ns is not None:
+            self._record_open_to_paint(time.perf_counter_ns() - self._open_ns)
+
+    # ------------------------------
+    # Кэш статических слоёв
+    # ------------------------------
+    def apply_config(self, cfg: RadialConfig, changes: Optional[ConfigChanges] = None):
+        """
+        Устанавливает новую конфигурацию. Без списка изменений (или при смене визуальных настроек)
+        сбрасывает весь кэш слоёв, иначе - только слои изменившихся направлений и главного меню.
+        """
+        self.base_cfg = cfg
+        self.main_radius = cfg.visual.main_radius
+        self._prepare_profiles()
+        self.use_profile(self.profile if self.profile in self._profiles else DEFAULT_PROFILE)
+        self._geometry_cache.clear()
+        evicted = []
+        if changes is None or changes.visual:
+            self.config_revision += 1
+            evicted = self._layer_cache.clear()
+        elif changes.directions or changes.profiles:
+            def stale(key):
+                path = key[2]
+                if path[0] != DEFAULT_PROFILE:
+                    return path[0] in changes.profiles
+                # Подписи всех направлений нарисованы на слое главного меню
+                return bool(changes.directions) and (key[1] == "main" or path[1] in changes.directions)
+            evicted = self._layer_cache.evict(stale)
+        self._stale_layers = [(layer, path) for _, layer, path, _ in evicted]
+        self.update()
+
+    def prerender_stale_layers(self):
+        """
+        После горячей перезагрузки рендерит заново только те слои, что apply_config сбросил
+        (перезагрузка не идёт при открытом меню). Время пишется в reload_prerender_ns, а не в warm_up_ns.
+        """
+        stale, self._stale_layers = self._stale_layers, []
+        if not stale:
+            return
+        t0 = time.perf_counter_ns()
+        profile = self.profile
+        self._warming = True
+        self.setAttribute(QtCore.Qt.WA_DontShowOnScreen, True)
+        try:
+            # В порядке давности использования: самые свежие слои переживут обрезку кэша при закрытии
+            for layer, path in stale:
+                if not self.use_profile(path[0]):
+                    continue
+                self.open_main_menu(0, 0, move_window=False)
+                if layer == "submenu" and not self._open_path(path[1:]):
+                    continue
+                self.repaint()
+            self.close_menu()
+        finally:
+            self.use_profile(profile)
+            self.setAttribute(QtCore.Qt.WA_DontShowOnScreen, False)
+            self._warming = False
+            self._open_ns = None
+        self.reload_prerender_ns = time.perf_counter_ns() - t0
+        LATENCY.record("reload_prerender", self.reload_prerender_ns)
+
+    def _open_path(self, path: tuple) -> bool:
+        """Открывает подменю по пути (направление, индексы вложенных элементов); False, если пути больше нет."""
+        direction = self.cfg.directions.get(path[0])
+        if direction is None:
+            return False
+        self.open_submenu(path[0], direction.actionable)
+        for depth, index in enumerate(path[1:], 2):
+            self.enter_submenu_item(index)
+            if self.menu_level != depth:
+                return False
+        return True
+
+    def use_profile(self, profile: str) -> bool:
+        """Делает активным заранее подготовленный профиль (вызывать при закрытом меню)."""
+        prepared = self._profiles.get(profile)
+        if prepared is None:
+            return False
+        self.profile = profile
+        self.cfg, self.sectors, self._label_rects, self._paint = prepared
+        return True
+
+    def _prepare_profiles(self):
+        """Снимок, таблица секторов и подписи для каждого профиля текущей конфигурации."""
+        self._profiles = {}
+        for profile in (DEFAULT_PROFILE, *self.base_cfg.profiles):
+            view = self.base_cfg.profile_view(profile)
+            self._profiles[profile] = (view, *self._build_sectors(view))
+
+    def _build_sectors(self, cfg: RadialConfig):
+        """Таблица секторов, прямоугольники подписей и набор отрисовки для набора направлений и текущего радиуса."""
+        sectors = SectorTable(list(cfg.directions), self.BACK_BUTTON_DIST, self.SUBMENU_COLORS)
+        label_offset = self.main_radius + self.LABEL_PADDING
+        # При многих секторах подписи сужаются до хорды между соседями, чтобы не налезать друг на друга
+        width = self.LABEL_WIDTH
+        if sectors.count > 4:
+            chord = int(2 * label_offset * math.sin(math.pi / sectors.count)) - 4
+            width = max(self.LABEL_MIN_WIDTH, min(self.LABEL_WIDTH, chord))
+        label_rects: Dict[str, QtCore.QRect] = {}
+        for d, (vx, vy) in sectors.vectors.items():
+            px = int(self.center_x + vx * label_offset)
+            py = int(self.center_y + vy * label_offset)
+            label_rects[d] = QtCore.QRect(px - width // 2, py - 16, width, 32)
+        return sectors, label_rects, PaintKit(sectors)
+
+    def _static_layer(self) -> QtGui.QPixmap:
+        """Возвращает (при необходимости рендерит) слой текущего уровня меню."""
+        dpr = self.devicePixelRatioF()
+        if self.menu_level == 0:
+            key = (self.config_revision, "main", (self.profile,), dpr)
+            render = self._render_main_layer
+        else:
+            key = (self.config_revision, "submenu", self.breadcrumbs[-1].key, dpr)
+            render = self._render_submenu_layer
+        return self._layer_cache.get(key, self.size(), dpr, render)
+
+    def _render_main_layer(self, qp: QtGui.QPainter):
+        """Главное меню: полупрозрачное колесо и подписи направлений без превью."""
+        self._draw_wheel(qp, 150, self._paint.main_outline_pen)
+        for d in self.sectors.names:
+            self._draw_direction_label(qp, d, False)
+
+    def _render_submenu_layer(self, qp: QtGui.QPainter):
+        """Подменю: колесо, все шарики без подсветки и кнопка "Назад"."""
+        paint = self._paint
+        self._draw_wheel(qp, 220, paint.outline_pens.get(self.current_direction, paint.neutral_outline_pen))
+        
+        items = self.menu_data 
+        if len(items) == 0:
+            qp.setPen(paint.empty_pen)
+            paint.draw_text(qp, self.center_x, self.center_y, "No actions assigned", "label", 200)
+        else:
+            for i, it in enumerate(items):
+                self._draw_submenu_item(qp, i, it, False)
+        
+        self._draw_back_button(qp, False)
 
+    # ------------------------------
+    # Примитивы отрисовки
+    # ------------------------------
+    def _draw_wheel(self, qp: QtGui.QPainter, bg_alpha: int, outline_pen: QtGui.QPen):
+        outer_brush, inner_brush = self._paint.wheel_brushes[bg_alpha]
+        
         # Внешняя граница
-        pen = QtGui.QPen(outline_color)
-        pen.setWidth(4)
-        qp.setPen(pen)
-        qp.setBrush(QtGui.QBrush(QtGui.QColor(0,0,0, bg_alpha)))
-        qp.drawEllipse(base_center, self.main_radius + 10, self.main_radius + 10) 
+        qp.setPen(outline_pen)
+        qp.setBrush(outer_brush)
+        qp.drawEllipse(self._center_point, self.main_radius + 10, self.main_radius + 10) 
         
         # Внутренний круг
         qp.setPen(QtCore.Qt.NoPen)
-        qp.setBrush(QtGui.QBrush(QtGui.QColor(20,20,20, bg_alpha)))
-        qp.drawEllipse(base_center, self.main_radius, self.main_radius) 
+        qp.setBrush(inner_brush)
+        qp.drawEllipse(self._center_point, self.main_radius, self.main_radius) 
 
-        # --- 3. Draw Direction Labels (Menu Level 0) ---
-        if self.menu_level == 0:
-            dir_vec = {
-                'north': (0, -1), 'east': (1, 0), 'south': (0, 1), 'west': (-1, 0)
-            }
-            LABEL_PADDING = 30 
-            label_offset = self.main_radius + LABEL_PADDING 
-            
-            for d, (vx, vy) in dir_vec.items():
-                px = int(self.center_x + vx * label_offset)
-                py = int(self.center_y + vy * label_offset)
-                
-                is_preview = d == self.preview_direction
-                
-                if is_preview:
-                    brush_color = self.SUBMENU_COLORS.get(d, QtGui.QColor(200, 20, 20, 230))
-                    brush = QtGui.QBrush(brush_color)
-                else:
-                    brush = QtGui.QBrush(QtGui.QColor(30, 30, 30, 220))
-                
-                qp.setBrush(brush)
-                qp.setPen(QtCore.Qt.NoPen)
-                rect = QtCore.QRect(px-50, py-16, 100, 32)
-                qp.drawRoundedRect(rect, 10, 10)
-                
-                qp.setPen(QtGui.QPen(QtGui.QColor(255,255,255,230)))
-                font = QtGui.QFont("Sans", 9, QtGui.QFont.Bold if is_preview else QtGui.QFont.Normal)
-                qp.setFont(font)
-                label = self.cfg.get("directions", {}).get(d, {}).get("label", d.capitalize())
-                qp.drawText(rect, QtCore.Qt.AlignCenter, label)
-
-        # --- 4. Draw Submenu Items (Menu Level 1) ---
-        elif self.menu_level == 1:
-            items = self.menu_data 
-            n = len(items)
-            item_radius = self.current_item_size
-            
-            submenu_highlight_color = self.SUBMENU_COLORS.get(self.current_direction, QtGui.QColor(35, 35, 35, 255))
-            
-            if n == 0:
-                qp.setPen(QtGui.QPen(QtGui.QColor(180,180,180,200)))
-                qp.setFont(QtGui.QFont("Sans", 9))
-                qp.drawText(QtCore.QRect(self.center_x-100, self.center_y-12, 200, 24), QtCore.Qt.AlignCenter, "No actions assigned")
-            else:
-                start_angle = -90 
-                for i, it in enumerate(items):
-                    angle_deg = start_angle + (360 / n) * i
-                    angle = math.radians(angle_deg)
-                    
-                    px = int(self.center_x + math.cos(angle) * self.current_submenu_radius) 
-                    py = int(self.center_y + math.sin(angle) * self.current_submenu_radius)
-                    center_pt = QtCore.QPoint(px, py)
-                    
-                    
-                    if self.highlight_index == i:
-                        brush = QtGui.QBrush(submenu_highlight_color) 
-                        pen_color = QtGui.QColor(255,255,255,255) 
-                    else:
-                        brush = QtGui.QBrush(QtGui.QColor(35, 35, 35, 255)) 
-                        pen_color = QtGui.QColor(255,255,255,230) 
-                        
-                    qp.setBrush(brush)
-                    qp.setPen(QtCore.Qt.NoPen)
-                    qp.drawEllipse(center_pt, item_radius, item_radius) 
-                    
-                    qp.setPen(QtGui.QPen(pen_color))
-                    qp.setFont(QtGui.QFont("Sans", 8))
-                    
-                    text_rect_width = int(item_radius * 2 * 0.9)
-                    text_rect_height = int(item_radius * 2 * 0.6)
-                    label_text = it.get('label','')
-                    if self.highlight_index != i:
-                        label_text = label_text[:5] + "..." if len(label_text) > 5 else label_text
-                        
-                    qp.drawText(QtCore.QRect(px - text_rect_width//2, py - text_rect_height//2, text_rect_width, text_rect_height), QtCore.Qt.AlignCenter, label_text)
-                    
-            # --- 5. Draw BACK Button (Menu Level 1) ---
-            back_pos = self.BACK_POSITIONS.get(self.current_direction)
-            if back_pos:
-                back_x = self.center_x + back_pos['dx']
-                back_y = self.center_y + back_pos['dy']
-                back_center_pt = QtCore.QPoint(back_x, back_y)
-                
-                # Цвет/стиль кнопки "Назад"
-                back_radius = self.BACK_BUTTON_RADIUS
-                
-                if self._mouse_over_back_button:
-                    # Подсветка при наведении
-                    back_brush = QtGui.QBrush(QtGui.QColor(255, 255, 255, 255))
-                    back_pen_color = QtGui.QColor(0,0,0,255)
-                else:
-                    # Нормальное состояние (белый)
-                    back_brush = QtGui.QBrush(QtGui.QColor(255, 255, 255, 180))
-                    back_pen_color = QtGui.QColor(0,0,0,200)
-                    
-                qp.setBrush(back_brush)
-                qp.setPen(QtCore.Qt.NoPen)
-                qp.drawEllipse(back_center_pt, back_radius, back_radius)
-                
-                # Стрелка "Назад" (напр., <) или текст (напр., 'BACK')
-                qp.setPen(QtGui.QPen(back_pen_color))
-                qp.setFont(QtGui.QFont("Sans", 10, QtGui.QFont.Bold))
-                qp.drawText(QtCore.QRect(back_x - back_radius, back_y - back_radius, back_radius * 2, back_radius * 2), QtCore.Qt.AlignCenter, "◄")
+    def _draw_direction_label(self, qp: QtGui.QPainter, d: str, is_preview: bool):
+        paint = self._paint
+        qp.setBrush(paint.accent_brushes[d] if is_preview else paint.label_brush)
+        qp.setPen(QtCore.Qt.NoPen)
+        rect = self._label_rects[d]
+        qp.drawRoundedRect(rect, 10, 10)
+        
+        qp.setPen(paint.text_pen)
+        width = rect.width()
+        paint.draw_text(qp, rect.x() + width // 2, rect.y() + rect.height() // 2, self.cfg.directions[d].label,
+                        "label_bold" if is_preview else "label", width)
+
+    def _draw_submenu_item(self, qp: QtGui.QPainter, i: int, it: ItemConfig, highlighted: bool):
+        paint = self._paint
+        item_radius = self.geometry.item_radius
+        center_pt = self.geometry.points[i]
+        
+        if highlighted:
+            qp.setBrush(paint.accent_brushes.get(self.current_direction, paint.item_brush))
+        else:
+            qp.setBrush(paint.item_brush)
+        qp.setPen(QtCore.Qt.NoPen)
+        qp.drawEllipse(center_pt, item_radius, item_radius) 
+        
+        # Вложенное подменю помечается внутренним кольцом
+        if it.is_submenu:
+            qp.setPen(paint.ring_pen_bright if highlighted else paint.ring_pen)
+            qp.setBrush(QtCore.Qt.NoBrush)
+            qp.drawEllipse(center_pt, item_radius - 4, item_radius - 4)
+        
+        # Выделенный элемент показывает подпись целиком, остальные обрезаются по ширине шарика
+        qp.setPen(paint.text_pen_bright if highlighted else paint.text_pen)
+        paint.draw_text(qp, center_pt.x(), center_pt.y(), it.label, "item", 0 if highlighted else self.geometry.label_width)
+
+    def _draw_back_button(self, qp: QtGui.QPainter, hovered: bool):
+        back_center_pt = self.geometry.back_point
+        if back_center_pt is None:
+            return
+        paint = self._paint
+        
+        # Цвет/стиль кнопки "Назад": при наведении - непрозрачная
+        qp.setBrush(paint.back_brush_hover if hovered else paint.back_brush)
+        qp.setPen(QtCore.Qt.NoPen)
+        qp.drawEllipse(back_center_pt, self.BACK_BUTTON_RADIUS, self.BACK_BUTTON_RADIUS)
+        
+        # Стрелка "Назад"
+        qp.setPen(paint.back_pen_hover if hovered else paint.back_pen)
+        paint.draw_text(qp, back_center_pt.x(), back_center_pt.y(), "◄", "back")
 
 
     def get_selection(self) -> Optional[Dict]:
-        """Returns the final selection based on the current state (only Level 1 selection is returned)."""
+        """Returns the final selection based on the current state (only submenu items are returned)."""
         # Если навелись на кнопку "Назад", то нет выбора элемента
         if self._mouse_over_back_button:
             return None
@@ -661,581 +3158,420 @@ class RadialOverlay(QtWidgets.QWidget):
         idx = self.highlight_index
         if idx < 0 or idx >= len(items):
             return None
+        # Подменю само по себе не действие
+        if items[idx].is_submenu:
+            return None
         
         return {"direction": self.current_direction, "index": idx, "item": items[idx]}
 
 # ------------------------------
-# Захват хоткея (без изменений)
+# Исполнитель действий (отдельный поток)
 # ------------------------------
-class HotkeyCaptureDialog(QtWidgets.QDialog):
-    
-    capture_finished = QtCore.pyqtSignal()
-    
-    def __init__(self, parent=None, single_key_mode=False):
+class GuiInvoker(QtCore.QObject):
+    """Синхронно выполняет функцию в GUI-потоке по запросу из рабочего потока (буфер обмена и т.п.)."""
+
+    _request = QtCore.pyqtSignal(object)
+
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowFlags(self.windowFlags() & ~QtCore.Qt.WindowCloseButtonHint) 
-        self.setWindowTitle("Press and Release hotkey (Esc to cancel)")
-        self.setFixedSize(420, 80)
-        layout = QtWidgets.QVBoxLayout(self)
-        
-        self.label = QtWidgets.QLabel(
-            "Press and RELEASE your desired hotkey/combo (e.g., Shift+1, Ctrl+C). Press ESC to cancel.", self
-        )
-        layout.addWidget(self.label)
-        
-        self.result = None
-        self._capture_running = True 
-        
-        self.single_key_mode = single_key_mode 
-        
-        self._current_keys = set()
-        self._pressed_order = [] 
-        
-        self._thread = threading.Thread(target=self._capture_loop)
-        self._thread.daemon = True
-        self.capture_finished.connect(self.accept)
-        self._thread.start()
+        self._request.connect(self._run, QtCore.Qt.BlockingQueuedConnection)
 
-    def _capture_loop(self):
-        """Мониторит ввод и захватывает хоткей при отпускании."""
-        
-        mouse_buttons = {
-            "x": "mouse x1",      
-            "x2": "mouse x2",     
-            "left": "mouse left",
-            "right": "mouse right",
-            "middle": "mouse middle",
-        }
-        
-        keyboard.hook(self._keyboard_event_handler)
+    def call(self, fn: Callable, *args):
+        """Вызывает fn(*args) в GUI-потоке и возвращает результат (исключение пробрасывается)."""
+        if QtCore.QThread.currentThread() is self.thread():
+            return fn(*args)
+        box = {"fn": fn, "args": args}
+        self._request.emit(box)
+        if "error" in box:
+            raise box["error"]
+        return box.get("result")
 
+    @QtCore.pyqtSlot(object)
+    def _run(self, box: Dict):
         try:
-            while self._capture_running:
-                
-                # 1. Проверка Esc (отмена)
-                if keyboard.is_pressed("esc"):
-                    self.result = None
-                    self._capture_running = False
-                    break
-                    
-                # 2. Проверка мыши (захват при НАЖАТИИ)
-                for btn_key, btn_name in mouse_buttons.items():
-                    if mouse.is_pressed(btn_key):
-                        if not self._pressed_order: 
-                            self.result = btn_name
-                            self._capture_running = False 
-                            break
-
-                if not self._capture_running and self.result:
-                    break
-                
-                time.sleep(0.01)
-
+            box["result"] = box["fn"](*box["args"])
         except Exception as e:
-            print("Hotkey capture error:", e)
-            self.result = None
-        finally:
-            keyboard.unhook_all()
-            self.capture_finished.emit()
+            box["error"] = e
 
-    def _get_base_key_name(self, event) -> Optional[str]:
-        """Пытается получить истинное имя клавиши (например, '1' вместо '!') по scan_code."""
-        
-        if hasattr(event, 'button'): 
-            return None 
+class ActionJob:
+    """Одно действие в очереди исполнителя."""
+    __slots__ = ("item", "cancel_event", "trace")
 
-        try:
-            base_name = keyboard.normalize_name(event.scan_code)
-            return base_name
-        except Exception:
-            return event.name
+    def __init__(self, item: Dict, trace: Optional[LatencyTrace] = None):
+        self.item = item
+        self.cancel_event = threading.Event()
+        self.trace = trace
 
-    def _normalize_key_name(self, key_name: str) -> str:
-        """Нормализует имена клавиш."""
-        key_name = key_name.lower()
-        
-        if key_name in ('caps lock', 'scroll lock', 'num lock', 'win'):
-            return None
-            
-        if key_name.endswith(' shift'): return 'shift'
-        if key_name == 'shift': return 'shift'
 
-        if key_name.endswith(' control'): return 'ctrl'
-        if key_name == 'control': return 'ctrl'
-        
-        if key_name.endswith(' alt'): return 'alt'
-        if key_name == 'alt': return 'alt'
+class ActionExecutor:
+    """
+    Выполняет выбранные действия в рабочем потоке с ограниченной очередью,
+    чтобы задержки и посимвольный ввод текста не блокировали GUI-поток.
+    """
+
+    POLICIES = ACTION_POLICIES
+
+    def __init__(self, run_action: Callable[[Dict, threading.Event], None],
+                 on_timeout: Optional[Callable[[], None]] = None,
+                 planned_ms: Optional[Callable[[Dict], int]] = None):
+        # run_action(item, cancel_event) должен периодически проверять cancel_event
+        self._run_action = run_action
+        self._on_timeout = on_timeout
+        # Запланированная длительность действия (паузы и удержания макроса): сторож ждёт её плюс watchdog_ms
+        self._planned_ms = planned_ms
+        self._cond = threading.Condition()
+        self._pending = collections.deque()
+        self._current: Optional[ActionJob] = None
+        self._generation = 0
+        self._stopped = False
         
-        if key_name in ('lcontrol', 'rcontrol'): return 'ctrl'
-        if key_name in ('lshift', 'rshift'): 'shift'
-        if key_name in ('lmenu', 'rmenu'): return 'alt'
+        self.policy = DEFAULT_CONFIG["actions"]["policy"]
+        self.queue_size = DEFAULT_CONFIG["actions"]["queue_size"]
+        self.watchdog_ms = DEFAULT_CONFIG["actions"]["watchdog_ms"]
         
-        return key_name
+        self._start_worker()
 
-    def _keyboard_event_handler(self, event):
-        """Обрабатывает события клавиатуры."""
-        if not self._capture_running or self.result is not None:
-            return
+    def configure(self, actions_cfg: ActionsConfig):
+        """Применяет настройки из секции 'actions' конфигурации."""
+        with self._cond:
+            self.policy = actions_cfg.policy
+            self.queue_size = max(1, actions_cfg.queue_size)
+            self.watchdog_ms = max(100, actions_cfg.watchdog_ms)
+            while len(self._pending) > self.queue_size:
+                self._pending.popleft()
 
-        key_name_base = self._get_base_key_name(event)
-        
-        if key_name_base is None:
-            return
+    @property
+    def busy(self) -> bool:
+        with self._cond:
+            return self._current is not None or bool(self._pending)
 
-        normalized_name = self._normalize_key_name(key_name_base)
-        
-        if normalized_name is None:
-            return
-            
-        if event.event_type == 'down':
-            if normalized_name not in self._current_keys:
-                self._current_keys.add(normalized_name)
-                self._pressed_order.append(normalized_name)
-            
-            if self.single_key_mode:
-                self.result = normalized_name
-                self._capture_running = False
-                return
+    def submit(self, item: Dict, trace: Optional[LatencyTrace] = None) -> bool:
+        """Ставит действие в очередь согласно политике. Возвращает False, если действие отброшено."""
+        with self._cond:
+            if self._stopped:
+                return False
             
-        elif event.event_type == 'up':
+            if self.policy == "cancel":
+                # Новый выбор отменяет и текущее, и ожидающие действия
+                self._pending.clear()
+                if self._current is not None:
+                    self._current.cancel_event.set()
+            elif self.policy == "coalesce":
+                # Ожидающие действия заменяются последним выбором, текущее доигрывается
+                self._pending.clear()
             
-            if normalized_name in self._current_keys:
-                self._current_keys.remove(normalized_name)
+            if len(self._pending) >= self.queue_size:
+                print(f"Action queue is full ({self.queue_size}), dropping '{item.label}'")
+                return False
             
-            if not self.single_key_mode and not self._current_keys and self._pressed_order:
-                
-                if len(self._pressed_order) == 1 and self._pressed_order[0] in ('shift', 'ctrl', 'alt'):
-                    self._pressed_order = []
+            self._pending.append(ActionJob(item, trace))
+            self._cond.notify()
+            return True
+
+    def cancel_all(self):
+        """Отменяет текущее действие и очищает очередь."""
+        with self._cond:
+            self._pending.clear()
+            if self._current is not None:
+                self._current.cancel_event.set()
+
+    def stop(self):
+        """Останавливает рабочий поток (текущее действие отменяется)."""
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            if self._current is not None:
+                self._current.cancel_event.set()
+            self._cond.notify_all()
+
+    def _start_worker(self):
+        worker = threading.Thread(target=self._worker_loop, args=(self._generation,), name="ActionExecutor")
+        worker.daemon = True
+        worker.start()
+
+    def _worker_loop(self, generation: int):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped and generation == self._generation:
+                    self._cond.wait()
+                # Поток брошен сторожем или исполнитель остановлен
+                if self._stopped or generation != self._generation:
                     return
-                
-                self.result = "+".join(self._pressed_order)
-                
-                self._capture_running = False
-                
-    def reject(self):
-        """Корректное завершение при отмене (нажатии Esc)."""
-        self._capture_running = False 
-        self.result = None 
-        super().reject()
+                job = self._pending.popleft()
+                self._current = job
+            
+            budget_ms = self.watchdog_ms
+            if self._planned_ms is not None:
+                try:
+                    budget_ms += self._planned_ms(job.item)
+                except Exception as e:
+                    print(f"Failed estimating duration of '{job.item.label}':", e)
+            watchdog = threading.Timer(budget_ms / 1000.0, self._on_watchdog, args=(job, budget_ms))
+            watchdog.daemon = True
+            watchdog.start()
+            try:
+                if not job.cancel_event.is_set():
+                    LATENCY.mark("inject_start", job.trace)
+                    self._run_action(job.item, job.cancel_event)
+            except Exception as e:
+                print(f"Failed performing action '{job.item.label}':", e)
+            finally:
+                watchdog.cancel()
+                LATENCY.mark("inject_end", job.trace)
+                with self._cond:
+                    if self._current is job:
+                        self._current = None
 
-    def closeEvent(self, event):
-        """Обеспечение остановки потока при закрытии окна."""
-        self._capture_running = False
-        event.accept()
+    def _on_watchdog(self, job: ActionJob, budget_ms: int):
+        """Действие зависло: отменяем его, бросаем поток и запускаем новый."""
+        with self._cond:
+            if self._current is not job or self._stopped:
+                return
+            print(f"Action '{job.item.label}' exceeded {budget_ms} ms, abandoning worker")
+            job.cancel_event.set()
+            self._current = None
+            self._generation += 1
+            self._cond.notify_all()
+            self._start_worker()
+        
+        if self._on_timeout:
+            try:
+                self._on_timeout()
+            except Exception as e:
+                print("Action watchdog recovery failed:", e)
 
 # ------------------------------
-# Окно настроек (без изменений, кроме вызова сохранения)
+# Событийный детектор активатора
 # ------------------------------
-class SettingsWindow(QtWidgets.QWidget):
-    
-    config_saved = QtCore.pyqtSignal() # НОВЫЙ СИГНАЛ
-    
-    def __init__(self, cfg: Dict, save_callback=None):
-        super().__init__()
-        self.setWindowTitle("Radial Menu — Settings")
-        self.cfg = cfg
-        self.save_callback = save_callback
-        self.resize(850, 680) 
-        v = QtWidgets.QVBoxLayout(self)
-
-        # -------------------
-        # 1. Activation Settings
-        # -------------------
-        act_box = QtWidgets.QGroupBox("Activation (hold to open)")
-        hv = QtWidgets.QHBoxLayout(act_box)
-        hv.addWidget(QtWidgets.QLabel("Hotkey Combo:"))
-        
-        current_combo = self.cfg.get("activation",{}).get("combo", DEFAULT_CONFIG["activation"]["combo"])
-        
-        self.combo_edit = QtWidgets.QLineEdit(current_combo)
-        self.combo_edit.setFixedWidth(160)
-        hv.addWidget(self.combo_edit)
-        
-        self.capture_act_btn = QtWidgets.QPushButton("Record activation (press combo)")
-        hv.addWidget(self.capture_act_btn)
-        hv.addStretch()
-        v.addWidget(act_box)
-        self.capture_act_btn.clicked.connect(self._capture_activation)
-
-        # -------------------
-        # 2. Global Visual Settings
-        # -------------------
-        vis_box = QtWidgets.QGroupBox("Global Visual Settings")
-        hv_vis = QtWidgets.QHBoxLayout(vis_box)
-        vis_cfg = self.cfg.get("visual", DEFAULT_CONFIG["visual"])
-
-        # Main Menu Radius 
-        hv_vis.addWidget(QtWidgets.QLabel("Main Menu/Threshold Radius (px):"))
-        self.main_radius_edit = QtWidgets.QLineEdit(str(vis_cfg.get("main_radius", DEFAULT_CONFIG["visual"]["main_radius"])))
-        self.main_radius_edit.setFixedWidth(50)
-        self.main_radius_edit.setValidator(QtGui.QIntValidator(10, 500))
-        hv_vis.addWidget(self.main_radius_edit)
-        
-        hv_vis.addStretch()
-        v.addWidget(vis_box)
-
-        # -------------------
-        # 3. Directions Settings (Per-Submenu Settings)
-        # -------------------
-        dirs_box = QtWidgets.QGroupBox("Directions and their items (max 9 each) & Per-Submenu Visuals")
-        self.main_grid = QtWidgets.QGridLayout(dirs_box)
-        dirs = ["north","east","south","west"]
-        self.dir_name_edits: Dict[str, QtWidgets.QLineEdit] = {}
-        self.items_lists: Dict[str, QtWidgets.QListWidget] = {}
-        
-        self.submenu_radius_edits: Dict[str, QtWidgets.QLineEdit] = {}
-        self.threshold_ratio_edits: Dict[str, QtWidgets.QLineEdit] = {}
-        self.item_size_edits: Dict[str, QtWidgets.QLineEdit] = {}
-        
-        for i, d in enumerate(dirs):
-            dir_cfg = self.cfg["directions"][d]
-            
-            # --- Row 1: Direction Label & Per-Submenu Visuals ---
-            row_idx = i * 3
-            
-            # Direction Label
-            self.main_grid.addWidget(QtWidgets.QLabel(d.upper()), row_idx, 0)
-            name = QtWidgets.QLineEdit(dir_cfg.get("label", d.capitalize()))
-            self.dir_name_edits[d] = name
-            self.main_grid.addWidget(name, row_idx, 1)
-            
-            # Submenu Radius 
-            sr_label = QtWidgets.QLabel("Submenu Dist (px):")
-            self.main_grid.addWidget(sr_label, row_idx, 2)
-            sr_edit = QtWidgets.QLineEdit(str(dir_cfg.get("submenu_radius", DEFAULT_SUBMENU_CONFIG["submenu_radius"])))
-            sr_edit.setFixedWidth(50)
-            sr_edit.setValidator(QtGui.QIntValidator(20, 1000))
-            self.submenu_radius_edits[d] = sr_edit
-            self.main_grid.addWidget(sr_edit, row_idx, 3)
-
-            # Threshold Ratio (Now in Percentages)
-            tr_label = QtWidgets.QLabel("Threshold % (10.0-100.0):")
-            self.main_grid.addWidget(tr_label, row_idx, 4)
-            # Отображаем как процент (умножаем на 100)
-            tr_value = dir_cfg.get('threshold_ratio', DEFAULT_SUBMENU_CONFIG['threshold_ratio']) * 100.0
-            # Форматируем с точкой
-            tr_edit = QtWidgets.QLineEdit(f"{tr_value:.2f}")
-            tr_edit.setFixedWidth(70)
-            
-            # ИСПРАВЛЕНИЕ: Валидатор для корректного ввода чисел с точкой 
-            ratio_validator = QtGui.QDoubleValidator(10.0, 100.0, 2, self)
-            ratio_validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
-            # Принудительное использование точки как разделителя
-            ratio_validator.setLocale(QtCore.QLocale(QtCore.QLocale.C)) 
-            tr_edit.setValidator(ratio_validator)
-            
-            self.threshold_ratio_edits[d] = tr_edit
-            self.main_grid.addWidget(tr_edit, row_idx, 5)
-            
-            # Item Size 
-            is_label = QtWidgets.QLabel("Item Size (Radius, px):")
-            self.main_grid.addWidget(is_label, row_idx, 6)
-            is_edit = QtWidgets.QLineEdit(str(dir_cfg.get("item_size", DEFAULT_SUBMENU_CONFIG["item_size"])))
-            is_edit.setFixedWidth(50)
-            is_edit.setValidator(QtGui.QIntValidator(10, 100))
-            self.item_size_edits[d] = is_edit
-            self.main_grid.addWidget(is_edit, row_idx, 7)
-            
-            # --- Row 2: Item List and Buttons ---
-            
-            listw = QtWidgets.QListWidget()
-            listw.setFixedHeight(140)
-            listw.setFixedWidth(380)
-            # Drag & Drop for reordering
-            listw.setDragDropMode(QtWidgets.QAbstractItemView.InternalMove)
-            listw.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
-            
-            for it in dir_cfg.get("items", []):
-                li = QtWidgets.QListWidgetItem(self._format_item_text(it))
-                li.setData(QtCore.Qt.UserRole, it)
-                listw.addItem(li)
-            self.items_lists[d] = listw
-            self.main_grid.addWidget(listw, row_idx + 1, 2, 2, 3) # Span across list and buttons columns
-            
-            # Набор кнопок для управления элементами
-            btns = QtWidgets.QVBoxLayout()
-            add_hk_btn = QtWidgets.QPushButton("Add Hotkey")
-            add_text_btn = QtWidgets.QPushButton("Add Text") 
-            add_hk_text_btn = QtWidgets.QPushButton("Add Hotkey + Text") 
-            rename_btn = QtWidgets.QPushButton("Rename Selected")
-            reassign_btn = QtWidgets.QPushButton("Reassign") 
-            rem_btn = QtWidgets.QPushButton("Remove Selected")
-            
-            btns.addWidget(add_hk_btn)
-            btns.addWidget(add_text_btn)
-            btns.addWidget(add_hk_text_btn) 
-            btns.addWidget(rename_btn)
-            btns.addWidget(reassign_btn)
-            btns.addStretch(1) 
-            btns.addWidget(rem_btn)
-            
-            self.main_grid.addLayout(btns, row_idx + 1, 5, 2, 1)
-            
-            # Add a vertical separator line (optional, for visual clarity)
-            line = QtWidgets.QFrame()
-            line.setFrameShape(QtWidgets.QFrame.HLine)
-            line.setFrameShadow(QtWidgets.QFrame.Sunken)
-            self.main_grid.addWidget(line, row_idx + 2, 0, 1, 8) 
-            
-            # Привязка
-            add_hk_btn.clicked.connect(lambda _, dd=d: self._add_hotkey_item(dd))
-            add_text_btn.clicked.connect(lambda _, dd=d: self._add_text_item(dd))
-            add_hk_text_btn.clicked.connect(lambda _, dd=d: self._add_hotkey_text_item(dd)) 
-            rem_btn.clicked.connect(lambda _, dd=d: self._remove_item(dd))
-            rename_btn.clicked.connect(lambda _, dd=d: self._rename_item(dd))
-            reassign_btn.clicked.connect(lambda _, dd=d: self._reassign_item(dd))
-            
+def _mouse_button_for_combo(combo: str) -> Optional[str]:
+    """Возвращает имя кнопки библиотеки mouse для комбинации вида 'mouse x1' или None для клавиатуры."""
+    combo = combo.strip().lower()
+    if combo in ("mouse x1", "x1", "mouse_x1"):
+        return "x"
+    if combo in ("mouse x2", "x2", "mouse_x2"):
+        return "x2"
+    if combo.startswith("mouse "):
+        return combo.split("mouse ", 1)[1]
+    return None
 
-        v.addWidget(dirs_box)
-
-        # -------------------
-        # 4. Save/Cancel
-        # -------------------
-        hb = QtWidgets.QHBoxLayout()
-        hb.addStretch()
-        save_btn = QtWidgets.QPushButton("Save")
-        cancel_btn = QtWidgets.QPushButton("Cancel")
-        hb.addWidget(save_btn)
-        hb.addWidget(cancel_btn)
-        save_btn.clicked.connect(self._save)
-        cancel_btn.clicked.connect(self.close)
-        v.addLayout(hb)
-        
-    def _format_item_text(self, item_data: Dict) -> str:
-        """Форматирует текст элемента для QListWidget."""
-        label = item_data.get("label", "")
-        item_type = item_data.get("type", "hotkey")
-        
-        if item_type == "text":
-            value = item_data.get("value", "")
-            display_value = value.replace('\n', ' ')
-            display_value = display_value[:20] + "..." if len(display_value) > 20 else display_value
-            return f'{label}    [Text: "{display_value}"]'
-        
-        elif item_type == "hotkey_and_text":
-            keys = item_data.get("keys", "")
-            value = item_data.get("value", "")
-            display_value = value.replace('\n', ' ')
-            display_value = display_value[:10] + "..." if len(display_value) > 10 else display_value
-            return f'{label}    [{keys} + Text: "{display_value}"]'
-        
-        else: # hotkey
-            keys = item_data.get("keys", "")
-            return f'{label}    [{keys}]'
-
-    def _update_list_item(self, list_item: QtWidgets.QListWidgetItem, item_data: Dict):
-        """Вспомогательный метод для обновления текста элемента списка и его данных."""
-        list_item.setText(self._format_item_text(item_data))
-        list_item.setData(QtCore.Qt.UserRole, item_data)
-
-    def _capture_activation(self):
-        dlg = HotkeyCaptureDialog(self, single_key_mode=False) 
-        result_code = dlg.exec_() 
-        if result_code == QtWidgets.QDialog.Accepted and dlg.result:
-            self.combo_edit.setText(dlg.result)
-            
-    def _add_hotkey_item(self, direction):
-        lw = self._check_limit_and_get_list(direction)
-        if lw is None: return
-            
-        text, ok = QtWidgets.QInputDialog.getText(self, "New Hotkey Action", "Enter the label for the hotkey action:")
-        if not ok or not text.strip(): return
-        label = text.strip()
 
-        final_keys = self._get_two_part_hotkey(label)
-        if final_keys is None: return
+class ActivationHook(QtCore.QObject):
+    """
+    Ловит фронты нажатия/отпускания активатора через хуки бэкенда ввода.
+    В простое не просыпается: колбэки вызываются только при реальном вводе.
+    """
 
-        item = {"label": label, "keys": final_keys, "type": "hotkey"}
-        li = QtWidgets.QListWidgetItem(self._format_item_text(item))
-        li.setData(QtCore.Qt.UserRole, item)
-        lw.addItem(li)
-        
-    def _add_text_item(self, direction):
-        lw = self._check_limit_and_get_list(direction)
-        if lw is None: return
-            
-        text_label, ok = QtWidgets.QInputDialog.getText(self, "New Text Action", "Enter the label for the text action:")
-        if not ok or not text_label.strip(): return
-        label = text_label.strip()
+    # (нажат ли активатор, perf_counter_ns момента фронта). Испускается из потока хука,
+    # поэтому слоты в GUI-потоке вызываются через очередь событий Qt.
+    edge = QtCore.pyqtSignal(bool, object)
+    # Курсор сдвинулся, пока включено track_moves; позиция забирается take_move(). Пачка
+    # перемещений до обработки слота сливается в одно событие очереди.
+    moved = QtCore.pyqtSignal()
 
-        text_value, ok = QtWidgets.QInputDialog.getMultiLineText(self, "Text Content", f"Enter the text to be typed when '{label}' is selected:")
-        if not ok: return
+    def __init__(self, input_backend: InputBackend, parent=None):
+        super().__init__(parent)
+        self.input = input_backend
+        self._plan: Optional[ActivationPlan] = None
+        self._mouse_button: Optional[str] = None
+        self._pressed = False
+        self._keyboard_handle = None
+        self._mouse_handle = None
+        self._move_handle = None
+        self._move_pos = (0, 0)
+        self._move_queued = False
 
-        item = {"label": label, "type": "text", "value": text_value}
-        li = QtWidgets.QListWidgetItem(self._format_item_text(item))
-        li.setData(QtCore.Qt.UserRole, item)
-        lw.addItem(li)
-        
-    def _add_hotkey_text_item(self, direction):
-        lw = self._check_limit_and_get_list(direction)
-        if lw is None: return
-            
-        text_label, ok = QtWidgets.QInputDialog.getText(self, "New Hotkey + Text Action", "Enter the label for the action:")
-        if not ok or not text_label.strip(): return
-        label = text_label.strip()
+    @property
+    def installed(self) -> bool:
+        return self._keyboard_handle is not None or self._mouse_handle is not None
 
-        final_keys = self._get_two_part_hotkey(label)
-        if final_keys is None: return
-        
-        text_value, ok = QtWidgets.QInputDialog.getMultiLineText(self, "Text Content", f"Enter the text to be typed when '{label}' is selected (after hotkey):")
-        if not ok: return
+    def install(self, plan: ActivationPlan) -> bool:
+        """Устанавливает хук для скомпилированного активатора. Возвращает False, если хук недоступен."""
+        self.uninstall()
+        self._plan = plan
+        self._mouse_button = plan.mouse_button
+        self._pressed = False
+        try:
+            if self._mouse_button:
+                self._mouse_handle = self.input.hook_mouse(self._on_mouse_event)
+            else:
+                self._keyboard_handle = self.input.hook_keyboard(self._on_keyboard_event)
+        except Exception as e:
+            print("Failed installing activation hook:", e)
+            self.uninstall()
+            return False
+        return True
 
-        item = {"label": label, "keys": final_keys, "type": "hotkey_and_text", "value": text_value}
-        li = QtWidgets.QListWidgetItem(self._format_item_text(item))
-        li.setData(QtCore.Qt.UserRole, item)
-        lw.addItem(li)
+    def uninstall(self):
+        """Снимает только собственные хуки (не трогает чужие)."""
+        if self._keyboard_handle is not None:
+            try:
+                self.input.unhook(self._keyboard_handle)
+            except Exception:
+                pass
+            self._keyboard_handle = None
+        if self._mouse_handle is not None:
+            try:
+                self.input.unhook(self._mouse_handle)
+            except Exception:
+                pass
+            self._mouse_handle = None
+        self.track_moves(False)
+        self._pressed = False
 
-    def _check_limit_and_get_list(self, direction):
-        lw = self.items_lists[direction]
-        if lw.count() >= 9:
-            QtWidgets.QMessageBox.warning(self, "Limit", "Max 9 items per direction")
-            return None
-        return lw
-        
-    def _get_two_part_hotkey(self, label: str) -> Optional[str]:
-        """Вспомогательный метод для захвата хоткея в два этапа."""
-        
-        dlg1 = HotkeyCaptureDialog(self, single_key_mode=True)
-        dlg1.setWindowTitle(f"Record KEY 1 for: {label}")
-        dlg1.label.setText("Press the FIRST key (e.g., Shift, Ctrl, F1). Press ESC to cancel.")
-        
-        if dlg1.exec_() != QtWidgets.QDialog.Accepted: return None
-        
-        key1 = dlg1.result or ""
-        if not key1: return None
+    def track_moves(self, enabled: bool) -> bool:
+        """
+        Включает доставку перемещений курсора (хук мыши ставится только на время жеста,
+        в простое перемещения не будят процесс). False - хук мыши недоступен.
+        """
+        if not enabled:
+            if self._move_handle is not None:
+                try:
+                    self.input.unhook(self._move_handle)
+                except Exception:
+                    pass
+                self._move_handle = None
+            self._move_queued = False
+            return True
+        if self._move_handle is not None:
+            return True
+        try:
+            self._move_handle = self.input.hook_mouse(self._on_move_event)
+        except Exception as e:
+            print("Failed installing cursor move hook:", e)
+            return False
+        return True
 
-        key2 = ""
-        dlg2 = HotkeyCaptureDialog(self, single_key_mode=True)
-        dlg2.setWindowTitle(f"Record KEY 2 for: {label}")
-        dlg2.label.setText(f"Press the SECOND key (or ESC for just '{key1}').")
-        
-        if dlg2.exec_() == QtWidgets.QDialog.Accepted and dlg2.result:
-            key2 = dlg2.result
-        
-        return f"{key1}+{key2}" if key2 else key1
+    def take_move(self) -> tuple:
+        """Последняя позиция курсора из хука (GUI-поток); следующее перемещение снова испустит moved."""
+        self._move_queued = False
+        return self._move_pos
 
+    def _set_pressed(self, pressed: bool):
+        if pressed != self._pressed:
+            self._pressed = pressed
+            self.edge.emit(pressed, time.perf_counter_ns())
 
-    def _remove_item(self, direction):
-        lw = self.items_lists[direction]
-        cur = lw.currentItem()
-        if cur:
-            lw.takeItem(lw.row(cur))
+    def _on_keyboard_event(self, event: InputEvent):
+        WAKEUPS.tick()
+        try:
+            # Состояние клавиш к этому моменту уже обновлено бэкендом
+            self._set_pressed(self._plan.is_active(self.input))
+        except Exception:
+            pass
 
-    def _rename_item(self, direction):
-        lw = self.items_lists[direction]
-        cur = lw.currentItem()
-        if not cur:
-            QtWidgets.QMessageBox.information(self, "Select", "Choose an item to rename")
-            return
-            
-        it = cur.data(QtCore.Qt.UserRole)
-        newlab, ok = QtWidgets.QInputDialog.getText(self, "Rename Label", "Label:", text=it.get("label",""))
-        if not ok or not newlab.strip():
-            return
-            
-        it["label"] = newlab.strip()
-        self._update_list_item(cur, it)
-
-    def _reassign_item(self, direction):
-        lw = self.items_lists[direction]
-        cur = lw.currentItem()
-        if not cur:
-            QtWidgets.QMessageBox.information(self, "Select", "Choose an item to reassign")
+    def _on_mouse_event(self, event: InputEvent):
+        WAKEUPS.tick()
+        if event.event_type == InputEvent.MOVE or event.name != self._mouse_button:
             return
-            
-        it = cur.data(QtCore.Qt.UserRole)
-        current_label = it.get("label", "Action")
-        item_type = it.get("type", "hotkey")
+        self._set_pressed(event.event_type == InputEvent.DOWN)
 
-        if item_type == "text" or item_type == "hotkey_and_text": 
-            text_value, ok = QtWidgets.QInputDialog.getMultiLineText(self, "Edit Text Content", f"Enter the new text for '{current_label}':", text=it.get("value", ""))
-            if not ok:
-                return
-            it["value"] = text_value
-            
-            if item_type == "hotkey_and_text":
-                res = QtWidgets.QMessageBox.question(self, "Hotkey", "Do you want to reassign the hotkey part as well?", QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No | QtWidgets.QMessageBox.Cancel)
-                if res == QtWidgets.QMessageBox.Cancel:
-                    return
-                elif res == QtWidgets.QMessageBox.Yes:
-                    self._reassign_hotkey_only(it, current_label)
-                    
-            self._update_list_item(cur, it)
-            
-        else: # hotkey
-            self._reassign_hotkey_only(it, current_label)
-            self._update_list_item(cur, it)
-            
-    def _reassign_hotkey_only(self, item_data: Dict, label: str):
-        """Вспомогательный метод для переназначения только хоткея."""
-        final_keys = self._get_two_part_hotkey(label)
-        if final_keys is None:
-            return
-        item_data["keys"] = final_keys
-        
-    def _save(self):
-        new_combo = self.combo_edit.text().strip().lower()
-        if not new_combo:
-            QtWidgets.QMessageBox.warning(self, "Error", "Activation hotkey combo cannot be empty.")
+    def _on_move_event(self, event: InputEvent):
+        if event.event_type != InputEvent.MOVE:
             return
+        WAKEUPS.tick()
+        self._move_pos = (event.x, event.y)
+        if not self._move_queued:
+            self._move_queued = True
+            self.moved.emit()
 
-        self.cfg["activation"]["combo"] = new_combo
-        self.cfg["activation"].pop("modifier", None)
-        self.cfg["activation"].pop("key", None)
+# ------------------------------
+# Калибровка задержек ввода по эху собственных событий
+# ------------------------------
+class InjectionCalibrator(QtCore.QObject):
+    """
+    Измеряет, через сколько выданные нажатия возвращаются в хук клавиатуры (loopback), и выводит
+    из этого задержки ввода: шаг комбинации - по худшему эху одиночного нажатия, пауза до текста -
+    по времени, за которое доходит вся пачка событий комбинации. Обе величины с запасом SAFETY.
+    Работает в своём потоке; итог (TimingConfig или None и текст ошибки) приходит сигналом finished.
+    """
 
-        try:
-            new_main_radius = int(self.main_radius_edit.text())
-            self.cfg["visual"]["main_radius"] = max(10, new_main_radius)
+    finished = QtCore.pyqtSignal(object, str)
+
+    # Клавиша без побочных эффектов в большинстве приложений
+    KEY = "shift"
+    TRIALS = 40
+    BURST = 4               # пар нажатие/отпускание в пачке "комбинации"
+    ECHO_TIMEOUT_S = 0.25
+    SAFETY = 1.5
+    MIN_STEP_MS = 0.5
+
+    def __init__(self, input_backend: InputBackend, parent=None):
+        super().__init__(parent)
+        self.input = input_backend
+        self._thread: Optional[threading.Thread] = None
+        self.measurements: Dict[str, float] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
 
-        except ValueError:
-            QtWidgets.QMessageBox.warning(self, "Error", "Global visual settings must be valid numbers.")
+    def start(self) -> bool:
+        if self.running:
+            return False
+        self._thread = threading.Thread(target=self._run, name="calibration", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        try:
+            timing = self.calibrate()
+        except Exception as e:
+            self.finished.emit(None, str(e))
             return
+        self.finished.emit(timing, "")
 
-        for d, edit in self.dir_name_edits.items():
-            
-            # 1. Update Direction Label
-            self.cfg["directions"][d]["label"] = edit.text().strip() or d.capitalize()
-            
-            # 2. Update Per-Submenu Visuals 
+    def calibrate(self) -> TimingConfig:
+        """Выполняет замеры (блокирует поток). RuntimeError - эхо не пришло: хук не видит инъекций."""
+        code = self.input.resolve_key(self.KEY)[0]
+        echoes: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+
+        def _on_event(event: InputEvent):
+            key = event.scan_code if event.scan_code is not None else event.name
+            if key == code and event.event_type in (InputEvent.DOWN, InputEvent.UP):
+                echoes.put(time.perf_counter_ns())
+
+        def _wait_echo() -> int:
             try:
-                new_submenu_radius = int(self.submenu_radius_edits[d].text())
-                
-                # Считываем как процент и переводим в ratio
-                # Используем .text().replace(',', '.') для надежного парсинга
-                threshold_text = self.threshold_ratio_edits[d].text().replace(',', '.')
-                new_threshold_percent = float(threshold_text)
-                
-                new_threshold_ratio = new_threshold_percent / 100.0
-                
-                new_item_size = int(self.item_size_edits[d].text())
-                
-                self.cfg["directions"][d]["submenu_radius"] = max(20, new_submenu_radius)
-                self.cfg["directions"][d]["threshold_ratio"] = max(0.1, min(1.0, new_threshold_ratio)) # Ограничение 0.1 до 1.0
-                self.cfg["directions"][d]["item_size"] = max(10, min(100, new_item_size))
-                
-            except ValueError:
-                QtWidgets.QMessageBox.warning(self, "Error", f"Visual settings for {d.upper()} must be valid numbers.")
-                return
+                return echoes.get(timeout=self.ECHO_TIMEOUT_S)
+            except queue.Empty:
+                raise RuntimeError(f"no loopback echo within {self.ECHO_TIMEOUT_S * 1000:.0f} ms: injected keys are not seen by hooks")
 
-            # 3. Update Items
-            lw = self.items_lists[d]
-            new_items = []
-            for i in range(lw.count()):
-                it = lw.item(i).data(QtCore.Qt.UserRole)
-                if it:
-                    new_items.append(it)
-            self.cfg["directions"][d]["items"] = new_items
-        
-        save_config(self.cfg)
-        
-        # ОТПРАВКА СИГНАЛА об успешном сохранении
-        self.config_saved.emit()
-        
-        if self.save_callback:
-            self.save_callback()
-            
-        QtWidgets.QMessageBox.information(self, "Saved", f"Saved to {CONFIG_PATH}")
-        self.close()
+        handle = self.input.hook_keyboard(_on_event)
+        try:
+            single = []
+            for _ in range(self.TRIALS):
+                for inject in (self.input.press, self.input.release):
+                    t0 = time.perf_counter_ns()
+                    inject(code)
+                    single.append(_wait_echo() - t0)
+            burst = []
+            for _ in range(self.TRIALS // 4 or 1):
+                t0 = time.perf_counter_ns()
+                for _ in range(self.BURST):
+                    self.input.press(code)
+                    self.input.release(code)
+                last = t0
+                for _ in range(self.BURST * 2):
+                    last = _wait_echo()
+                burst.append(last - t0)
+        finally:
+            self.input.unhook(handle)
+            try:
+                self.input.release(code)
+            except Exception:
+                pass
+
+        single.sort()
+        echo_max_ms = single[-1] / 1e6
+        burst_max_ms = max(burst) / 1e6
+        self.measurements = {
+            "echo_p50_ms": single[len(single) // 2] / 1e6,
+            "echo_max_ms": echo_max_ms,
+            "burst_max_ms": burst_max_ms,
+        }
+        key_step_ms = max(self.MIN_STEP_MS, math.ceil(echo_max_ms * self.SAFETY * 10) / 10)
+        text_gap_ms = max(key_step_ms, math.ceil(burst_max_ms * self.SAFETY * 10) / 10)
+        return TimingConfig(key_step_ms=key_step_ms, text_gap_ms=text_gap_ms)
 
 # ------------------------------
 # Контроллер (обновлён для горячей перезагрузки конфигурации и надежного прожатия хоткеев)
@@ -1245,22 +3581,38 @@ class RadialController(QtCore.QObject):
     activation_started = QtCore.pyqtSignal(int, int)  
     activation_ended = QtCore.pyqtSignal()
     
-    _MAX_DEBOUNCE = 3 
+    # Режим разметки: дрожание курсора, которое не считается движением
+    MARK_JITTER_PX = 3
     
-    # Список модификаторов для форсированного отпускания/восстановления
+    # Модификаторы, которые отпускаются на время действия и восстанавливаются после
     _MODIFIERS = ['shift', 'ctrl', 'alt']
 
-    def __init__(self, cfg: Dict, overlay: RadialOverlay):
+    def __init__(self, cfg: RadialConfig, overlay: RadialOverlay, input_backend: Optional[InputBackend] = None,
+                 window_provider: Optional[WindowProvider] = None):
         super().__init__()
         self.cfg = cfg
         self.overlay = overlay
+        self.input = input_backend or overlay.input
+        
+        # Активный профиль приложения и его направления; смена при открытом меню откладывается до закрытия
+        self.profile = DEFAULT_PROFILE
+        self.directions = cfg.directions
+        self._pending_profile: Optional[str] = None
+        self._window_provider = window_provider or get_window_provider()
         
-        self.activation_combo = self.cfg.get("activation", {}).get("combo", "alt+x").lower()
+        self.activation_combo = self.cfg.activation.combo
         
         self._active = False
-        self._menu_level = 0 
-        self._current_direction = None
-        self._active_debounce = 0 
+        # Уровень меню и цепочка подменю хранятся в оверлее (overlay.breadcrumbs)
+        
+        # Антидребезг отпускания во времени: окно отсчитывается от фронта отпускания,
+        # закрытие срабатывает по таймеру сразу по истечении окна, а не на тике опроса
+        self.release_debounce_ms = 0
+        self._release_edge_ns: Optional[int] = None
+        self._release_timer = QtCore.QTimer(self)
+        self._release_timer.setSingleShot(True)
+        self._release_timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._release_timer.timeout.connect(self._on_release_settled)
         
         # Глобальные координаты центра, где было открыто ГЛАВНОЕ меню
         self._initial_center_x = 0 
@@ -1269,51 +3621,88 @@ class RadialController(QtCore.QObject):
         self.activation_started.connect(self._on_activation_started)
         self.activation_ended.connect(self._on_activation_ended)
         self.overlay.direction_passed_threshold.connect(self._on_direction_selected)
-        # НОВЫЙ СЛОТ: Обработка сигнала о возврате
-        self.overlay.back_to_main_menu.connect(self._on_back_to_main_menu) 
+        # Возврат на уровень выше и вход во вложенное подменю
+        self.overlay.back_requested.connect(self._on_back_requested) 
+        self.overlay.submenu_item_entered.connect(self._on_submenu_item_entered)
 
         self._monitor_timer = QtCore.QTimer(self)
         self._monitor_timer.timeout.connect(self._check_activation_state)
         
+        # Событийный режим: фронты активатора приходят из хуков без опроса
+        self._activation_hook = ActivationHook(self.input, self)
+        self._activation_hook.edge.connect(self._on_activation_edge)
+        
+        # Действия выполняются в отдельном потоке, а не в GUI-потоке
+        self._active_guard: Optional[ModifierGuard] = None  # модификаторы, отпущенные текущим действием
+        self._executor = ActionExecutor(self._perform_action, on_timeout=self._on_action_timeout,
+                                        planned_ms=self._planned_action_ms)
+        # Буфер обмена доступен только из GUI-потока
+        self._gui = GuiInvoker(self)
+        
+        # Режим разметки: жест разбирается по перемещениям из хука мыши, оверлей - только при задержке
+        self._marking = MarkingTracker()
+        self._marking_pending = False
+        self._last_sample = (0, 0)
+        self._activation_hook.moved.connect(self._on_marking_move)
+        self._hesitation_timer = QtCore.QTimer(self)
+        self._hesitation_timer.setSingleShot(True)
+        self._hesitation_timer.timeout.connect(self._show_marked_menu)
+        
+        # Макросы выполняются по точным дедлайнам в потоке исполнителя
+        self._macro_scheduler = MacroScheduler(self.input)
+        
+        # Таблица нажатых клавиш из хука: снимок модификаторов без опроса ОС
+        self.key_state = KeyStateTable(self.input)
+        self.key_state.install()
+        
         self._update_config_dependent_state(cfg) # Инициализация
         
-    def _get_active_modifiers(self) -> List[str]:
-        """Возвращает список модификаторов, которые в данный момент нажаты."""
-        active_mods = []
-        for mod in self._MODIFIERS:
-            try:
-                if keyboard.is_pressed(mod):
-                    active_mods.append(mod)
-            except Exception:
-                pass # Игнорируем ошибки, если кнопка не найдена/недоступна
-        return active_mods
-    
-    def _force_release_modifiers(self, mods_to_release: List[str]):
-        """Форсированно отпускает указанные модификаторы."""
-        for mod in mods_to_release:
-            try:
-                # Проверяем, чтобы избежать ошибок с попыткой отпускания 'alt'
-                # если он используется как активатор (он может быть уже отпущен)
-                if keyboard.is_pressed(mod): 
-                    keyboard.release(mod)
-            except Exception as e:
-                print(f"Error releasing {mod}: {e}")
-                
-    def _restore_modifiers(self, mods_to_restore: List[str]):
-        """Восстанавливает (нажимает) указанные модификаторы."""
-        for mod in mods_to_restore:
-            try:
-                keyboard.press(mod)
-            except Exception as e:
-                print(f"Error pressing {mod}: {e}")
-
-    def _update_config_dependent_state(self, new_cfg: Dict):
-        """Обновляет состояние контроллера на основе новой конфигурации."""
+        self._window_provider.changed.connect(self._on_foreground_window)
+        self._window_provider.start()
+        self.refresh_profile()
+        
+    def _update_config_dependent_state(self, new_cfg: RadialConfig, changes: Optional[ConfigChanges] = None):
+        """
+        Обновляет состояние контроллера на основе новой конфигурации.
+        С changes пересобирается только то, что затронуто изменениями (None - всё).
+        """
         self.cfg = new_cfg
-        self.activation_combo = self.cfg.get("activation", {}).get("combo", DEFAULT_CONFIG["activation"]["combo"]).lower()
+        full = changes is None
+        self.activation_combo = self.cfg.activation.combo
+        self.activation_mode = self.cfg.activation.mode
+        self.marking_delay_ms = self.cfg.activation.marking_delay_ms
+        self.release_debounce_ms = self.cfg.activation.release_debounce_ms
+        # Задержки ввода этой машины: из калибровки или по умолчанию
+        self.timing = self.cfg.machine_timing()
+        
+        if full or changes.actions:
+            actions_cfg = self.cfg.actions
+            self._executor.configure(actions_cfg)
+            self._paste_threshold = actions_cfg.paste_threshold
+            self._paste_chord = actions_cfg.paste_chord
+            self._paste_restore_s = actions_cfg.paste_restore_ms / 1000.0
+        self._compile_config(changes)
+        
+        # Активатор и таймер опроса зависят только от activation/visual
+        if not (full or changes.activation or changes.visual):
+            return
+        
+        # Событийный режим: таймер опроса не нужен вовсе
+        if self._activation_plan is None:
+            self._activation_hook.uninstall()
+            self._monitor_timer.stop()
+            return
+        if self.activation_mode == "hook":
+            if self._activation_hook.install(self._activation_plan):
+                self._monitor_timer.stop()
+                return
+            print("Falling back to polling activation mode")
+            self.activation_mode = "poll"
+        else:
+            self._activation_hook.uninstall()
         
         # Обновление таймера
-        interval = self.cfg.get("visual", {}).get("timer_interval_ms", DEFAULT_CONFIG["visual"]["timer_interval_ms"]) 
+        interval = self.cfg.visual.timer_interval_ms
         if self._monitor_timer.interval() != interval:
             self._monitor_timer.stop()
             self._monitor_timer.setInterval(interval) 
@@ -1321,75 +3710,282 @@ class RadialController(QtCore.QObject):
         if not self._monitor_timer.isActive():
              self._monitor_timer.start()
 
+    def _compile_config(self, changes: Optional[ConfigChanges] = None):
+        """
+        Компилирует активатор, модификаторы и хоткеи элементов в планы событий.
+        Неверные клавиши попадают в config_errors сразу при загрузке, а не при срабатывании.
+        При частичной перезагрузке пересобираются только изменившиеся разделы и направления.
+        """
+        full = changes is None
+        
+        if full or changes.activation:
+            self._activation_errors = []
+            try:
+                self._activation_plan = compile_activation(self.input, self.activation_combo)
+            except ValueError as e:
+                self._activation_plan = None
+                self._activation_errors.append(f"Activation '{self.activation_combo}': {e}")
+        
+        if full:
+            self._modifier_codes: Dict[str, tuple] = {}
+            self._modifier_errors = []
+            for mod in self._MODIFIERS:
+                try:
+                    self._modifier_codes[mod] = tuple(self.input.resolve_key(mod))
+                except (ValueError, IndexError) as e:
+                    self._modifier_errors.append(f"Modifier '{mod}': {e}")
+            for codes in self._modifier_codes.values():
+                self.key_state.seed(codes)
+            # Ключ - (профиль, направление)
+            self._direction_plans: Dict[tuple, Dict[object, object]] = {}
+            self._direction_errors: Dict[tuple, List[str]] = {}
+        
+        # Паузы зашиты в планы: новые задержки ввода пересобирают все планы
+        retime = not full and changes.timing
+        if retime:
+            self._direction_plans.clear()
+            self._direction_errors.clear()
+        
+        if full or changes.actions or retime:
+            self._paste_plan, errors = self._compile_sequences([self._paste_chord])
+            self._paste_errors = errors
+        
+        # Направления всех профилей компилируются заранее: смена профиля ничего не компилирует
+        current = list(self._profile_direction_keys())
+        if full or retime:
+            stale = current
+        else:
+            changed_profiles = changes.profiles
+            stale = [(DEFAULT_PROFILE, d) for d in changes.directions]
+            stale += [key for key in self._direction_plans if key[0] in changed_profiles]
+            stale += [key for key in current if key[0] in changed_profiles]
+        current_set = set(current)
+        for key in stale:
+            if key not in current_set:
+                self._direction_plans.pop(key, None)
+                self._direction_errors.pop(key, None)
+                continue
+            profile, d = key
+            dir_cfg = self.cfg.profile_directions(profile)[d]
+            leaves = list(iter_leaf_items(dir_cfg.items))
+            sequences = [it.keys for it in leaves if it.has_hotkey]
+            macros = [it.steps for it in leaves if it.is_macro]
+            self._direction_plans[key], self._direction_errors[key] = self._compile_sequences(sequences, macros)
+        
+        # Единая таблица для горячего пути: направления всех профилей + аккорд вставки
+        plans: Dict[object, object] = {}
+        for dir_plans in self._direction_plans.values():
+            plans.update(dir_plans)
+        plans.update(self._paste_plan)
+        self._plans = plans
+        
+        errors = self._activation_errors + self._modifier_errors + self._paste_errors
+        for key in current:
+            prefix = "" if key[0] == DEFAULT_PROFILE else f"Profile '{key[0]}': "
+            errors.extend(prefix + err for err in self._direction_errors.get(key, []))
+        self._compile_errors = errors
+        for err in errors:
+            print("Config error:", err)
+
+    @property
+    def config_errors(self) -> List[str]:
+        """Ошибки загрузки файла (при запуске или перезагрузке) и неверные клавиши скомпилированной конфигурации."""
+        return CONFIG_LOAD_ERRORS + self._compile_errors
+
+    def _profile_direction_keys(self):
+        """(профиль, направление) для всех профилей текущей конфигурации."""
+        for profile in (DEFAULT_PROFILE, *self.cfg.profiles):
+            for d in self.cfg.profile_directions(profile):
+                yield profile, d
+
+    @QtCore.pyqtSlot(object)
+    def _on_foreground_window(self, window: WindowInfo):
+        self._select_profile(self.cfg.match_profile(window))
+
+    def refresh_profile(self):
+        """Заново сопоставляет текущее окно с профилями (после загрузки или перезагрузки конфигурации)."""
+        self._select_profile(self.cfg.match_profile(self._window_provider.current()))
+
+    def _select_profile(self, profile: str):
+        if self._active:
+            self._pending_profile = profile
+            return
+        self._pending_profile = None
+        changed = profile != self.profile
+        # Всё скомпилировано и разложено заранее: только смена ссылок
+        self.profile = profile
+        self.directions = self.cfg.profile_directions(profile)
+        self.overlay.use_profile(profile)
+        if changed:
+            print(f"Profile: {profile}")
+
+    def _compile_sequences(self, sequences: List[str], macros: Sequence[tuple] = ()):
+        """
+        Компилирует набор строк хоткеев и шагов макросов; возвращает (планы, ошибки).
+        Ключ плана - строка хоткея (KeyPlan) или кортеж шагов макроса (MacroPlan).
+        """
+        plans: Dict[object, object] = {}
+        errors = []
+        for seq in sequences:
+            if seq in plans:
+                continue
+            try:
+                plans[seq] = compile_hotkey(self.input, seq, self.timing.key_step_s)
+            except ValueError as e:
+                errors.append(f"Hotkey '{seq}': {e}")
+        for steps in macros:
+            if steps in plans:
+                continue
+            try:
+                plans[steps] = compile_macro(self.input, steps, self.timing.key_step_s)
+            except ValueError as e:
+                errors.append(f"Macro: {e}")
+        return plans, errors
+
     def _is_activation_active(self) -> bool:
-        combo = self.activation_combo.strip().lower()
         try:
-            if combo in ("mouse x1", "x1", "mouse_x1"):
-                return mouse.is_pressed(button="x")  
-            elif combo in ("mouse x2", "x2", "mouse_x2"):
-                return mouse.is_pressed(button="x2")  
-            elif combo.startswith("mouse "):
-                btn = combo.split("mouse ", 1)[1]
-                return mouse.is_pressed(button=btn)
-            else:
-                return keyboard.is_pressed(combo)
+            return self._activation_plan is not None and self._activation_plan.is_active(self.input)
         except Exception:
             return False
 
+    @QtCore.pyqtSlot(bool, object)
+    def _on_activation_edge(self, pressed: bool, edge_ns: Optional[int] = None):
+        """Фронт активатора из хука: меню открывается/закрывается без ожидания тика таймера."""
+        if pressed:
+            self._on_activation_pressed(edge_ns)
+        else:
+            self._on_activation_released(edge_ns)
+
     def _check_activation_state(self):
-        active_now = self._is_activation_active()
-        
-        if active_now:
-            self._active_debounce = self._MAX_DEBOUNCE 
-            if not self._active:
-                pos = QtGui.QCursor.pos()
-                self._active = True 
-                self.activation_started.emit(int(pos.x()), int(pos.y()))
-            
+        WAKEUPS.tick()
+        # Фронт отпускания - момент первого неактивного тика (точнее опрос не знает)
+        if self._is_activation_active():
+            self._on_activation_pressed()
+        elif self._release_edge_ns is None:
+            self._on_activation_released()
+
+    def _on_activation_pressed(self, edge_ns: Optional[int] = None):
+        # Повторное нажатие внутри окна антидребезга - дребезг, меню остаётся открытым
+        self._release_edge_ns = None
+        self._release_timer.stop()
+        if not self._active:
+            LATENCY.begin(edge_ns)
+            pos = self.input.cursor_pos()
+            self._active = True
+            self.activation_started.emit(int(pos.x()), int(pos.y()))
+
+    def _on_activation_released(self, edge_ns: Optional[int] = None):
+        if not self._active or self._release_edge_ns is not None:
+            return
+        self._release_edge_ns = edge_ns if edge_ns is not None else time.perf_counter_ns()
+        # Окно считается от фронта: задержка доставки сигнала из потока хука в него входит
+        remaining_ns = self._release_edge_ns + self.release_debounce_ms * 1_000_000 - time.perf_counter_ns()
+        if remaining_ns <= 0:
+            self._on_release_settled()
         else:
-            if self._active_debounce > 0:
-                self._active_debounce -= 1
-            else:
-                if self._active:
-                    self.activation_ended.emit()
+            self._release_timer.start(math.ceil(remaining_ns / 1e6))
+
+    @QtCore.pyqtSlot()
+    def _on_release_settled(self):
+        """Окно антидребезга истекло без повторного нажатия: отпускание окончательное."""
+        self._release_timer.stop()
+        if self._active and self._release_edge_ns is not None:
+            self.activation_ended.emit()
             
     @QtCore.pyqtSlot(int, int)
     def _on_activation_started(self, x, y):
-        self._menu_level = 0
-        self._current_direction = None
         # Сохраняем начальный центр ГЛАВНОГО меню
         self._initial_center_x = x
         self._initial_center_y = y
+        if self.marking_delay_ms > 0 and self._activation_hook.track_moves(True):
+            # Оверлей появится, только если курсор замрёт дольше задержки
+            self._marking.reset(x, y, self.overlay.sectors, self.directions, self.overlay.main_radius)
+            self._marking_pending = True
+            self._last_sample = (x, y)
+            self._hesitation_timer.start(self.marking_delay_ms)
+            return
         # open_main_menu сам перемещает окно на (x, y)
         self.overlay.open_main_menu(x, y)
+        LATENCY.mark("shown")
 
-    @QtCore.pyqtSlot(str)
-    def _on_back_to_main_menu(self, direction: str):
-        """Возвращение в Level 0 с сохранением позиции центра."""
-        if self._menu_level == 1 and self._active:
-            # Сброс состояния в контроллере
-            self._menu_level = 0
-            self._current_direction = None
+    @QtCore.pyqtSlot()
+    def _on_marking_move(self):
+        """Перемещение курсора в режиме разметки; движение откладывает показ оверлея."""
+        x, y = self._activation_hook.take_move()
+        if not self._marking_pending:
+            return
+        lx, ly = self._last_sample
+        if abs(x - lx) > self.MARK_JITTER_PX or abs(y - ly) > self.MARK_JITTER_PX:
+            self._last_sample = (x, y)
+            self._hesitation_timer.start(self.marking_delay_ms)
+        had_direction = self._marking.direction is not None
+        if self._marking.feed(x, y) and not had_direction:
+            LATENCY.mark("threshold")
+
+    def _stop_marking(self):
+        self._marking_pending = False
+        self._activation_hook.track_moves(False)
+        self._hesitation_timer.stop()
+
+    @QtCore.pyqtSlot()
+    def _show_marked_menu(self):
+        """Пользователь замешкался: показываем оверлей сразу в уже распознанном состоянии жеста."""
+        if not (self._active and self._marking_pending):
+            return
+        self._stop_marking()
+        self.overlay.open_main_menu(self._initial_center_x, self._initial_center_y)
+        LATENCY.mark("shown")
+        marking = self._marking
+        if marking.direction is None:
+            return
+        self._on_direction_selected(marking.direction)
+        for index in marking.path:
+            self._on_submenu_item_entered(index)
+        if marking.index is not None and self.overlay.menu_level > 0:
+            self.overlay.highlight_index = marking.index
+            self.overlay.update()
+
+    @QtCore.pyqtSlot()
+    def _on_back_requested(self):
+        """Возвращение на уровень выше с сохранением позиции его центра."""
+        if not self._active or self.overlay.menu_level == 0:
+            return
+        if self.overlay.menu_level == 1:
             # Перемещение оверлея обратно в центр, где было открыто ГЛАВНОЕ меню
             self.overlay.go_to_main_menu(self._initial_center_x, self._initial_center_y)
+            return
+        # Родительское подменю центрируется там же, где было открыто
+        origin = self.overlay.breadcrumbs[-2].origin
+        self._move_overlay_center(origin.x(), origin.y())
+        self.overlay.leave_submenu()
+    
+    @QtCore.pyqtSlot(int)
+    def _on_submenu_item_entered(self, index: int):
+        """Вложенное подменю центрируется на шарике, через который в него вошли."""
+        if not self._active or self.overlay.menu_level == 0:
+            return
+        origin = self.overlay.mapToGlobal(self.overlay.geometry.points[index])
+        self._move_overlay_center(origin.x(), origin.y())
+        self.overlay.enter_submenu_item(index, origin)
+    
+    def _move_overlay_center(self, x: int, y: int):
+        """Перемещает окно оверлея так, чтобы глобальная точка (x, y) стала его локальным центром."""
+        self.overlay.move(x - self.overlay.center_x, y - self.overlay.center_y)
     
     @QtCore.pyqtSlot(str)
     def _on_direction_selected(self, direction: str):
         # Эта функция вызывается, когда курсор пересек main_radius
-        if self._menu_level == 0 and self._active:
-            self._menu_level = 1
-            self._current_direction = direction
-            items = self.cfg['directions'][direction].get('items', [])
+        if self.overlay.menu_level == 0 and self._active:
+            LATENCY.mark("threshold")
+            items = self.directions[direction].actionable
             
             # --- ИЗМЕНЕНИЕ: Расчет нового центра подменю ---
             
             main_radius = self.overlay.main_radius
             local_center_size = self.overlay.center_x # 250
             
-            # 1. Определяем угол направления
-            angle_map = {'east': 0, 'south': 90, 'west': 180, 'north': 270}
-            angle_deg = angle_map.get(direction, 0)
-            angle_rad = math.radians(angle_deg)
+            # 1. Определяем угол направления (из таблицы секторов оверлея)
+            angle_rad = self.overlay.sectors.angles.get(direction, 0.0)
             
             # 2. Вычисляем ГЛОБАЛЬНЫЕ координаты точки перехода (новый центр)
             transition_x = int(self._initial_center_x + math.cos(angle_rad) * main_radius)
@@ -1405,124 +4001,218 @@ class RadialController(QtCore.QObject):
             # --- КОНЕЦ ИЗМЕНЕНИЯ ---
 
             # Открываем подменю (которое теперь центрируется на точке перехода)
-            self.overlay.open_submenu(direction, items)
+            self.overlay.open_submenu(direction, items, QtCore.QPoint(transition_x, transition_y))
     
     @QtCore.pyqtSlot()
     def _on_activation_ended(self):
         
         # 1. Проверка выбора и закрытие меню
-        sel = self.overlay.get_selection()
+        if self._marking_pending:
+            # Быстрый жест: выбор по пути курсора, оверлей так и не показывался
+            self._stop_marking()
+            pos = self.input.cursor_pos()
+            self._marking.feed(pos.x(), pos.y())
+            item = self._marking.selection
+            sel = {"direction": self._marking.direction, "index": self._marking.index, "item": item} if item else None
+        else:
+            sel = self.overlay.get_selection()
+        LATENCY.mark("selection")
         
         self.overlay.close_menu()
         self._active = False 
-        self._menu_level = 0
-        self._current_direction = None
-        self._active_debounce = 0 
+        self._release_edge_ns = None
+        self._release_timer.stop()
         
         # Сброс начальных координат
         self._initial_center_x = 0 
         self._initial_center_y = 0
         
+        # Окно сменилось, пока меню было открыто
+        if self._pending_profile is not None:
+            self._select_profile(self._pending_profile)
+        
         if not sel:
             return
 
-        # 2. Подготовка к выполнению действия
-        item = sel['item']
-        item_type = item.get('type', 'hotkey') 
-        
-        # --- НОВАЯ ВСПОМОГАТЕЛЬНАЯ ФУНКЦИЯ ДЛЯ НАДЕЖНОГО ПРОЖАТИЯ ---
-        def _execute_hotkey_reliably(seq: str):
-            """
-            Выполняет комбинацию клавиш (например, 'alt+2') через явное press/release 
-            с небольшой задержкой для надежности, игнорируя keyboard.send().
-            """
-            # Нормализуем и разбиваем на ключи
-            # Убеждаемся, что клавиши корректно разбиваются, например, 'alt+2' -> ['alt', '2']
-            keys = [k.strip() for k in seq.lower().split('+') if k.strip()]
-            if not keys:
+        # 2. Выполнение в потоке исполнителя, GUI-поток сразу свободен
+        self._executor.submit(sel['item'], LATENCY.current)
+
+    def _execute_hotkey_reliably(self, seq: str, cancel_event: threading.Event):
+        """
+        Выполняет комбинацию клавиш (например, 'alt+2') через явное press/release 
+        с небольшой задержкой для надежности, игнорируя keyboard.send().
+        План событий скомпилирован при загрузке конфигурации: здесь нет разбора строк.
+        """
+        plan = self._plans.get(seq)
+        if plan is None:
+            # Комбинация не из конфигурации (или неверная): компилируем на лету
+            try:
+                plan = compile_hotkey(self.input, seq, self.timing.key_step_s)
+            except ValueError as e:
+                print(f"Skipping invalid hotkey '{seq}': {e}")
                 return
+        
+        try:
+            self.input.play(plan.events, cancel_event)
+        except Exception as e:
+            print(f"Error during reliable hotkey execution for '{seq}': {e}")
 
-            # Последний ключ — основное действие (например, '2')
-            action_key = keys[-1]
-            # Все остальные — модификаторы (например, 'alt', 'ctrl')
-            modifiers = keys[:-1]
-            
-            # Задержка между действиями (для надежности)
-            DEBOUNCE_DELAY = 0.01 
-            
+    def _run_macro(self, item: ItemConfig, cancel_event: threading.Event):
+        """Проигрывает макрос по расписанию; джиттер относительно дедлайнов пишется в LATENCY."""
+        plan = self._plans.get(item.steps)
+        if plan is None:
             try:
-                # 1. Нажать модификаторы
-                for mod in modifiers:
-                    keyboard.press(mod)
-                time.sleep(DEBOUNCE_DELAY)
-                
-                # 2. Нажать и отпустить основную клавишу
-                keyboard.press(action_key)
-                time.sleep(DEBOUNCE_DELAY)
-                keyboard.release(action_key)
-                time.sleep(DEBOUNCE_DELAY) 
+                plan = compile_macro(self.input, item.steps, self.timing.key_step_s)
+            except ValueError as e:
+                print(f"Skipping invalid macro '{item.label}': {e}")
+                return
+        self._macro_scheduler.run(plan, cancel_event)
+
+    # Размер порции текста: отмена проверяется между порциями
+    _TEXT_CHUNK = 16
+
+    def _write_text(self, text: str, cancel_event: threading.Event):
+        """Печатает текст порциями, прерываясь при отмене действия."""
+        for i in range(0, len(text), self._TEXT_CHUNK):
+            if cancel_event.is_set():
+                print(f"Text action cancelled after {i} of {len(text)} characters")
+                return
+            self.input.write(text[i:i + self._TEXT_CHUNK])
+
+    def _clipboard_swap(self, text: str) -> QtCore.QMimeData:
+        """Кладёт текст в буфер обмена и возвращает копию прежнего содержимого (GUI-поток)."""
+        clipboard = QtWidgets.QApplication.clipboard()
+        saved = QtCore.QMimeData()
+        current = clipboard.mimeData()
+        if current is not None:
+            for fmt in current.formats():
+                saved.setData(fmt, current.data(fmt))
+        clipboard.setText(text)
+        return saved
 
-                # 3. Отпустить модификаторы (в обратном порядке для максимальной совместимости)
-                for mod in reversed(modifiers):
-                    keyboard.release(mod)
+    def _clipboard_restore(self, saved: QtCore.QMimeData):
+        """Возвращает прежнее содержимое буфера обмена (GUI-поток)."""
+        clipboard = QtWidgets.QApplication.clipboard()
+        if saved.formats():
+            clipboard.setMimeData(saved)
+        else:
+            clipboard.clear()
 
+    def _paste_text(self, text: str, cancel_event: threading.Event) -> Optional[int]:
+        """
+        Вставляет текст одной комбинацией через буфер обмена, затем восстанавливает буфер.
+        Возвращает perf_counter_ns момента, когда комбинация вставки отправлена, или None,
+        если буфер занять не удалось и комбинация не отправлялась (тогда текст можно напечатать).
+        """
+        try:
+            saved = self._gui.call(self._clipboard_swap, text)
+        except Exception as e:
+            print("Clipboard unavailable, typing instead:", e)
+            return None
+        try:
+            self._execute_hotkey_reliably(self._paste_chord, cancel_event)
+            sent_ns = time.perf_counter_ns()
+            # Целевое приложение читает буфер асинхронно: даём ему время до восстановления
+            cancel_event.wait(self._paste_restore_s)
+        finally:
+            # Комбинация уже ушла: ошибка восстановления не повод печатать текст второй раз
+            try:
+                self._gui.call(self._clipboard_restore, saved)
             except Exception as e:
-                print(f"Error during reliable hotkey execution for '{seq}': {e}")
-                
-        # --- КОНЕЦ ВСПОМОГАТЕЛЬНОЙ ФУНКЦИИ ---
+                print("Failed restoring clipboard:", e)
+        return sent_ns
+
+    def _inject_text(self, item: ItemConfig, text: str, cancel_event: threading.Event):
+        """Вводит текст элемента выбранным способом; длительность пишется в LATENCY (text_type/text_paste)."""
+        mode = item.inject
+        if mode not in ('type', 'paste'):
+            mode = 'paste' if len(text) >= self._paste_threshold else 'type'
         
-        # 3. Идентификация и форсированное отпускание удерживаемых модификаторов
-        mods_to_restore = self._get_active_modifiers()
-        self._force_release_modifiers(self._MODIFIERS) # Отпускаем все 3: shift, ctrl, alt
+        # Для вставки время считается до отправки комбинации (ожидание восстановления буфера не входит)
+        t0 = time.perf_counter_ns()
+        done_ns = None
+        if mode == 'paste':
+            done_ns = self._paste_text(text, cancel_event)
+            if done_ns is None:
+                mode = 'type'
+        if mode == 'type':
+            self._write_text(text, cancel_event)
+            done_ns = time.perf_counter_ns()
         
-        # 4. Выполнение действия
-        try:
-            if item_type == 'text':
-                text_to_write = item.get('value', '')
-                if text_to_write:
-                    # Добавляем небольшую задержку, чтобы система обработала отпускание модификаторов
-                    time.sleep(0.02) 
-                    keyboard.write(text_to_write)
-            
-            elif item_type == 'hotkey_and_text': 
-                seq = item.get('keys','')
-                text_to_write = item.get('value', '')
+        LATENCY.record(f"text_{mode}", done_ns - t0)
+
+    def _perform_action(self, item: ItemConfig, cancel_event: threading.Event):
+        """Выполняет действие элемента. Вызывается в потоке ActionExecutor."""
+        item_type = item.type
+        
+        # Удерживаемые модификаторы отпускаются на время действия и гарантированно восстанавливаются
+        guard = ModifierGuard(self.input, self.key_state, self._modifier_codes)
+        self._active_guard = guard
+        with guard:
+            try:
+                if item_type == 'text':
+                    text_to_write = item.value
+                    if text_to_write:
+                        self._inject_text(item, text_to_write, cancel_event)
                 
-                if seq:
-                    _execute_hotkey_reliably(seq) # Используем новый надежный метод
+                elif item_type == 'hotkey_and_text': 
+                    seq = item.keys
+                    text_to_write = item.value
+                    
+                    if seq:
+                        self._execute_hotkey_reliably(seq, cancel_event)
+                    
+                    if text_to_write:
+                        # Пауза, чтобы цель успела обработать комбинацию (калибруется по машине)
+                        cancel_event.wait(self.timing.text_gap_s)
+                        self._inject_text(item, text_to_write, cancel_event)
                 
-                if text_to_write:
-                    # Небольшая задержка перед вводом текста
-                    time.sleep(0.05) 
-                    keyboard.write(text_to_write)
-            
-            else: # hotkey
-                seq = item.get('keys','')
-                if seq:
-                    _execute_hotkey_reliably(seq) # Используем новый надежный метод
+                elif item_type == 'macro':
+                    self._run_macro(item, cancel_event)
+                
+                else: # hotkey
+                    seq = item.keys
+                    if seq:
+                        self._execute_hotkey_reliably(seq, cancel_event)
 
-        except Exception as e:
-            print(f"Failed performing action ({item_type}, {item.get('keys', '')}):", e)
-        finally:
-            # Небольшая задержка перед восстановлением модификаторов
-            time.sleep(0.05) 
-            
-            # 5. Восстановление модификаторов, которые были нажаты до открытия меню
-            self._restore_modifiers(mods_to_restore)
+            except Exception as e:
+                print(f"Failed performing action ({item_type}, {item.keys}):", e)
 
+    def _planned_action_ms(self, item: ItemConfig) -> int:
+        """Запланированная длительность действия для сторожа: у макроса - его паузы и удержания."""
+        if not item.is_macro:
+            return 0
+        plan = self._plans.get(item.steps)
+        return plan.duration_ns // 1_000_000 if plan is not None else 0
+
+    def _on_action_timeout(self):
+        """Сторож исполнителя бросил зависшее действие: не оставляем зажатыми ни модификаторы, ни клавиши макроса."""
+        self._macro_scheduler.release_held()
+        guard = self._active_guard
+        for code in (guard.abandon() if guard is not None else ()):
+            try:
+                self.input.release(code)
+            except Exception as e:
+                print(f"Error releasing modifier {code}: {e}")
 
     def stop(self):
+        self._stop_marking()
+        self._release_timer.stop()
         self._monitor_timer.stop()
+        self._activation_hook.uninstall()
+        self.key_state.uninstall()
+        self._window_provider.stop()
+        self._executor.stop()
 
 # ------------------------------
 # Основной запуск (обновлён для работы в трее и горячей перезагрузки)
 # ------------------------------
 class ControlWidget(QtWidgets.QWidget):
     """Виджет, который ранее был ctrl, теперь используется только для окна настроек/закрытия."""
-    def __init__(self, controller: RadialController, overlay: RadialOverlay, initial_config: Dict):
+    def __init__(self, controller: RadialController, overlay: RadialOverlay, initial_config: RadialConfig):
         super().__init__()
         self.setWindowTitle("Radial Menu — Control")
-        self.setFixedSize(320, 140)
+        self.setFixedSize(320, 180)
         self.controller = controller
         self.overlay = overlay
         self.cfg = initial_config
@@ -1533,6 +4223,16 @@ class ControlWidget(QtWidgets.QWidget):
         self.label.setAlignment(QtCore.Qt.AlignCenter)
         layout.addWidget(self.label)
         
+        # Пробуждения процесса в секунду (в простое в режиме хуков должно быть ~0)
+        self.stats_label = QtWidgets.QLabel("")
+        self.stats_label.setAlignment(QtCore.Qt.AlignCenter)
+        layout.addWidget(self.stats_label)
+        
+        # Таймер обновления статистики работает только пока окно видно
+        self._stats_timer = QtCore.QTimer(self)
+        self._stats_timer.setInterval(1000)
+        self._stats_timer.timeout.connect(self._refresh_stats)
+        
         btn_layout = QtWidgets.QHBoxLayout()
         self.settings_btn = QtWidgets.QPushButton("Settings")
         self.quit_btn = QtWidgets.QPushButton("Quit")
@@ -1543,63 +4243,179 @@ class ControlWidget(QtWidgets.QWidget):
         self.settings_btn.clicked.connect(self._open_settings)
         self.quit_btn.clicked.connect(self._quit_application)
         
+        # Перезагрузка конфигурации: сохранение из настроек и ручные правки файла
+        self._reloader = ConfigReloader(self.cfg, is_busy=lambda: self.overlay.active, parent=self)
+        self._reloader.reloaded.connect(self._apply_config_snapshot)
+        self._reloader.failed.connect(lambda _error: self._report_config_errors())
+        
+        # Калибровка задержек ввода (из меню трея); итог сохраняется в конфиг для этой машины
+        self._calibrator = InjectionCalibrator(self.controller.input, self)
+        self._calibrator.finished.connect(self._on_calibration_finished)
+        
+    def _refresh_stats(self):
+        """Обновляет строку со счётчиком пробуждений и кадров оверлея."""
+        overlay_metrics = self.overlay.metrics()
+        self.stats_label.setText(
+            f"Mode: {self.controller.activation_mode} — wakeups/s: {WAKEUPS.per_second():.0f} (total {WAKEUPS.total})\n"
+            f"Frames painted: {overlay_metrics['frames_painted']}, skipped: {overlay_metrics['frames_skipped']}, "
+            f"missed: {overlay_metrics['frames_missed']} @ {overlay_metrics['frame_rate_hz']:.0f} Hz"
+        )
+        
+    def _metrics_report(self) -> Dict:
+        """Полный отчёт метрик: гистограммы задержек, счётчики оверлея и пробуждений."""
+        return {
+            "latency": LATENCY.snapshot(),
+            "overlay": self.overlay.metrics(),
+            "wakeups_per_s": WAKEUPS.per_second(),
+            "wakeups_total": WAKEUPS.total,
+        }
+
+    def _show_metrics(self):
+        """Окно с текущими p50/p95/p99 задержек (открывается из меню трея)."""
+        box = QtWidgets.QMessageBox(self)
+        box.setWindowTitle("Radial Menu — Latency")
+        box.setText("<pre>" + LATENCY.format_table() + "</pre>")
+        box.setStandardButtons(QtWidgets.QMessageBox.Ok)
+        box.exec_()
+
+    def _dump_metrics(self):
+        """Сохраняет отчёт метрик в JSON рядом с конфигом."""
+        try:
+            with open(METRICS_DUMP_PATH, "w", encoding="utf-8") as f:
+                json.dump(self._metrics_report(), f, indent=4, ensure_ascii=False)
+        except Exception as e:
+            print("Failed dumping metrics:", e)
+            return
+        if hasattr(self, 'tray_icon'):
+            self.tray_icon.showMessage("Radial Menu", f"Metrics saved to {METRICS_DUMP_PATH}")
+
+    def _notify(self, text: str, icon=QtWidgets.QSystemTrayIcon.Information):
+        print(text)
+        if hasattr(self, 'tray_icon'):
+            self.tray_icon.showMessage("Radial Menu", text, icon)
+
+    def _calibrate_timing(self):
+        """Запускает калибровку: несколько сотен нажатий Shift, которые хук видит как эхо."""
+        if self.overlay.active:
+            return
+        if self._calibrator.start():
+            self._notify("Calibrating input timing, do not type for a moment...")
+
+    @QtCore.pyqtSlot(object, str)
+    def _on_calibration_finished(self, timing: Optional[TimingConfig], error: str):
+        if timing is None:
+            self._notify(f"Calibration failed: {error}", QtWidgets.QSystemTrayIcon.Warning)
+            return
+        error = save_machine_timing(timing)
+        if error is not None:
+            self._notify(f"Calibration not saved, fix the config file first: {error}", QtWidgets.QSystemTrayIcon.Warning)
+            return
+        self._reloader.schedule()
+        m = self._calibrator.measurements
+        self._notify(
+            f"Input timing for {MACHINE_ID}: key step {timing.key_step_ms:.1f} ms, text gap {timing.text_gap_ms:.1f} ms\n"
+            f"(echo p50 {m['echo_p50_ms']:.2f} ms, max {m['echo_max_ms']:.2f} ms, chord {m['burst_max_ms']:.2f} ms)"
+        )
+
+    def showEvent(self, event):
+        self._refresh_stats()
+        self._stats_timer.start()
+        super().showEvent(event)
+        
+    def hideEvent(self, event):
+        self._stats_timer.stop()
+        super().hideEvent(event)
+        
     def _open_settings(self):
-        self.settings_window = SettingsWindow(self.cfg.copy(), save_callback=self._update_controller_after_save)
+        # Окно настроек импортируется при первом открытии, а не при запуске
+        from PieSettings import SettingsWindow
+        # Окно настроек редактирует изменяемую JSON-копию снимка
+        self.settings_window = SettingsWindow(self.cfg.to_dict())
         self.settings_window.config_saved.connect(self._update_controller_after_save)
         self.settings_window.show()
         
     @QtCore.pyqtSlot()
     def _update_controller_after_save(self):
-        """Горячая перезагрузка конфигурации и обновление контроллера/оверлея."""
-        global CONFIG
-        
-        # 1. Загрузка новой конфигурации
-        new_cfg = load_config()
-        CONFIG = new_cfg
+        """Запрашивает перезагрузку конфигурации после сохранения (схлопывается с событием файла)."""
+        self._reloader.schedule()
+
+    @QtCore.pyqtSlot(object, object)
+    def _apply_config_snapshot(self, new_cfg: RadialConfig, changes: ConfigChanges):
+        """Горячая перезагрузка: контроллер и оверлей получают один и тот же снимок."""
         self.cfg = new_cfg
         
-        # 2. Обновление контроллера
-        self.controller._update_config_dependent_state(new_cfg)
+        # 1. Обновление контроллера (только затронутые разделы и направления)
+        self.controller._update_config_dependent_state(new_cfg, changes)
         
-        # 3. Обновление оверлея
-        self.overlay.cfg = new_cfg 
-        vis_cfg = new_cfg.get("visual", DEFAULT_CONFIG["visual"])
-        self.overlay.main_radius = vis_cfg["main_radius"]
+        # 2. Обновление оверлея (сброс только устаревших слоёв)
+        self.overlay.apply_config(new_cfg, changes)
+        # Профили могли появиться или пропасть: сопоставляем текущее окно заново
+        self.controller.refresh_profile()
+        # Сброшенные слои рендерятся сейчас (перезагрузка не идёт при открытом меню), а не при открытии
+        self.overlay.prerender_stale_layers()
         
-        north_cfg = new_cfg["directions"].get('north', DEFAULT_SUBMENU_CONFIG)
-        self.overlay.current_threshold = int(self.overlay.main_radius * north_cfg.get("threshold_ratio", DEFAULT_SUBMENU_CONFIG["threshold_ratio"]))
+        first_sector = self.overlay.sectors.names[0]
+        self.overlay.current_threshold = int(self.overlay.main_radius * self.overlay.cfg.directions[first_sector].threshold_ratio)
 
-        # 4. Обновление текста в окне управления (если оно открыто)
+        # 3. Обновление текста в окне управления (если оно открыто)
         self.label.setText(f"Radial Menu v1 — hold {self.controller.activation_combo} to open\nConfig: radial_config.json")
         
         if hasattr(self, 'tray_icon'):
             self.tray_icon.setToolTip(f"Radial Menu (Active)\nHotkey: {self.controller.activation_combo}")
+        self._report_config_errors()
+
+    def _report_config_errors(self):
+        """Показывает ошибки загрузки файла и неверные клавиши, найденные при компиляции конфигурации."""
+        errors = self.controller.config_errors
+        if errors and hasattr(self, 'tray_icon'):
+            self.tray_icon.showMessage("Radial Menu — config errors", "\n".join(errors[:5]), QtWidgets.QSystemTrayIcon.Warning)
         
     def _quit_application(self):
         self.controller.stop()
         QtWidgets.QApplication.quit()
 
+def __getattr__(name):
+    # Окно настроек и захват хоткеев живут в PieSettings и импортируются при первом обращении
+    if name in ("SettingsWindow", "HotkeyCaptureDialog"):
+        import PieSettings
+        return getattr(PieSettings, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def main():
+    # --profile-startup: таблица длительностей фаз запуска в stdout
+    profile_startup = "--profile-startup" in sys.argv
+    argv = [arg for arg in sys.argv if arg != "--profile-startup"]
+    startup = StartupProfile(_IMPORT_STARTED_NS)
+    startup.phase("import (Qt + module)")
+    
     # Настройка для High DPI (важно для корректного отображения оверлея)
     QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_EnableHighDpiScaling, True)
     
-    global CONFIG
-    CONFIG = load_config()
+    # Конфигурация загружается один раз; дальше её обновляет только ConfigReloader
+    cfg = load_config()
+    startup.phase("load config")
     
     # Чтобы корректно работали тултипы
     QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_UseHighDpiPixmaps)
     
-    app = QtWidgets.QApplication(sys.argv)
+    app = QtWidgets.QApplication(argv)
+    startup.phase("QApplication")
     
     # -------------------
-    # Инициализация
+    # Инициализация: до первой активации - только оверлей, контроллер и трей
     # -------------------
-    overlay = RadialOverlay(CONFIG)
+    overlay = RadialOverlay(cfg)
     overlay.hide()
-    controller = RadialController(CONFIG, overlay)
+    startup.phase("overlay")
+    # Окно, backing store, шрифты и слои создаются сейчас, а не при первой активации
+    overlay.warm_up()
+    startup.phase("overlay warm-up")
+    controller = RadialController(cfg, overlay)
+    startup.phase("controller + hooks")
 
     # Виджет управления (используется только для хранения функций настроек/выхода)
-    control_widget = ControlWidget(controller, overlay, CONFIG)
+    control_widget = ControlWidget(controller, overlay, cfg)
     
     # -------------------
     # Системный Трей (Tray Icon)
@@ -1622,6 +4438,16 @@ def main():
     action_settings = tray_menu.addAction("Settings")
     action_settings.triggered.connect(control_widget.show) # Показать окно настроек
     
+    # Метрики задержек конвейера активация -> ввод
+    action_latency = tray_menu.addAction("Latency Stats")
+    action_latency.triggered.connect(control_widget._show_metrics)
+    action_dump = tray_menu.addAction("Dump Metrics to JSON")
+    action_dump.triggered.connect(control_widget._dump_metrics)
+    
+    # Замер задержек ввода этой машины по эху собственных нажатий
+    action_calibrate = tray_menu.addAction("Calibrate Input Timing")
+    action_calibrate.triggered.connect(control_widget._calibrate_timing)
+    
     action_quit = tray_menu.addAction("Quit")
     action_quit.triggered.connect(control_widget._quit_application)
 
@@ -1630,6 +4456,14 @@ def main():
     
     # Сохраняем иконку трея в ControlWidget для возможного обновления тултипа
     control_widget.tray_icon = tray_icon 
+    control_widget._report_config_errors()
+    startup.phase("tray + control widget")
+    
+    def _startup_ready():
+        startup.phase("first event loop pass")
+        if profile_startup:
+            print(startup.format_table())
+    QtCore.QTimer.singleShot(0, _startup_ready)
     
     # Скрываем главное окно (оно больше не нужно)
     #QtWidgets.QApplication.setQuitOnLastWindowClosed(False)
@@ -1638,4 +4472,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # PieSettings делает "import PieTest": при запуске скриптом это должен быть этот же модуль, а не вторая копия
+    sys.modules.setdefault("PieTest", sys.modules[__name__])
     main()
\ No newline at end of file
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# Тесты не требуют дисплея и запускаются из любого каталога
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt5 import QtWidgets
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def controller(qapp):
+    import PieTest
+    backend = PieTest.MemoryInputBackend()
+    PieTest.set_input_backend(backend)
+    cfg = PieTest.RadialConfig.from_dict(PieTest.DEFAULT_CONFIG)
+    overlay = PieTest.RadialOverlay(cfg, backend)
+    controller = PieTest.RadialController(cfg, overlay)
+    yield controller
+    controller.stop()
+    overlay.deleteLater()
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+import PieTest
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    path = tmp_path / "radial_config.json"
+    monkeypatch.setattr(PieTest, "CONFIG_PATH", path)
+    monkeypatch.setattr(PieTest, "CONFIG_BACKUP_PATH", tmp_path / "radial_config.json.bak")
+    return path
+
+
+def _with_item(**item) -> dict:
+    raw = json.loads(json.dumps(PieTest.DEFAULT_CONFIG))
+    raw["directions"]["north"]["items"] = [dict({"label": "A", "keys": "ctrl+a"}, **item)]
+    return raw
+
+
+@pytest.mark.parametrize("raw", [
+    _with_item(type="Hotkey"),
+    _with_item(type="macro", steps=[{"delay": -5}]),
+    {**_with_item(), "profiles": {"default": {"match": {"title": "x"}, "directions": {}}}},
+])
+def test_invalid_file_is_left_unchanged(config_path, raw):
+    text = json.dumps(raw, indent=4)
+    config_path.write_text(text, encoding="utf-8")
+
+    cfg = PieTest.load_config()
+
+    assert config_path.read_text(encoding="utf-8") == text
+    assert PieTest.CONFIG_BACKUP_PATH.read_text(encoding="utf-8") == text
+    assert PieTest.CONFIG_LOAD_ERRORS
+    assert cfg == PieTest.RadialConfig.from_dict(PieTest.DEFAULT_CONFIG)
+
+
+def test_unparsable_file_is_left_unchanged(config_path):
+    config_path.write_text("{not json", encoding="utf-8")
+
+    PieTest.load_config()
+
+    assert config_path.read_text(encoding="utf-8") == "{not json"
+    assert PieTest.CONFIG_LOAD_ERRORS
+
+
+def test_missing_file_gets_defaults(config_path):
+    cfg = PieTest.load_config()
+
+    assert config_path.exists()
+    assert not PieTest.CONFIG_LOAD_ERRORS
+    assert PieTest.RadialConfig.from_dict(json.loads(config_path.read_text(encoding="utf-8"))) == cfg
+
+
+def _unversioned(directions: dict) -> dict:
+    raw = json.loads(json.dumps(PieTest.DEFAULT_CONFIG))
+    del raw["version"]
+    raw["directions"] = directions
+    return raw
+
+
+def test_unversioned_compass_layout_is_filled_to_four():
+    cfg = PieTest.RadialConfig.from_dict(_unversioned({"south": {"label": "S"}, "north": {"label": "N"}}))
+
+    assert list(cfg.directions) == list(PieTest.DIRECTIONS)
+    assert cfg.directions["south"].label == "S"
+
+
+def test_unversioned_custom_sectors_are_kept():
+    names = ["north", "northeast", "east", "south", "southwest", "west"]
+    cfg = PieTest.RadialConfig.from_dict(_unversioned({d: {"label": d.title()} for d in names}))
+
+    assert list(cfg.directions) == names
+    assert cfg.directions["southwest"].label == "Southwest"
+
+
+def test_failed_reload_is_reported_and_backed_up(config_path, qapp):
+    PieTest.save_config(PieTest.DEFAULT_CONFIG)
+    cfg = PieTest.load_config()
+    reloader = PieTest.ConfigReloader(cfg)
+    failures = []
+    reloader.failed.connect(failures.append)
+    broken = json.dumps(_with_item(type="Hotkey"))
+    config_path.write_text(broken, encoding="utf-8")
+
+    reloader._reload()
+
+    assert failures and PieTest.CONFIG_LOAD_ERRORS == failures
+    assert PieTest.CONFIG_BACKUP_PATH.read_text(encoding="utf-8") == broken
+
+
+def test_save_over_unloaded_file_keeps_a_backup(config_path):
+    broken = "{not json"
+    config_path.write_text(broken, encoding="utf-8")
+    PieTest.load_config()
+    PieTest.CONFIG_BACKUP_PATH.unlink()
+
+    PieTest.save_config(PieTest.DEFAULT_CONFIG)
+
+    assert PieTest.CONFIG_BACKUP_PATH.read_text(encoding="utf-8") == broken
+
+
+def test_calibration_patches_only_its_machine_timing(config_path):
+    raw = _with_item()
+    raw["timing"] = {"other": {"key_step_ms": 3, "text_gap_ms": 9}}
+    raw["future_section"] = {"kept": True}
+    config_path.write_text(json.dumps(raw), encoding="utf-8")
+
+    assert PieTest.save_machine_timing(PieTest.TimingConfig(key_step_ms=1.5, text_gap_ms=4.0), "here") is None
+
+    saved = json.loads(config_path.read_text(encoding="utf-8"))
+    assert saved["timing"]["here"] == {"key_step_ms": 1.5, "text_gap_ms": 4.0}
+    del saved["timing"]["here"]
+    assert saved == raw
+
+
+def test_calibration_refuses_an_unparsable_file(config_path):
+    config_path.write_text("{not json", encoding="utf-8")
+
+    error = PieTest.save_machine_timing(PieTest.TimingConfig(key_step_ms=1.5, text_gap_ms=4.0), "here")
+
+    assert error
+    assert config_path.read_text(encoding="utf-8") == "{not json"
@@ -0,0 +1,69 @@
+import PieTest
+
+
+def _table():
+    backend = PieTest.MemoryInputBackend()
+    table = PieTest.KeyStateTable(backend)
+    assert table.install()
+    return backend, table
+
+
+def test_injected_keys_do_not_change_the_table():
+    backend, table = _table()
+
+    backend.press("ctrl")
+    backend.release("ctrl")
+    backend.press("shift")
+
+    assert not table.is_pressed("shift")
+    assert not table.is_pressed("ctrl")
+
+
+def test_written_text_echo_keeps_held_modifier():
+    backend, table = _table()
+    backend.feed_key("shift", True)
+
+    with PieTest.ModifierGuard(backend, table, {"shift": ("shift",)}):
+        backend.write("Hello World")
+
+    assert table.is_pressed("shift")
+    assert not table.is_pressed("h")
+    assert backend.injected[-1][1:] == ("press", "shift")
+
+
+def test_physical_release_during_write_is_not_restored():
+    backend, table = _table()
+    backend.feed_key("shift", True)
+
+    with PieTest.ModifierGuard(backend, table, {"shift": ("shift",)}):
+        with table.writing():
+            backend.feed_key("shift", False)
+
+    assert not table.is_pressed("shift")
+    assert backend.injected[-1][1:] == ("release", "shift")
+
+
+def test_physical_release_after_write_echo_is_not_restored():
+    backend, table = _table()
+    backend.feed_key("shift", True)
+
+    with PieTest.ModifierGuard(backend, table, {"shift": ("shift",)}):
+        backend.write("Hi")
+        backend.feed_key("shift", False)
+
+    assert not table.is_pressed("shift")
+    assert backend.injected[-1][1:] == ("write", "Hi")
+
+
+def test_action_timeout_releases_the_guarded_codes(controller):
+    backend = controller.input
+    backend.feed_key("shift", True)
+    controller._modifier_codes = {"shift": ("lshift", "shift")}
+
+    guard = PieTest.ModifierGuard(backend, controller.key_state, controller._modifier_codes)
+    guard.__enter__()
+    controller._active_guard = guard
+    controller._on_action_timeout()
+    guard.__exit__(None, None, None)
+
+    assert [e[1:] for e in backend.injected] == [("release", "shift"), ("release", "shift")]
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import PieTest
+
+
+def _macro(steps):
+    return PieTest.ItemConfig.from_dict({"label": "macro", "type": "macro", "steps": steps})
+
+
+def test_planned_duration_counts_delays_and_holds():
+    backend = PieTest.MemoryInputBackend(loopback=False)
+    item = _macro([{"hold": "w", "ms": 200}, {"delay": 50}, {"text": "x"}, {"delay": 30}])
+
+    plan = PieTest.compile_macro(backend, item.steps, step_delay=0)
+
+    assert plan.duration_ns == 280_000_000
+
+
+def test_release_held_lets_go_of_keys_mid_hold():
+    backend = PieTest.MemoryInputBackend(loopback=False)
+    scheduler = PieTest.MacroScheduler(backend)
+    plan = PieTest.compile_macro(backend, _macro([{"hold": "w", "ms": 2000}]).steps, step_delay=0)
+    cancel = threading.Event()
+    worker = threading.Thread(target=scheduler.run, args=(plan, cancel))
+    worker.start()
+    while ("press", "w") not in [entry[1:] for entry in backend.injected]:
+        time.sleep(0.001)
+
+    scheduler.release_held()
+    cancel.set()
+    worker.join(1)
+
+    actions = [entry[1:] for entry in backend.injected]
+    assert actions == [("press", "w"), ("release", "w")]
+
+
+def test_watchdog_waits_for_the_planned_macro_duration():
+    done = threading.Event()
+    timeouts = []
+
+    def run(item, cancel_event):
+        cancel_event.wait(0.3)
+        if not cancel_event.is_set():
+            done.set()
+
+    executor = PieTest.ActionExecutor(run, on_timeout=lambda: timeouts.append(1), planned_ms=lambda item: 300)
+    executor.watchdog_ms = 100
+    executor.submit(_macro([{"delay": 300}]))
+
+    assert done.wait(2)
+    assert not timeouts
+    executor.stop()
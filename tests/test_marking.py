@@ -0,0 +1,22 @@
+import PieTest
+
+
+def test_marking_follows_hook_moves_without_polling(controller, qapp):
+    backend = controller.input
+    controller.marking_delay_ms = 300
+    radius = controller.overlay.main_radius
+
+    controller._on_activation_started(600, 600)
+    backend.move_cursor(600 + radius + 5, 600)
+    qapp.processEvents()
+
+    assert controller._marking.direction == "east"
+    assert controller._hesitation_timer.isActive()
+    assert not [t for t in controller.findChildren(PieTest.QtCore.QTimer) if t.isActive() and not t.isSingleShot()]
+
+    controller._stop_marking()
+    backend.move_cursor(600, 600 - radius - 5)
+    qapp.processEvents()
+
+    assert controller._marking.direction == "east"
+    assert controller._activation_hook._on_move_event not in backend._mouse_hooks
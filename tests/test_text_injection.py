@@ -0,0 +1,34 @@
+import threading
+
+import PieTest
+
+
+def _text_item(inject: str) -> "PieTest.ItemConfig":
+    return PieTest.ItemConfig.from_dict({"label": "t", "type": "text", "value": "hello", "inject": inject})
+
+
+def _actions(controller):
+    return [entry[1:] for entry in controller.input.injected]
+
+
+def test_failed_clipboard_restore_does_not_type_the_text_again(controller, monkeypatch):
+    def broken_restore(saved):
+        raise RuntimeError("clipboard busy")
+    monkeypatch.setattr(controller, "_clipboard_restore", broken_restore)
+    controller._paste_restore_s = 0
+
+    controller._inject_text(_text_item("paste"), "hello", threading.Event())
+
+    assert ("press", "v") in _actions(controller)
+    assert not [a for a in _actions(controller) if a[0] == "write"]
+
+
+def test_unavailable_clipboard_falls_back_to_typing(controller, monkeypatch):
+    def broken_swap(text):
+        raise RuntimeError("clipboard busy")
+    monkeypatch.setattr(controller, "_clipboard_swap", broken_swap)
+
+    controller._inject_text(_text_item("paste"), "hello", threading.Event())
+
+    assert ("write", "hello") in _actions(controller)
+    assert ("press", "v") not in _actions(controller)